@@ -1,44 +1,2484 @@
 import requests
-from urllib.parse import urlparse, parse_qs
+from requests.adapters import HTTPAdapter
+from urllib.parse import urlparse, parse_qs, quote
 from bs4 import BeautifulSoup
 import csv
-from io import StringIO
 import threading
 import time
 import logging
 from http.server import BaseHTTPRequestHandler, HTTPServer
 import json
 import os
-import matplotlib.pyplot as plt
-import pandas as pd
+import numpy as np
 from datetime import datetime, timedelta
 import smtplib
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
+from email.utils import formatdate, parsedate_to_datetime
 import optparse
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+import gzip
+import hashlib
+import heapq
+from html import escape as html_escape
+import multiprocessing
+import random
+import re
+import selectors
+import socket
+import sqlite3
+
+import plot_renderer
 
 _DEFAULT_PORT = 8000
+_DEFAULT_WORKERS = 8
+_DEFAULT_REQUEST_TIMEOUT = 30
+_DEFAULT_RENDER_WORKERS = 2
+_DEFAULT_RENDER_RECYCLE = 50
+# Longest wait for one render in the renderer pool, whatever the caller's
+# own deadline; a render whose worker died never completes on its own.
+_DEFAULT_RENDER_TIMEOUT = 120
+_MAX_PLOT_DAYS = 3650
+# Readings compaction (see ReadingsStore.compact): full resolution for the
+# recent window, hourly segments up to a year, daily segments beyond.
+_COMPACT_RAW_DAYS = 90
+_COMPACT_HOURLY_DAYS = 365
 _DATADIR = "./data/"
 _ALERT = False
+# Directory the static dashboard snapshot is written to after every poll
+# (see export_static); None disables the export.
+_EXPORT_DIR = None
+# Storage engine for the alert logs: 'files' (text logs in _DATADIR) or
+# 'sqlite' (indexed tables in readings.db, in WAL mode).
+_STORAGE = 'files'
+# Device key of the single manifold monitored when no manifolds.json exists.
+# Readings and log lines recorded before multi-manifold support carry it
+# (or no device at all) and are attributed to the primary manifold.
+_DEFAULT_DEVICE = 'default'
+# Upper bound on concurrent export downloads (one per Linde country export).
+_MAX_FETCH_WORKERS = 4
+# Background job intervals in seconds (see LindeLink.schedule_jobs). The
+# poll interval adapts between the two bounds (see LindeLink.poll_interval_for).
+_POLL_MIN_INTERVAL = 600
+_POLL_MAX_INTERVAL = 4 * 3600
+_TOKEN_CHECK_INTERVAL = 300
+_SMTP_CHECK_INTERVAL = 6 * 3600
+_COMPACT_INTERVAL = 86400
+# Server-Sent Events (see EventHub): seconds between keep-alive comments, and
+# bytes a subscriber may fall behind by before it is disconnected.
+_EVENTS_HEARTBEAT = 30
+_EVENTS_MAX_BACKLOG = 256 * 1024
+
+# Out-of-process renderer pool; None renders in-process (see render_plot_job).
+_RENDERER = None
+# In-process renders are serialised so concurrent request threads do not
+# compete for the GIL and memory with several figures at once.
+_RENDER_LOCK = threading.Lock()
+
+
+def parse_message_time(value):
+    """
+    Parse a manifold messageTime/lastChange string into a naive datetime.
+
+    Returns:
+        datetime | None: The parsed time, or None if the value is missing or
+        malformed (the upstream CSV occasionally reports empty fields).
+    """
+    if not value or value == 'None':
+        return None
+    try:
+        return datetime.strptime(value[:19], '%Y-%m-%dT%H:%M:%S')
+    except (ValueError, TypeError):
+        return None
+
+
+def bank_fields(bank):
+    """
+    Return the (contents, messageTime, lastChange) column names of `bank` in
+    a manifold row, e.g. ('leftBankContents', 'messageTimeLeft',
+    'lastChangeLeft') for 'left'.
+    """
+    suffix = bank[:1].upper() + bank[1:]
+    return f'{bank}BankContents', f'messageTime{suffix}', f'lastChange{suffix}'
+
+
+def parse_alert_line(line):
+    """
+    Split a last_alert.log / staleness_alert.log line into its fields:
+    time, bank, an extra value (the PO number, or the days of staleness)
+    and the device. Lines written before multi-manifold support have no
+    device column.
+
+    Returns:
+        tuple | None: (datetime, bank, extra | None, device | None), or None
+        for a malformed line.
+    """
+    parts = line.strip().split(',')
+    if len(parts) < 2:
+        return None
+    try:
+        dt = datetime.strptime(parts[0], '%Y-%m-%d %H:%M')
+    except ValueError:
+        return None
+    extra = parts[2] if len(parts) >= 3 else None
+    device = parts[3] if len(parts) >= 4 and parts[3] else None
+    return dt, parts[1], extra, device
+
+
+def format_alert_line(when, bank, extra, device=None):
+    """
+    Format a last_alert.log / staleness_alert.log line, the inverse of
+    parse_alert_line. The device column is left out for the default device
+    so single-manifold logs keep their original format.
+    """
+    column = '' if device in (None, _DEFAULT_DEVICE) else f',{device}'
+    return f"{when.strftime('%Y-%m-%d %H:%M')},{bank},{extra}{column}\n"
+
+
+class SQLiteConnections():
+    """
+    Connections to one SQLite database file: a writer connection serialised
+    by a lock, and with wal=True one reader connection per thread.
+
+    In write-ahead-log mode readers see the last committed state without
+    waiting for the writer, so request threads keep querying while the
+    collector writes. Without WAL, reads share the writer connection under
+    the lock.
+    """
+    def __init__(self, db_path, wal=False):
+        self.db_path = db_path
+        self.wal = wal
+        self.lock = threading.Lock()
+        self.writer = self._connect()
+        if wal:
+            self.writer.execute('PRAGMA journal_mode=WAL')
+            # Reason: in WAL mode NORMAL can only lose the last commits on
+            # power loss, never corrupt the file, and saves an fsync a write.
+            self.writer.execute('PRAGMA synchronous=NORMAL')
+        self._local = threading.local()
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, check_same_thread=False, timeout=30)
+
+    @contextmanager
+    def write(self):
+        """Yield the writer connection inside a transaction."""
+        with self.lock, self.writer:
+            yield self.writer
+
+    def read(self, sql, params=()):
+        """
+        Run a query and return all its rows.
+        """
+        if not self.wal:
+            with self.lock:
+                return self.writer.execute(sql, params).fetchall()
+        # Reason: a reader connection is dropped, and closed, together with
+        # its thread, so short-lived threads do not accumulate connections.
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn.execute(sql, params).fetchall()
+
+    def close(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+        with self.lock:
+            self.writer.close()
+
+
+class ReadingsStore():
+    """
+    Time-indexed store for bank readings, backed by SQLite with an index on
+    (device, bank, messageTime). Range reads only touch the rows they
+    return, so a 10-day plot costs the same after one month or ten years of
+    polling, and however many manifolds share the store.
+
+    messageTime is stored as ISO text ('%Y-%m-%dT%H:%M:%S'), whose lexical
+    order is also chronological order, so range predicates use the index.
+
+    Old history is compacted into hourly and daily min/mean/max segments
+    (see compact()); range() stitches them back in, so callers never see
+    the tiers.
+    """
+    _TIME_FORMAT = '%Y-%m-%dT%H:%M:%S'
+    # Merges a rolled-up segment into an existing one for the same period
+    _SEGMENT_UPSERT = (
+        ' ON CONFLICT (device, bank, start, tier) DO UPDATE SET'
+        ' mean = (mean * count + excluded.mean * excluded.count) / (count + excluded.count),'
+        ' count = count + excluded.count,'
+        ' min = MIN(min, excluded.min), max = MAX(max, excluded.max)'
+    )
+
+    def __init__(self, db_path, wal=False):
+        """
+        Args:
+            db_path (str): SQLite database file.
+            wal (bool): Use write-ahead logging, so reads never wait for
+                the collector's writes (see SQLiteConnections).
+        """
+        self.db_path = db_path
+        self._db = SQLiteConnections(db_path, wal=wal)
+        with self._db.write() as conn:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS readings ('
+                'messageTime TEXT NOT NULL, bank TEXT NOT NULL, '
+                'lastChange TEXT, content REAL, '
+                f"device TEXT NOT NULL DEFAULT '{_DEFAULT_DEVICE}')"
+            )
+            columns = [row[1] for row in conn.execute('PRAGMA table_info(readings)')]
+            if 'device' not in columns:
+                # Stores created before multi-manifold support: existing
+                # rows belong to the default device.
+                conn.execute(
+                    f"ALTER TABLE readings ADD COLUMN device TEXT NOT NULL DEFAULT '{_DEFAULT_DEVICE}'"
+                )
+            conn.execute('DROP INDEX IF EXISTS idx_readings_bank_time')
+            conn.execute(
+                'CREATE INDEX IF NOT EXISTS idx_readings_device_bank_time '
+                'ON readings (device, bank, messageTime)'
+            )
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS segments ('
+                'device TEXT NOT NULL, bank TEXT NOT NULL, tier TEXT NOT NULL, start TEXT NOT NULL, '
+                'count INTEGER NOT NULL, mean REAL, min REAL, max REAL, '
+                'PRIMARY KEY (device, bank, start, tier))'
+            )
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)'
+            )
+
+    @classmethod
+    def _normalise(cls, message_time, bank, last_change, content):
+        """
+        Coerce a raw reading into the stored representation, or return None
+        if it has no usable messageTime.
+        """
+        dt = message_time if isinstance(message_time, datetime) else parse_message_time(message_time)
+        if dt is None:
+            return None
+        try:
+            content = float(content)
+        except (ValueError, TypeError):
+            content = None
+        last_change = None if last_change in (None, '', 'None') else str(last_change)
+        return (dt.strftime(cls._TIME_FORMAT), bank, last_change, content)
+
+    def append(self, message_time, bank, last_change, content, device=_DEFAULT_DEVICE):
+        """
+        Store a single reading.
+
+        Returns:
+            bool: True if the reading was stored, False if it was rejected
+            because its messageTime could not be parsed.
+        """
+        return self.append_many([(message_time, bank, last_change, content)], device=device) == 1
+
+    def append_many(self, rows, device=_DEFAULT_DEVICE):
+        """
+        Store several readings of one device in one transaction.
+
+        Args:
+            rows (iterable): (messageTime, bank, lastChange, content) tuples.
+            device (str): Manifold the readings belong to.
+
+        Returns:
+            int: Number of rows actually stored.
+        """
+        normalised = [r + (device,) for r in (self._normalise(*row) for row in rows) if r is not None]
+        if not normalised:
+            return 0
+        with self._db.write() as conn:
+            conn.executemany(
+                'INSERT INTO readings (messageTime, bank, lastChange, content, device) VALUES (?, ?, ?, ?, ?)',
+                normalised,
+            )
+        return len(normalised)
+
+    def _where(self, time_column, device, bank, start, end):
+        clauses, params = [], []
+        if device is not None:
+            clauses.append('device = ?')
+            params.append(device)
+        if bank is not None:
+            clauses.append('bank = ?')
+            params.append(bank)
+        if start is not None:
+            clauses.append(f'{time_column} >= ?')
+            params.append(start.strftime(self._TIME_FORMAT))
+        if end is not None:
+            clauses.append(f'{time_column} < ?')
+            params.append(end.strftime(self._TIME_FORMAT))
+        return (f" WHERE {' AND '.join(clauses)}" if clauses else ''), params
+
+    def range(self, bank=None, start=None, end=None, device=_DEFAULT_DEVICE, spread=False):
+        """
+        Return readings in [start, end), oldest first. Compacted history
+        reads as one reading per segment, at the segment start, holding
+        the segment mean.
+
+        Args:
+            bank (str | None): Restrict to one bank, or None for all banks.
+            start (datetime | None): Inclusive lower bound.
+            end (datetime | None): Exclusive upper bound.
+            device (str | None): Manifold to read, or None for all of them.
+            spread (bool): Also return each reading's min and max.
+
+        Returns:
+            list: (datetime, bank, lastChange, content) tuples, or with
+            spread=True (datetime, bank, lastChange, content, min, max)
+            tuples; raw readings have min == max == content.
+        """
+        where, params = self._where('messageTime', device, bank, start, end)
+        rows = self._db.read(
+            f'SELECT messageTime, bank, lastChange, content, content, content FROM readings{where} '
+            f'ORDER BY messageTime, rowid',
+            params,
+        )
+        where, params = self._where('start', device, bank, start, end)
+        segments = self._db.read(
+            f'SELECT start, bank, NULL, mean, min, max FROM segments{where} ORDER BY start',
+            params,
+        )
+        if segments:
+            rows = heapq.merge(segments, rows, key=lambda row: row[0])
+        width = 6 if spread else 4
+        return [(datetime.strptime(row[0], self._TIME_FORMAT),) + tuple(row[1:width]) for row in rows]
+
+    def compact(self, now=None, raw_days=_COMPACT_RAW_DAYS, hourly_days=_COMPACT_HOURLY_DAYS):
+        """
+        Bound the growth of the store in three steps:
+
+        1. drop duplicate readings, i.e. the same messageTime polled again
+           while the manifold had not reported anything new;
+        2. roll readings older than `raw_days` into hourly segments;
+        3. roll hourly segments older than `hourly_days` into daily ones.
+
+        Segments keep the count, mean, min and max of what they replace,
+        so once the hourly tier is full the store grows by one row per bank
+        per day, and SQLite reuses the pages freed by the deletes.
+
+        Returns:
+            dict: Rows removed by each step: {'duplicates', 'hourly', 'daily'}.
+        """
+        if hourly_days < raw_days:
+            raise ValueError('hourly_days must not be shorter than raw_days')
+        day = (now or datetime.now()).replace(hour=0, minute=0, second=0, microsecond=0)
+        # Reason: day-aligned cutoffs never split an hour or a day between
+        # two compactions, so segments are complete when first written.
+        raw_cutoff = (day - timedelta(days=raw_days)).strftime(self._TIME_FORMAT)
+        hourly_cutoff = (day - timedelta(days=hourly_days)).strftime(self._TIME_FORMAT)
+
+        with self._db.write() as conn:
+            duplicates = conn.execute(
+                'DELETE FROM readings WHERE rowid NOT IN '
+                '(SELECT MIN(rowid) FROM readings GROUP BY device, bank, messageTime)'
+            ).rowcount
+            conn.execute(
+                "INSERT INTO segments (device, bank, tier, start, count, mean, min, max) "
+                "SELECT device, bank, '1H', substr(messageTime, 1, 13) || ':00:00', "
+                "COUNT(*), AVG(content), MIN(content), MAX(content) "
+                "FROM readings WHERE messageTime < ? AND content IS NOT NULL "
+                "GROUP BY device, bank, substr(messageTime, 1, 13)" + self._SEGMENT_UPSERT,
+                (raw_cutoff,),
+            )
+            hourly = conn.execute('DELETE FROM readings WHERE messageTime < ?', (raw_cutoff,)).rowcount
+            conn.execute(
+                "INSERT INTO segments (device, bank, tier, start, count, mean, min, max) "
+                "SELECT device, bank, '1D', substr(start, 1, 10) || 'T00:00:00', "
+                "SUM(count), SUM(mean * count) / SUM(count), MIN(min), MAX(max) "
+                "FROM segments WHERE tier = '1H' AND start < ? "
+                "GROUP BY device, bank, substr(start, 1, 10)" + self._SEGMENT_UPSERT,
+                (hourly_cutoff,),
+            )
+            daily = conn.execute("DELETE FROM segments WHERE tier = '1H' AND start < ?", (hourly_cutoff,)).rowcount
+        return {'duplicates': duplicates, 'hourly': hourly, 'daily': daily}
+
+    def rename_device(self, old, new):
+        """
+        Move every reading of device `old` to device `new`.
+
+        Returns:
+            int: Number of readings moved.
+        """
+        if old == new:
+            return 0
+        with self._db.write() as conn:
+            conn.execute('UPDATE segments SET device = ? WHERE device = ?', (new, old))
+            return conn.execute('UPDATE readings SET device = ? WHERE device = ?', (new, old)).rowcount
+
+    def count(self):
+        return self._db.read('SELECT COUNT(*) FROM readings')[0][0]
+
+    def migrate_csv(self, csv_path):
+        """
+        One-shot import of a legacy data_log.csv. The import is recorded in
+        the meta table so restarts do not duplicate the history.
+
+        Args:
+            csv_path (str): Path to the legacy 'messageTime,bank,lastChange,content' log.
+
+        Returns:
+            int: Number of rows imported (0 if already migrated or absent).
+        """
+        done = self._db.read("SELECT value FROM meta WHERE key = 'csv_migrated'")
+        if done or not os.path.exists(csv_path):
+            return 0
+
+        with open(csv_path, 'r', newline='') as file:
+            reader = csv.DictReader(file)
+            rows = (
+                (row.get('messageTime'), row.get('bank'), row.get('lastChange'), row.get('content'))
+                for row in reader
+            )
+            normalised = [r for r in (self._normalise(*row) for row in rows) if r is not None]
+
+        with self._db.write() as conn:
+            conn.executemany(
+                'INSERT INTO readings (messageTime, bank, lastChange, content) VALUES (?, ?, ?, ?)',
+                normalised,
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('csv_migrated', ?)",
+                (datetime.now().isoformat(),),
+            )
+        logging.info(f"Migrated {len(normalised)} readings from {csv_path} into {self.db_path}")
+        return len(normalised)
+
+    def close(self):
+        self._db.close()
+
+
+class ReadingsWindow():
+    """
+    Bounded, array-backed ring buffer of the recent readings of one bank.
+
+    Holds at most `capacity` readings no older than `max_age`, so memory use
+    is fixed however long the process runs. The oldest reading is
+    overwritten when the buffer is full.
+    """
+
+    def __init__(self, capacity=4096, max_age=timedelta(days=31)):
+        self.capacity = capacity
+        self.max_age = max_age
+        self._times = np.empty(capacity, dtype='datetime64[s]')
+        self._last_changes = np.empty(capacity, dtype='datetime64[s]')
+        self._contents = np.empty(capacity, dtype='float64')
+        self._start = 0
+        self._size = 0
+        # Earliest time from which the buffer is known to hold every reading
+        self.horizon = None
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self._size
+
+    def load(self, rows, since):
+        """
+        Fill the buffer from (messageTime, lastChange, content) rows ordered
+        oldest first, typically the tail of the readings store.
+
+        Args:
+            rows (list): Readings as returned by ReadingsStore.range().
+            since (datetime): Lower bound the rows were selected with.
+        """
+        with self._lock:
+            self._start = 0
+            self._size = 0
+            self.horizon = since
+        for message_time, last_change, content in rows:
+            self.append(message_time, last_change, content)
+
+    def append(self, message_time, last_change, content):
+        last_change = parse_message_time(last_change) if isinstance(last_change, str) else last_change
+        with self._lock:
+            end = (self._start + self._size) % self.capacity
+            if self._size == self.capacity:
+                # Reason: evicting the oldest reading means the buffer no
+                # longer covers anything before the next-oldest one.
+                self._start = (self._start + 1) % self.capacity
+                self.horizon = self._times[self._start].astype(datetime)
+            else:
+                self._size += 1
+            self._times[end] = np.datetime64(message_time, 's')
+            self._last_changes[end] = np.datetime64(last_change, 's') if last_change else np.datetime64('NaT')
+            self._contents[end] = np.nan if content is None else content
+
+    def trim(self, now=None):
+        """Drop readings older than max_age."""
+        cutoff = (now or datetime.now()) - self.max_age
+        limit = np.datetime64(cutoff, 's')
+        with self._lock:
+            while self._size and self._times[self._start] < limit:
+                self._start = (self._start + 1) % self.capacity
+                self._size -= 1
+            if self.horizon is None or self.horizon < cutoff:
+                self.horizon = cutoff
+
+    def covers(self, start):
+        """True if every stored reading at or after `start` is in the buffer."""
+        return self.horizon is not None and start >= self.horizon
+
+    def _ordered(self):
+        idx = (self._start + np.arange(self._size)) % self.capacity
+        return self._times[idx], self._last_changes[idx], self._contents[idx]
+
+    def snapshot(self, start=None):
+        """
+        Copy out the buffered readings at or after `start`, oldest first.
+
+        Returns:
+            tuple: (times, contents) numpy arrays (datetime64[s], float64).
+        """
+        with self._lock:
+            times, _, contents = self._ordered()
+        if start is not None:
+            keep = times >= np.datetime64(start, 's')
+            times, contents = times[keep], contents[keep]
+        if len(times) > 1 and np.any(times[1:] < times[:-1]):
+            order = np.argsort(times, kind='stable')
+            times, contents = times[order], contents[order]
+        return times, contents
+
+    def last(self):
+        """
+        Returns:
+            tuple | None: (messageTime, lastChange, content) of the most
+            recent reading, or None if the buffer is empty.
+        """
+        with self._lock:
+            if not self._size:
+                return None
+            i = (self._start + self._size - 1) % self.capacity
+            last_change = self._last_changes[i]
+            return (
+                self._times[i].astype(datetime),
+                None if np.isnat(last_change) else last_change.astype(datetime),
+                None if np.isnan(self._contents[i]) else float(self._contents[i]),
+            )
+
+
+class DepletionEstimator():
+    """
+    Streaming usage rate of one bank: a linear regression of contents on
+    time with exponentially decaying weights, updated in O(1) per reading
+    from five running sums, so the forecast never rescans the history.
+
+    A rise of more than `refill_jump` percent is a cylinder swap and
+    restarts the fit. The sums are kept relative to the latest reading's
+    time, so they stay small however long the process runs.
+    """
+
+    def __init__(self, half_life=timedelta(hours=24), refill_jump=5.0):
+        """
+        Args:
+            half_life (timedelta): Age at which a reading counts half as
+                much as the latest one.
+            refill_jump (float): Rise in percent treated as a refill.
+        """
+        self.half_life = half_life.total_seconds() / 3600
+        self.refill_jump = refill_jump
+        self.reset()
+
+    def reset(self):
+        self.last_time = None
+        self.last_content = None
+        self.samples = 0
+        # Weighted sums of 1, t, y, t^2 and t*y, with t in hours before
+        # the latest reading
+        self._w = self._t = self._y = self._tt = self._ty = 0.0
+
+    def update(self, when, content):
+        """
+        Add one reading. Missing contents and readings not newer than the
+        latest one are ignored.
+        """
+        if content is None or (self.last_time is not None and when <= self.last_time):
+            return
+        if self.last_content is not None and content - self.last_content > self.refill_jump:
+            self.reset()
+        if self.last_time is not None:
+            # Decay the sums and move their origin forward by `shift` hours
+            shift = (when - self.last_time).total_seconds() / 3600
+            decay = 0.5 ** (shift / self.half_life)
+            self._tt = decay * (self._tt - 2 * shift * self._t + shift * shift * self._w)
+            self._ty = decay * (self._ty - shift * self._y)
+            self._t = decay * (self._t - shift * self._w)
+            self._y *= decay
+            self._w *= decay
+        self._w += 1
+        self._y += content
+        self.last_time = when
+        self.last_content = content
+        self.samples += 1
+
+    @property
+    def rate(self):
+        """
+        Returns:
+            float | None: Percent used per hour (negative while the contents
+            rise), or None before two readings since the last refill.
+        """
+        spread = self._w * self._tt - self._t * self._t
+        if self.samples < 2 or spread <= 1e-9:
+            return None
+        rate = -(self._w * self._ty - self._t * self._y) / spread
+        # Reason: a constant series leaves rounding residue in the sums
+        return rate if abs(rate) > 1e-6 else 0.0
+
+    def time_to(self, level):
+        """
+        Returns:
+            datetime | None: When the contents are projected to reach
+            `level` at the current rate, or None if the bank is not being
+            drawn down (or so slowly that it would take over ten years).
+        """
+        rate = self.rate
+        if rate is None or rate <= 0:
+            return None
+        hours = max(0.0, (self.last_content - level) / rate)
+        if hours > 24 * 3650:
+            return None
+        return self.last_time + timedelta(hours=hours)
+
+    def forecast(self, threshold):
+        """
+        Returns:
+            dict: 'usagePerHour' in percent, and the projected ISO times
+            'thresholdAt' (the alert, i.e. when to order by) and 'emptyAt';
+            None where unknown.
+        """
+        rate = self.rate
+
+        def iso(when):
+            return when.isoformat(timespec='minutes') if when else None
+
+        return {
+            'usagePerHour': round(rate, 3) if rate is not None else None,
+            'thresholdAt': iso(self.time_to(threshold)),
+            'emptyAt': iso(self.time_to(0)),
+        }
+
+
+class AlertLedger():
+    """
+    In-memory index over last_alert.log, loaded once and then kept current
+    by append(), so the dashboard, the plot and every poll read alerts
+    without rescanning the file. It keeps the orders of each device sorted
+    by time, the last alert per (device, bank) and a usage count per PO.
+
+    An edit made to the file by anything but append() is detected by its
+    mtime and size on the next read, and the index is rebuilt from disk.
+    """
+    def __init__(self, path, default_device=_DEFAULT_DEVICE):
+        """
+        Args:
+            path (str): The last_alert.log file.
+            default_device (str): Device of lines recorded without one.
+        """
+        self.path = path
+        self.default_device = default_device
+        # Bumped on every change, so cached renders can compare versions
+        self.version = 0
+        self._signature = None
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._times = {}       # device -> sorted alert times
+        self._orders = {}      # device -> (time, bank, po) in the same order
+        self._last = {}        # (device, bank) -> most recent alert time
+        self._po_usage = {}    # po -> number of alerts charged to it
+
+    def _stat(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def _index(self, when, bank, po, device):
+        times = self._times.setdefault(device, [])
+        orders = self._orders.setdefault(device, [])
+        # Reason: appends are nearly always the newest entry, so this is an
+        # O(1) insert at the end; bisect only matters for edited files.
+        i = bisect_right(times, when)
+        times.insert(i, when)
+        orders.insert(i, (when, bank, po))
+        last = self._last.get((device, bank))
+        if last is None or when > last:
+            self._last[(device, bank)] = when
+        if po:
+            self._po_usage[po] = self._po_usage.get(po, 0) + 1
+
+    def _refresh(self):
+        signature = self._stat()
+        if signature == self._signature:
+            return
+        self._reset()
+        if signature is not None:
+            with open(self.path, 'r') as file:
+                for line in file:
+                    entry = parse_alert_line(line)
+                    if entry is not None:
+                        when, bank, po, device = entry
+                        self._index(when, bank, po, device or self.default_device)
+                        continue
+                    # Reason: PO usage never depended on the timestamp, so a
+                    # line with a malformed time still counts against its PO.
+                    parts = line.strip().split(',')
+                    if len(parts) >= 3 and parts[2]:
+                        self._po_usage[parts[2]] = self._po_usage.get(parts[2], 0) + 1
+        self._signature = signature
+        self.version += 1
+
+    def refresh(self):
+        """
+        Rebuild the index if the file changed on disk since it was read.
+
+        Returns:
+            int: The ledger version.
+        """
+        with self._lock:
+            self._refresh()
+            return self.version
+
+    def append(self, when, bank, po, device=None):
+        """
+        Record an alert: append it to the file and index it in place.
+
+        Args:
+            when (datetime): Alert time; stored to the minute.
+            bank (str): Bank the order was placed for.
+            po (str): PO number charged.
+            device (str | None): Manifold; None or the default device is
+                written without a device column.
+        """
+        when = when.replace(second=0, microsecond=0)
+        device = device or self.default_device
+        line = format_alert_line(when, bank, po, device)
+        with self._lock:
+            self._refresh()
+            expected_size = (self._signature[1] if self._signature else 0) + len(line.encode('utf-8'))
+            with open(self.path, 'a') as file:
+                file.write(line)
+            self._index(when, bank, po, device)
+            signature = self._stat()
+            # Only adopt the new signature if nobody else wrote meanwhile;
+            # otherwise the next read rebuilds the index from disk.
+            self._signature = signature if signature and signature[1] == expected_size else None
+            self.version += 1
+
+    def orders(self, device=None, start=None):
+        """
+        Return the orders of `device`, oldest first.
+
+        Args:
+            device (str | None): Manifold; the default device for None.
+            start (datetime | None): Only orders at or after this time.
+
+        Returns:
+            list: (datetime, bank, po) tuples; po is None for lines recorded
+            before POs were logged.
+        """
+        device = device or self.default_device
+        with self._lock:
+            self._refresh()
+            orders = self._orders.get(device, [])
+            if start is None:
+                return list(orders)
+            return orders[bisect_left(self._times.get(device, []), start):]
+
+    def last_order(self, device=None):
+        """Return the most recent (datetime, bank, po) of `device`, or None."""
+        with self._lock:
+            self._refresh()
+            orders = self._orders.get(device or self.default_device)
+            return orders[-1] if orders else None
+
+    def last_alert(self, bank, device=None):
+        """Return the time of the most recent alert for `bank`, or None."""
+        with self._lock:
+            self._refresh()
+            return self._last.get((device or self.default_device, bank))
+
+    def po_usage(self):
+        """Return {po: number of alerts charged to it} across all devices."""
+        with self._lock:
+            self._refresh()
+            return dict(self._po_usage)
+
+
+class RunningMedian():
+    """
+    Median of a growing series in O(log n) per value, with two heaps: a
+    max-heap of the lower half and a min-heap of the upper half.
+    """
+    def __init__(self, values=()):
+        self._low = []      # negated, so the largest is on top
+        self._high = []
+        for value in values:
+            self.add(value)
+
+    def __len__(self):
+        return len(self._low) + len(self._high)
+
+    def add(self, value):
+        if self._low and value > -self._low[0]:
+            heapq.heappush(self._high, value)
+        else:
+            heapq.heappush(self._low, -value)
+        # Keep the lower half equal to or one larger than the upper half
+        if len(self._low) > len(self._high) + 1:
+            heapq.heappush(self._high, -heapq.heappop(self._low))
+        elif len(self._high) > len(self._low):
+            heapq.heappush(self._low, -heapq.heappop(self._high))
+
+    @property
+    def median(self):
+        """The median, or None while empty."""
+        if not self._low:
+            return None
+        if len(self._low) > len(self._high):
+            return -self._low[0]
+        return (-self._low[0] + self._high[0]) / 2
+
+
+class OrderStats():
+    """
+    Order history of one manifold with its statistics kept up to date as
+    orders come in: the orders sorted by time with the days since the
+    previous same-bank order precomputed, and a running median of those
+    intervals per bank. Adding the newest order is O(log n); reading a
+    time window is O(log n + orders in it).
+    """
+    def __init__(self, orders=(), version=None):
+        """
+        Args:
+            orders (iterable): (datetime, bank, ...) tuples, oldest first.
+            version (int | None): Ledger version the orders were read at.
+        """
+        self.version = version
+        self._load(orders)
+
+    def _load(self, orders):
+        self._times = []
+        self._orders = []       # (datetime, bank, days_since_previous_same_bank)
+        self._last = {}         # bank -> time of its latest order
+        self._medians = {}      # bank -> RunningMedian of the intervals in days
+        for order in orders:
+            self.add(order[0], order[1])
+
+    def __len__(self):
+        return len(self._orders)
+
+    def add(self, when, bank):
+        """Record an order. Orders older than the latest one re-index the rest."""
+        if self._times and when < self._times[-1]:
+            # Reason: a back-dated order changes the interval of the next
+            # same-bank order, so the rare out-of-order case rebuilds
+            orders = [(dt, b) for dt, b, _ in self._orders]
+            orders.insert(bisect_right(self._times, when), (when, bank))
+            self._load(orders)
+            return
+        prev = self._last.get(bank)
+        days_since = (when - prev).total_seconds() / 86400 if prev else None
+        self._times.append(when)
+        self._orders.append((when, bank, days_since))
+        self._last[bank] = when
+        if days_since is not None:
+            self._medians.setdefault(bank, RunningMedian()).add(days_since)
+
+    def orders(self, start=None, end=None):
+        """Return (datetime, bank, days_since) tuples in [start, end), oldest first."""
+        lo = bisect_left(self._times, start) if start is not None else 0
+        hi = bisect_left(self._times, end) if end is not None else len(self._times)
+        return self._orders[lo:hi]
+
+    def median(self, bank):
+        """Median days between consecutive orders of `bank`, or None."""
+        running = self._medians.get(bank)
+        return running.median if running is not None else None
+
+
+class SQLiteLedger():
+    """
+    AlertLedger backed by an indexed `orders` table instead of
+    last_alert.log, for the sqlite storage engine. Every read is an index
+    lookup, and in WAL mode never waits for the collector's writes.
+    """
+    _TIME_FORMAT = '%Y-%m-%dT%H:%M:%S'
+
+    def __init__(self, db_path, default_device=_DEFAULT_DEVICE, wal=True):
+        self.default_device = default_device
+        self.version = 0
+        self._db = SQLiteConnections(db_path, wal=wal)
+        with self._db.write() as conn:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS orders ('
+                'time TEXT NOT NULL, bank TEXT NOT NULL, po TEXT, device TEXT NOT NULL)'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_orders_device_time ON orders (device, time)')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_orders_device_bank_time ON orders (device, bank, time)')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_orders_po ON orders (po)')
+            conn.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)')
+            self._last_rowid = self._max_rowid(conn)
+
+    @staticmethod
+    def _max_rowid(conn):
+        return conn.execute('SELECT MAX(rowid) FROM orders').fetchone()[0]
+
+    def refresh(self):
+        """
+        Returns:
+            int: The ledger version, bumped by appends and by orders inserted
+            from other connections (such as a migration run meanwhile).
+        """
+        # Reason: orders are only ever inserted, so the last rowid tracks
+        # them; PRAGMA data_version would also move with every commit of the
+        # readings and staleness tables sharing the database file
+        with self._db.lock:
+            last_rowid = self._max_rowid(self._db.writer)
+            if last_rowid != self._last_rowid:
+                self._last_rowid = last_rowid
+                self.version += 1
+            return self.version
+
+    def append(self, when, bank, po, device=None):
+        """Record an alert; see AlertLedger.append."""
+        when = when.replace(second=0, microsecond=0)
+        with self._db.write() as conn:
+            conn.execute('INSERT INTO orders (time, bank, po, device) VALUES (?, ?, ?, ?)',
+                         (when.strftime(self._TIME_FORMAT), bank, po, device or self.default_device))
+            # Reason: adopted only if nobody else inserted meanwhile, so
+            # their orders still bump the version on the next refresh
+            last_rowid = self._max_rowid(conn)
+            if (self._last_rowid or 0) == last_rowid - 1:
+                self._last_rowid = last_rowid
+        self.version += 1
+
+    def orders(self, device=None, start=None):
+        """Return the orders of `device`, oldest first; see AlertLedger.orders."""
+        sql = 'SELECT time, bank, po FROM orders WHERE device = ?'
+        params = [device or self.default_device]
+        if start is not None:
+            sql += ' AND time >= ?'
+            params.append(start.strftime(self._TIME_FORMAT))
+        rows = self._db.read(sql + ' ORDER BY time, rowid', params)
+        return [(datetime.strptime(t, self._TIME_FORMAT), bank, po) for t, bank, po in rows]
+
+    def last_order(self, device=None):
+        """Return the most recent (datetime, bank, po) of `device`, or None."""
+        rows = self._db.read('SELECT time, bank, po FROM orders WHERE device = ? '
+                             'ORDER BY time DESC, rowid DESC LIMIT 1', (device or self.default_device,))
+        if not rows:
+            return None
+        t, bank, po = rows[0]
+        return datetime.strptime(t, self._TIME_FORMAT), bank, po
+
+    def last_alert(self, bank, device=None):
+        """Return the time of the most recent alert for `bank`, or None."""
+        row = self._db.read('SELECT MAX(time) FROM orders WHERE device = ? AND bank = ?',
+                            (device or self.default_device, bank))[0]
+        return datetime.strptime(row[0], self._TIME_FORMAT) if row[0] else None
+
+    def po_usage(self):
+        """Return {po: number of alerts charged to it} across all devices."""
+        return dict(self._db.read('SELECT po, COUNT(*) FROM orders WHERE po IS NOT NULL GROUP BY po'))
+
+    def import_log(self, path):
+        """
+        One-shot import of a last_alert.log. Lines without a device are
+        recorded for the default device; lines with a malformed time are
+        skipped.
+
+        Returns:
+            int: Number of orders imported (0 if already imported or absent).
+        """
+        rows = _import_alert_log(self._db, path, 'alerts_migrated', self._TIME_FORMAT, self.default_device)
+        if rows is None:
+            return 0
+        with self._db.write() as conn:
+            conn.executemany('INSERT INTO orders (time, bank, po, device) VALUES (?, ?, ?, ?)', rows)
+            _mark_imported(conn, 'alerts_migrated')
+            self._last_rowid = self._max_rowid(conn)
+        self.version += 1
+        logging.info(f"Migrated {len(rows)} orders from {path} into {self._db.db_path}")
+        return len(rows)
+
+
+class StalenessLog():
+    """
+    staleness_alert.log: one line per data staleness alert, holding the
+    time, the bank, the days without new data and, for configured
+    manifolds, the device. It is written at most a few times a day, so
+    reads simply scan it.
+    """
+    def __init__(self, path, default_device=_DEFAULT_DEVICE):
+        self.path = path
+        self.default_device = default_device
+
+    def record(self, when, bank, days, device=None):
+        """Append a staleness alert for `bank` of `device`."""
+        with open(self.path, 'a') as file:
+            file.write(format_alert_line(when, bank, days, device or self.default_device))
+
+    def last_sent(self, device=None):
+        """Return the time of the most recent staleness alert of `device`, or None."""
+        device = device or self.default_device
+        last = None
+        if not os.path.exists(self.path):
+            return last
+        with open(self.path, 'r') as file:
+            for line in file:
+                entry = parse_alert_line(line)
+                if entry is not None and (entry[3] or self.default_device) == device:
+                    last = entry[0] if last is None else max(last, entry[0])
+        return last
+
+
+class SQLiteStalenessLog():
+    """
+    StalenessLog backed by an indexed `staleness_alerts` table, for the
+    sqlite storage engine.
+    """
+    _TIME_FORMAT = '%Y-%m-%dT%H:%M:%S'
+
+    def __init__(self, db_path, default_device=_DEFAULT_DEVICE, wal=True):
+        self.default_device = default_device
+        self._db = SQLiteConnections(db_path, wal=wal)
+        with self._db.write() as conn:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS staleness_alerts ('
+                'time TEXT NOT NULL, bank TEXT NOT NULL, days INTEGER, device TEXT NOT NULL)'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_staleness_device_time ON staleness_alerts (device, time)')
+            conn.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)')
+
+    def record(self, when, bank, days, device=None):
+        """Record a staleness alert for `bank` of `device`."""
+        with self._db.write() as conn:
+            conn.execute('INSERT INTO staleness_alerts (time, bank, days, device) VALUES (?, ?, ?, ?)',
+                         (when.strftime(self._TIME_FORMAT), bank, days, device or self.default_device))
+
+    def last_sent(self, device=None):
+        """Return the time of the most recent staleness alert of `device`, or None."""
+        row = self._db.read('SELECT MAX(time) FROM staleness_alerts WHERE device = ?',
+                            (device or self.default_device,))[0]
+        return datetime.strptime(row[0], self._TIME_FORMAT) if row[0] else None
+
+    def import_log(self, path):
+        """
+        One-shot import of a staleness_alert.log.
+
+        Returns:
+            int: Number of alerts imported (0 if already imported or absent).
+        """
+        rows = _import_alert_log(self._db, path, 'staleness_migrated', self._TIME_FORMAT, self.default_device)
+        if rows is None:
+            return 0
+        with self._db.write() as conn:
+            conn.executemany('INSERT INTO staleness_alerts (time, bank, days, device) VALUES (?, ?, ?, ?)', rows)
+            _mark_imported(conn, 'staleness_migrated')
+        logging.info(f"Migrated {len(rows)} staleness alerts from {path} into {self._db.db_path}")
+        return len(rows)
+
+
+def _import_alert_log(db, path, meta_key, time_format, default_device):
+    """
+    Read a text alert log for a one-shot import into SQLite.
+
+    Returns:
+        list | None: (time, bank, extra, device) rows, or None if the log was
+        already imported (per the meta table) or does not exist.
+    """
+    if db.read('SELECT value FROM meta WHERE key = ?', (meta_key,)) or not os.path.exists(path):
+        return None
+    rows = []
+    with open(path, 'r') as file:
+        for line in file:
+            entry = parse_alert_line(line)
+            if entry is not None:
+                when, bank, extra, device = entry
+                rows.append((when.strftime(time_format), bank, extra, device or default_device))
+    return rows
+
+
+def _mark_imported(conn, meta_key):
+    conn.execute('INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)', (meta_key, datetime.now().isoformat()))
+
+
+_INTERVAL_UNITS = {'min': 60, 'h': 3600, 'd': 86400, 'w': 7 * 86400}
+
+
+def parse_interval(value):
+    """
+    Parse a resampling interval such as '30min', '3H', '1D' or '2W'
+    (pandas-style offset aliases, case-insensitive).
+
+    Returns:
+        int: The interval in seconds.
+
+    Raises:
+        ValueError: If the value is not a positive interval.
+    """
+    match = re.fullmatch(r'\s*(\d*)\s*(min|h|d|w)\s*', value or '', re.IGNORECASE)
+    if not match:
+        raise ValueError(f"Invalid resampling interval: {value!r}")
+    count = int(match.group(1) or 1)
+    if count <= 0:
+        raise ValueError(f"Invalid resampling interval: {value!r}")
+    return count * _INTERVAL_UNITS[match.group(2).lower()]
+
+
+def parse_query_time(value):
+    """
+    Parse a `from`/`to` query parameter: an ISO date or datetime, None if
+    empty. A UTC offset is converted to the server's local time, which the
+    manifold timestamps are compared in.
+
+    Returns:
+        datetime | None: A naive datetime.
+
+    Raises:
+        ValueError: If the value is not an ISO date or datetime, or falls
+            outside the datetime range once converted.
+    """
+    if not value:
+        return None
+    when = datetime.fromisoformat(value)
+    if when.tzinfo is not None:
+        try:
+            when = when.astimezone().replace(tzinfo=None)
+        except OverflowError:
+            raise ValueError(f"{value!r} is out of range in local time")
+    return when
+
+
+def auto_interval(days, max_points=400):
+    """
+    Pick a resampling interval for a `days` window so the plot draws at most
+    about `max_points` buckets, or None if hourly polling already fits.
+    """
+    for interval in ('1H', '3H', '6H', '12H', '1D', '2D', '1W'):
+        if days * 86400 / parse_interval(interval) <= max_points:
+            return None if interval == '1H' else interval
+    return '2W'
+
+
+def resample_buckets(times, values, interval, lows=None, highs=None):
+    """
+    Aggregate a series into fixed time buckets of `interval` seconds,
+    aligned to the epoch, returning mean/min/max per non-empty bucket.
+    Fully vectorised with ufunc.reduceat.
+
+    Args:
+        times (np.ndarray): Sample times (datetime64[s]), sorted.
+        values (np.ndarray): Sample values; NaNs are ignored.
+        interval (int): Bucket width in seconds.
+        lows, highs (np.ndarray | None): Per-sample minimum and maximum,
+            for samples that are themselves aggregates (compacted
+            segments); default to the values.
+
+    Returns:
+        tuple: (bucket_starts, means, mins, maxs) numpy arrays.
+    """
+    keep = ~np.isnan(values)
+    seconds = times[keep].astype('int64')
+    values = values[keep]
+    lows = values if lows is None else lows[keep]
+    highs = values if highs is None else highs[keep]
+    if not len(values):
+        empty = np.empty(0, dtype='float64')
+        return np.empty(0, dtype='datetime64[s]'), empty, empty, empty
+    buckets = seconds // interval
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    counts = np.diff(np.r_[starts, len(values)])
+    means = np.add.reduceat(values, starts) / counts
+    mins = np.minimum.reduceat(lows, starts)
+    maxs = np.maximum.reduceat(highs, starts)
+    return (buckets[starts] * interval).astype('datetime64[s]'), means, mins, maxs
+
+
+def downsample_minmax(times, values, points):
+    """
+    Reduce a series to at most `points` samples by min/max bucketing: the
+    series is split into points // 2 equal-count buckets and the minimum
+    and maximum of each bucket are kept, in time order. Peaks and troughs
+    (cylinder swaps, sudden drops) survive the reduction, unlike with plain
+    decimation. Fully vectorised, O(n log n).
+
+    Args:
+        times (np.ndarray): Sample times, sorted.
+        values (np.ndarray): Sample values; NaNs are dropped first.
+        points (int): Maximum number of samples to return.
+
+    Returns:
+        tuple: (times, values) numpy arrays.
+    """
+    keep = ~np.isnan(values)
+    times, values = times[keep], values[keep]
+    n = len(values)
+    buckets = max(1, points // 2)
+    if n <= points or n <= buckets:
+        return times, values
+
+    edges = np.linspace(0, n, buckets + 1).astype('int64')
+    bucket_of = np.repeat(np.arange(buckets), np.diff(edges))
+    # Sorting by (bucket, value) puts each bucket's min first and max last
+    order = np.lexsort((values, bucket_of))
+    picked = np.unique(np.concatenate([order[edges[:-1]], order[edges[1:] - 1]]))
+    return times[picked], values[picked]
+
+
+def parse_manifold_csv(lines, id_field='serialNumber', wanted_ids=None):
+    """
+    Incrementally parse the Digital Manifold CSV export, keeping only the
+    rows of the devices we monitor. Rows are consumed one at a time and
+    discarded unless selected, so memory does not grow with the size of
+    the country-wide export.
+
+    Args:
+        lines (iterable): Decoded CSV lines, e.g. response.iter_lines().
+        id_field (str): Column identifying a device.
+        wanted_ids (iterable | None): Device IDs to keep. If empty or None,
+            only the device with the lowest ID is kept, so the choice is
+            deterministic however the export is ordered.
+
+    Returns:
+        dict: {device_id: row dict}; for a device reported on several rows,
+        the last one wins.
+    """
+    wanted = set(wanted_ids or ())
+    reader = csv.reader(lines)
+    header = next(reader, None)
+    if not header:
+        return {}
+    header[0] = header[0].lstrip('\ufeff')
+    id_index = header.index(id_field) if id_field in header else None
+
+    devices = {}
+    for values in reader:
+        if not values:
+            continue
+        device_id = values[id_index] if id_index is not None and id_index < len(values) else ''
+        if wanted:
+            if device_id in wanted:
+                devices[device_id] = dict(zip(header, values))
+        elif not devices or device_id <= next(iter(devices)):
+            devices = {device_id: dict(zip(header, values))}
+    return devices
+
+
+class RenderCache():
+    """
+    Cache of rendered artefacts keyed by request parameters. Each entry is
+    stamped with the version of the inputs it was rendered from; a lookup
+    with a different version is a miss, so invalidation happens simply by
+    bumping a generation counter. With `maxsize` set, the least recently
+    used key is evicted once the cache is full.
+    """
+
+    def __init__(self, maxsize=None):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, version):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry['version'] != version:
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key, version, body, content_type):
+        """
+        Store a rendered body and return its cache entry, including the
+        ETag (a digest of the body, so it stays valid across restarts) and
+        the Last-Modified timestamp.
+        """
+        entry = {
+            'version': version,
+            'body': body,
+            'content_type': content_type,
+            'etag': '"' + hashlib.sha1(body).hexdigest()[:20] + '"',
+            'last_modified': formatdate(time.time(), usegmt=True),
+        }
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            if self.maxsize is not None:
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+        return entry
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class SingleFlight():
+    """
+    Coalesce concurrent calls that share a key: the first caller does the
+    work and everyone who arrives while it is running waits for, and
+    receives, the same result (or exception).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn, timeout=None):
+        """
+        Run fn() for `key`, or wait for the call already in flight.
+
+        Raises:
+            TimeoutError: If a waiter gives up after `timeout` seconds.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = {'done': threading.Event(), 'result': None, 'error': None}
+                self._calls[key] = call
+
+        if not leader:
+            if not call['done'].wait(timeout):
+                raise TimeoutError(f"Timed out waiting for {key!r}")
+            if call['error'] is not None:
+                raise call['error']
+            return call['result']
+
+        try:
+            call['result'] = fn()
+        except Exception as e:
+            call['error'] = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call['done'].set()
+        return call['result']
+
+
+class RendererPool():
+    """
+    Small pool of worker processes that render plots, keeping matplotlib and
+    its memory growth out of the web process. Workers are recycled after
+    `max_jobs_per_worker` renders to cap their RSS, and at most
+    `processes + max_queued` jobs may be outstanding at once.
+    """
+
+    def __init__(self, processes=_DEFAULT_RENDER_WORKERS, max_jobs_per_worker=_DEFAULT_RENDER_RECYCLE,
+                 max_queued=8, render_timeout=_DEFAULT_RENDER_TIMEOUT):
+        # Reason: spawn rather than fork, so workers do not inherit the
+        # server's threads, locks and open SQLite connection.
+        context = multiprocessing.get_context('spawn')
+        self._pool = context.Pool(processes, maxtasksperchild=max_jobs_per_worker)
+        self._slots = threading.BoundedSemaphore(processes + max_queued)
+        self.render_timeout = render_timeout
+
+    def render(self, job, timeout=None):
+        """
+        Render a plot job in a worker process.
+
+        Args:
+            job (dict): Plot job for plot_renderer.render_plot.
+            timeout (float | None): Seconds to wait; at most, and by
+                default, `render_timeout`.
+
+        Raises:
+            TimeoutError: If the queue stays full, or the render does not
+            finish, within the timeout.
+        """
+        timeout = self.render_timeout if timeout is None else min(timeout, self.render_timeout)
+        if not self._slots.acquire(timeout=timeout):
+            raise TimeoutError('Renderer queue is full')
+
+        released = []
+        release_lock = threading.Lock()
+
+        def release(_=None):
+            with release_lock:
+                if not released:
+                    released.append(True)
+                    self._slots.release()
+
+        result = self._pool.apply_async(plot_renderer.render_plot, (job,),
+                                        callback=release, error_callback=release)
+        try:
+            return result.get(timeout)
+        except multiprocessing.TimeoutError:
+            # Reason: a job lost with a crashed worker never calls back, so
+            # its slot is given up here rather than leaked
+            release()
+            raise TimeoutError('Timed out waiting for the renderer')
+
+    def close(self):
+        self._pool.terminate()
+        self._pool.join()
+
+
+def render_plot_job(job, timeout=None):
+    """
+    Render a plot job in the renderer pool if one is running, in-process
+    otherwise.
+
+    Returns:
+        bytes: The encoded image.
+    """
+    if _RENDERER is not None:
+        return _RENDERER.render(job, timeout=timeout)
+    if not _RENDER_LOCK.acquire(timeout=-1 if timeout is None else timeout):
+        raise TimeoutError('Timed out waiting for the renderer')
+    try:
+        return plot_renderer.render_plot(job)
+    finally:
+        _RENDER_LOCK.release()
+
+
+class Metrics():
+    """
+    Thread-safe in-process counters and latency summaries, served as JSON
+    at /metrics. Timings keep running totals plus the most recent `window`
+    samples for percentiles, so memory stays bounded.
+    """
+
+    def __init__(self, window=256):
+        self.window = window
+        self._counters = {}
+        self._timings = {}
+        self._lock = threading.Lock()
+
+    def incr(self, name, value=1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def observe(self, name, seconds):
+        with self._lock:
+            timing = self._timings.get(name)
+            if timing is None:
+                timing = self._timings[name] = {
+                    'count': 0, 'total': 0.0, 'max': 0.0, 'last': 0.0,
+                    'recent': deque(maxlen=self.window),
+                }
+            timing['count'] += 1
+            timing['total'] += seconds
+            timing['max'] = max(timing['max'], seconds)
+            timing['last'] = seconds
+            timing['recent'].append(seconds)
+
+    def snapshot(self):
+        """
+        Returns:
+            dict: {'counters': {name: value}, 'timings': {name: summary}}
+            with timing summaries in milliseconds.
+        """
+        with self._lock:
+            counters = dict(self._counters)
+            timings = {}
+            for name, timing in self._timings.items():
+                recent = sorted(timing['recent'])
+
+                def pct(q):
+                    return round(recent[min(len(recent) - 1, int(q * len(recent)))] * 1000, 2)
+
+                timings[name] = {
+                    'count': timing['count'],
+                    'mean_ms': round(timing['total'] / timing['count'] * 1000, 2),
+                    'p50_ms': pct(0.5),
+                    'p95_ms': pct(0.95),
+                    'max_ms': round(timing['max'] * 1000, 2),
+                    'last_ms': round(timing['last'] * 1000, 2),
+                }
+        return {'counters': counters, 'timings': timings}
+
+
+class Scheduler():
+    """
+    Runs named periodic jobs on one background thread, replacing a chain of
+    threading.Timer threads. Jobs are kept in a heap ordered by their next
+    run time:
+
+    - Intervals are drift-corrected: the next run is due one interval after
+      the previous *scheduled* time, not after the previous run finished.
+    - A job that overruns its interval is not run back to back to catch up;
+      the missed runs are counted and it resumes on its schedule.
+    - A job never overlaps itself, including when triggered with run_now().
+    - First runs are spread by a random jitter so jobs added together do
+      not all hit the network at once.
+    - Exceptions are logged and recorded in the job's stats; the job keeps
+      its schedule.
+    """
+
+    def __init__(self, metrics=None, clock=time.monotonic):
+        """
+        Args:
+            metrics (Metrics | None): Receives a 'job <name>' timing per run
+                and a 'job <name> failed' counter per exception.
+            clock (callable): Monotonic time source in seconds.
+        """
+        self.metrics = metrics
+        self.clock = clock
+        self._jobs = {}
+        self._heap = []
+        self._cond = threading.Condition()
+        self._thread = None
+        self._stopping = False
+
+    def add(self, name, func, interval, delay=0.0, jitter=0.0):
+        """
+        Register a periodic job.
+
+        Args:
+            name (str): Unique job name, used in stats and metrics.
+            func (callable): Called without arguments.
+            interval (float): Seconds between scheduled runs.
+            delay (float): Seconds before the first run.
+            jitter (float): Up to this many seconds are added at random to
+                the first run.
+
+        Raises:
+            ValueError: If the name is taken or the interval is not positive.
+        """
+        if name in self._jobs:
+            raise ValueError(f"Job {name!r} is already scheduled")
+        if interval <= 0:
+            raise ValueError(f"Job {name!r} needs a positive interval")
+        with self._cond:
+            job = self._jobs[name] = {
+                'name': name, 'func': func, 'interval': float(interval),
+                'due': self.clock() + delay + random.uniform(0, jitter),
+                'running': False, 'runs': 0, 'failures': 0, 'missed': 0,
+                'last_run': None, 'last_duration': None, 'max_duration': 0.0,
+                'last_error': None,
+            }
+            heapq.heappush(self._heap, (job['due'], name))
+            self._cond.notify()
+
+    def run_now(self, name):
+        """Move a job's next run to now; a no-op while it is running."""
+        with self._cond:
+            job = self._jobs[name]
+            if job['running']:
+                return
+            job['due'] = self.clock()
+            heapq.heappush(self._heap, (job['due'], name))
+            self._cond.notify()
+
+    def set_interval(self, name, interval):
+        """
+        Change a job's interval. Called from the job itself, it takes effect
+        when the run finishes; otherwise the next run moves earlier if the
+        new interval is due sooner.
+        """
+        if interval <= 0:
+            raise ValueError(f"Job {name!r} needs a positive interval")
+        with self._cond:
+            job = self._jobs[name]
+            job['interval'] = float(interval)
+            if job['running'] or job['due'] <= self.clock() + interval:
+                return
+            job['due'] = self.clock() + interval
+            heapq.heappush(self._heap, (job['due'], name))
+            self._cond.notify()
+
+    def _pop_due(self, now):
+        # Reason: run_now() leaves the job's previous heap entry behind;
+        # entries that no longer match the job's due time are stale.
+        while self._heap:
+            due, name = self._heap[0]
+            job = self._jobs[name]
+            if due != job['due']:
+                heapq.heappop(self._heap)
+                continue
+            if due > now:
+                return None
+            heapq.heappop(self._heap)
+            return job
+        return None
+
+    def run_pending(self):
+        """
+        Run every job that is due, one after another.
+
+        Returns:
+            float | None: Seconds until the next job is due, or None if no
+            job is scheduled.
+        """
+        while True:
+            with self._cond:
+                job = self._pop_due(self.clock())
+                if job is None:
+                    return max(0.0, self._heap[0][0] - self.clock()) if self._heap else None
+                job['running'] = True
+            self._run(job)
+
+    def _run(self, job):
+        started = self.clock()
+        error = None
+        try:
+            job['func']()
+        except Exception as e:
+            error = e
+            logging.exception(f"Scheduled job {job['name']} failed")
+        duration = self.clock() - started
+
+        with self._cond:
+            job['running'] = False
+            job['runs'] += 1
+            job['last_run'] = datetime.now()
+            job['last_duration'] = duration
+            job['max_duration'] = max(job['max_duration'], duration)
+            if error is not None:
+                job['failures'] += 1
+                job['last_error'] = f"{type(error).__name__}: {error}"
+            due = job['due'] + job['interval']
+            now = self.clock()
+            if due <= now:
+                skipped = int((now - due) // job['interval']) + 1
+                job['missed'] += skipped
+                due += skipped * job['interval']
+            job['due'] = due
+            heapq.heappush(self._heap, (due, job['name']))
+
+        if self.metrics is not None:
+            self.metrics.observe(f"job {job['name']}", duration)
+            if error is not None:
+                self.metrics.incr(f"job {job['name']} failed")
+
+    def stats(self):
+        """
+        Returns:
+            dict: {name: {...}} with the interval, run and failure counts,
+            missed runs, last run (ISO time), last and max duration in
+            seconds, last error and seconds until the next run.
+        """
+        now = self.clock()
+        with self._cond:
+            return {
+                name: {
+                    'interval': job['interval'],
+                    'running': job['running'],
+                    'runs': job['runs'],
+                    'failures': job['failures'],
+                    'missed': job['missed'],
+                    'lastRun': job['last_run'].isoformat(timespec='seconds') if job['last_run'] else None,
+                    'lastDuration': round(job['last_duration'], 3) if job['last_duration'] is not None else None,
+                    'maxDuration': round(job['max_duration'], 3),
+                    'lastError': job['last_error'],
+                    'nextRunIn': round(max(0.0, job['due'] - now), 1),
+                }
+                for name, job in self._jobs.items()
+            }
+
+    def start(self):
+        """Start the scheduler thread."""
+        self._stopping = False
+        self._thread = threading.Thread(target=self._loop, name='linde-scheduler', daemon=True)
+        self._thread.start()
+
+    def _loop(self):
+        while True:
+            wait = self.run_pending()
+            with self._cond:
+                if self._stopping:
+                    return
+                # Reason: re-checked under the lock, so a job added or
+                # triggered since run_pending() returned is not missed
+                if self._heap and self._heap[0][0] <= self.clock():
+                    continue
+                self._cond.wait(wait)
+                if self._stopping:
+                    return
+
+    def stop(self, timeout=None):
+        """
+        Stop the scheduler thread after the job it is running, if any.
+
+        Args:
+            timeout (float | None): Seconds to wait for it to finish.
+        """
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+
+class EventHub():
+    """
+    Fans Server-Sent Events out to the dashboard's subscribers. A request
+    handler sends the response headers and hands the connection over with
+    attach(); from then on every subscriber is served by one selector
+    thread, so an idle subscriber costs a socket and a buffer rather than
+    a worker thread.
+
+    - publish() only appends to the subscribers' buffers and wakes the
+      selector thread, so it never blocks on a slow client.
+    - A subscriber whose backlog exceeds `max_backlog` is disconnected; the
+      browser reconnects and resumes from the next event.
+    - A comment line is sent every `heartbeat` seconds, so proxies keep
+      idle streams open and dead peers are noticed.
+    """
+
+    def __init__(self, heartbeat=_EVENTS_HEARTBEAT, max_backlog=_EVENTS_MAX_BACKLOG, metrics=None):
+        """
+        Args:
+            heartbeat (float): Seconds between keep-alive comments.
+            max_backlog (int): Bytes a subscriber may fall behind by.
+            metrics (Metrics | None): Receives 'events published' and
+                'events subscribers dropped' counters.
+        """
+        self.heartbeat = heartbeat
+        self.max_backlog = max_backlog
+        self.metrics = metrics
+        self.last_id = 0
+        self._clients = {}
+        self._overflowed = set()
+        self._lock = threading.Lock()
+        self._selector = None
+        self._wakeup = None
+        self._thread = None
+
+    def __len__(self):
+        with self._lock:
+            return len(self._clients)
+
+    def owns(self, sock):
+        """Return whether `sock` was handed over with attach()."""
+        with self._lock:
+            return sock in self._clients
+
+    def attach(self, sock, preamble=b''):
+        """
+        Take over a connection whose response headers have been sent. The
+        server must leave it open once the request handler returns (see
+        EventStreamMixin).
+
+        Args:
+            sock (socket.socket): The client connection.
+            preamble (bytes): Sent before the first event, e.g. a retry
+                field.
+        """
+        sock.setblocking(False)
+        with self._lock:
+            if self._thread is None:
+                self._start()
+            self._clients[sock] = bytearray(preamble)
+        self._wake()
+
+    def publish(self, event, data):
+        """
+        Queue an event for every subscriber.
+
+        Args:
+            event (str): Event type, as listened for by the page.
+            data: JSON-serialisable payload.
+        """
+        with self._lock:
+            self.last_id += 1
+            if not self._clients:
+                return
+            message = (f"id: {self.last_id}\nevent: {event}\n"
+                       f"data: {json.dumps(data, separators=(',', ':'))}\n\n").encode('utf-8')
+            self._queue(message)
+        if self.metrics is not None:
+            self.metrics.incr('events published')
+        self._wake()
+
+    def close(self):
+        """
+        Disconnect every subscriber and stop the selector thread. The hub is
+        not meant to be reused afterwards.
+        """
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._wake()
+            thread.join(5)
+
+    def _queue(self, message):
+        # Called with the lock held
+        for sock, backlog in self._clients.items():
+            if len(backlog) + len(message) > self.max_backlog:
+                self._overflowed.add(sock)
+            else:
+                backlog += message
+
+    def _start(self):
+        # Called with the lock held
+        self._selector = selectors.DefaultSelector()
+        self._wakeup = socket.socketpair()
+        for end in self._wakeup:
+            end.setblocking(False)
+        self._selector.register(self._wakeup[0], selectors.EVENT_READ)
+        self._thread = threading.Thread(target=self._loop, name='linde-events', daemon=True)
+        self._thread.start()
+
+    def _wake(self):
+        if self._wakeup is None:
+            return
+        try:
+            self._wakeup[1].send(b'\0')
+        except OSError:
+            # Reason: a full wake-up socket already guarantees a wake-up
+            pass
+
+    def _loop(self):
+        next_beat = time.monotonic() + self.heartbeat
+        while True:
+            with self._lock:
+                if self._thread is not threading.current_thread():
+                    break
+                for sock in self._overflowed:
+                    self._drop(sock)
+                self._overflowed.clear()
+                # Reason: subscribers are always watched for reading, which
+                # reports the peer closing; for writing only while they
+                # have something queued
+                for sock, backlog in self._clients.items():
+                    events = selectors.EVENT_READ | (selectors.EVENT_WRITE if backlog else 0)
+                    try:
+                        if self._selector.get_key(sock).events != events:
+                            self._selector.modify(sock, events)
+                    except KeyError:
+                        self._selector.register(sock, events)
+            ready = self._selector.select(max(0.0, next_beat - time.monotonic()))
+            with self._lock:
+                for key, mask in ready:
+                    sock = key.fileobj
+                    if sock is self._wakeup[0]:
+                        try:
+                            while sock.recv(4096):
+                                pass
+                        except (BlockingIOError, InterruptedError):
+                            pass
+                    elif sock in self._clients:
+                        self._service(sock, mask)
+                if time.monotonic() >= next_beat:
+                    self._queue(b': ping\n\n')
+                    next_beat = time.monotonic() + self.heartbeat
+        with self._lock:
+            for sock in list(self._clients):
+                self._drop(sock, count=False)
+            self._selector.close()
+            for end in self._wakeup:
+                end.close()
+
+    def _service(self, sock, mask):
+        # Called with the lock held
+        try:
+            if mask & selectors.EVENT_READ and not sock.recv(4096):
+                self._drop(sock, count=False)
+                return
+        except (BlockingIOError, InterruptedError):
+            pass
+        except OSError:
+            self._drop(sock, count=False)
+            return
+        backlog = self._clients[sock]
+        if mask & selectors.EVENT_WRITE and backlog:
+            try:
+                del backlog[:sock.send(backlog)]
+            except (BlockingIOError, InterruptedError):
+                pass
+            except OSError:
+                self._drop(sock, count=False)
+
+    def _drop(self, sock, count=True):
+        # Called with the lock held
+        if self._clients.pop(sock, None) is None:
+            return
+        try:
+            self._selector.unregister(sock)
+        except KeyError:
+            pass
+        sock.close()
+        if count and self.metrics is not None:
+            self.metrics.incr('events subscribers dropped')
+
+
+class LindeHTTPClient():
+    """
+    Shared HTTP client for every Linde endpoint (authentication and the
+    Digital Manifold download). It keeps pooled keep-alive connections,
+    applies connect/read timeouts to every request, and retries transient
+    failures with exponential backoff and full jitter, honouring
+    Retry-After. Each attempt's latency is recorded in `metrics`.
+
+    Only idempotent methods are retried by default: the login POSTs carry
+    single-use authorization codes and credentials, and repeating one after
+    a timeout could burn the code or log in twice.
+    """
+    RETRY_STATUSES = {429, 500, 502, 503, 504}
+    IDEMPOTENT_METHODS = {'GET', 'HEAD', 'OPTIONS'}
+
+    def __init__(self, metrics=None, timeout=(5, 30), max_retries=3, backoff=1.0,
+                 max_backoff=30.0, pool_size=4):
+        self.metrics = metrics or Metrics()
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.sleep = time.sleep
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    @property
+    def cookies(self):
+        return self.session.cookies
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def _retry_delay(self, attempt, response=None):
+        """
+        Seconds to wait before retry number `attempt` (0-based): the
+        server's Retry-After when given, otherwise full-jitter exponential
+        backoff. Both are capped at max_backoff.
+        """
+        retry_after = response.headers.get('Retry-After') if response is not None else None
+        if retry_after:
+            try:
+                delay = float(retry_after)
+            except ValueError:
+                try:
+                    retry_at = parsedate_to_datetime(retry_after)
+                    delay = (retry_at - datetime.now(retry_at.tzinfo)).total_seconds()
+                except (TypeError, ValueError):
+                    delay = None
+            if delay is not None:
+                return min(max(delay, 0.0), self.max_backoff)
+        return random.uniform(0, min(self.max_backoff, self.backoff * (2 ** attempt)))
+
+    def request(self, method, url, retry=None, **kwargs):
+        """
+        Perform a request with timeouts and retries.
+
+        Args:
+            method (str): HTTP method.
+            url (str): Request URL.
+            retry (bool | None): Whether transient failures are retried;
+                by default only for idempotent methods.
+
+        Returns:
+            requests.Response: The final response, which may still carry a
+            retryable status once the retries are exhausted.
+
+        Raises:
+            requests.RequestException: If the last attempt failed without
+            any response (connection error, timeout).
+        """
+        kwargs.setdefault('timeout', self.timeout)
+        parsed = urlparse(url)
+        name = f"http {method} {parsed.netloc}{parsed.path}"
+        if retry is None:
+            retry = method.upper() in self.IDEMPOTENT_METHODS
+        max_retries = self.max_retries if retry else 0
+        for attempt in range(max_retries + 1):
+            last_attempt = attempt == max_retries
+            started = time.perf_counter()
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                self.metrics.observe(name, time.perf_counter() - started)
+                self.metrics.incr(f'{name} error {type(e).__name__}')
+                if last_attempt:
+                    raise
+                logging.info(f"{method} {url} failed ({e}), retrying")
+                self.metrics.incr(f'{name} retries')
+                self.sleep(self._retry_delay(attempt))
+                continue
+
+            self.metrics.observe(name, time.perf_counter() - started)
+            self.metrics.incr(f'{name} status {response.status_code}')
+            if response.status_code not in self.RETRY_STATUSES or last_attempt:
+                return response
+            logging.info(f"{method} {url} returned {response.status_code}, retrying")
+            self.metrics.incr(f'{name} retries')
+            self.sleep(self._retry_delay(attempt, response))
+            response.close()
+
+
+class TokenManager():
+    """
+    Keeps a Linde OAuth access token valid. The full browser-style login
+    (auth page, HTML form scrape, credential POST, code exchange) only runs
+    when there is no usable refresh token; otherwise the access token is
+    renewed with a single grant_type=refresh_token POST shortly before it
+    expires.
+
+    With `cache_file` set, tokens are persisted (owner read/write only) and
+    reused on the next start while still valid, so a restart does not need
+    a network round-trip before the first poll.
+    """
+    AUTH_URL = 'https://authentication.dfs.linde.com/auth/realms/digital-family/protocol/openid-connect/auth'
+    TOKEN_URL = 'https://authentication.dfs.linde.com/auth/realms/digital-family/protocol/openid-connect/token'
+
+    def __init__(self, credentials, session=None, refresh_margin=timedelta(seconds=60), cache_file=None):
+        self.credentials = credentials
+        self.session = session
+        self.refresh_margin = refresh_margin
+        self.cache_file = cache_file
+        self.access_token = None
+        self.refresh_token = None
+        self.expires_at = None
+        self.refresh_expires_at = None
+        self._lock = threading.Lock()
+        self.load_cache()
+
+    def _owner(self):
+        # Tokens belong to one account; a credentials change invalidates them
+        return f"{self.credentials.get('client_id')}:{self.credentials.get('username')}"
+
+    def load_cache(self):
+        """
+        Restore tokens persisted by a previous run, if the file exists,
+        belongs to the configured account and the tokens have not expired.
+
+        Returns:
+            bool: True if usable tokens were restored.
+        """
+        if not self.cache_file or not os.path.exists(self.cache_file):
+            return False
+        try:
+            with open(self.cache_file, 'r') as file:
+                cached = json.load(file)
+            if cached.get('owner') != self._owner():
+                return False
+
+            def when(key):
+                return datetime.fromisoformat(cached[key]) if cached.get(key) else None
+
+            expires_at, refresh_expires_at = when('expires_at'), when('refresh_expires_at')
+        except (OSError, ValueError, TypeError, AttributeError) as e:
+            logging.error(f"Ignoring unreadable token cache {self.cache_file}: {e}")
+            return False
+
+        now = datetime.now()
+        access_valid = cached.get('access_token') and expires_at and now < expires_at
+        refresh_valid = cached.get('refresh_token') and (refresh_expires_at is None or now < refresh_expires_at)
+        if not (access_valid or refresh_valid):
+            return False
+        self.access_token = cached.get('access_token') if access_valid else None
+        self.expires_at = expires_at if access_valid else None
+        self.refresh_token = cached.get('refresh_token') if refresh_valid else None
+        self.refresh_expires_at = refresh_expires_at if refresh_valid else None
+        logging.info("Restored Linde tokens from cache")
+        return True
+
+    def save_cache(self):
+        """Persist the current tokens, readable by the owner only."""
+        if not self.cache_file:
+            return
+        cached = {
+            'owner': self._owner(),
+            'access_token': self.access_token,
+            'refresh_token': self.refresh_token,
+            'expires_at': self.expires_at.isoformat() if self.expires_at else None,
+            'refresh_expires_at': self.refresh_expires_at.isoformat() if self.refresh_expires_at else None,
+        }
+        tmp_path = self.cache_file + '.tmp'
+        try:
+            # Reason: create with 0600 up front so the tokens are never
+            # briefly world-readable, then swap in atomically.
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, 'w') as file:
+                json.dump(cached, file)
+            os.chmod(tmp_path, 0o600)
+            os.replace(tmp_path, self.cache_file)
+        except OSError as e:
+            logging.error(f"Could not write token cache {self.cache_file}: {e}")
+
+    def _session(self):
+        return self.session if self.session is not None else requests.Session()
+
+    def _login_session(self):
+        session = self._session()
+        # Reason: a leftover SSO cookie would skip the login form we parse.
+        cookies = getattr(session, 'cookies', None)
+        if cookies is not None:
+            cookies.clear()
+        return session
+
+    def get_token(self):
+        """
+        Return a valid access token: the cached one while it has more than
+        `refresh_margin` left, else a refreshed one, else a fresh login.
+
+        Returns:
+            str | None: The access token, or None if both refresh and login
+            failed.
+        """
+        with self._lock:
+            now = datetime.now()
+            if self.access_token and self.expires_at and now < self.expires_at - self.refresh_margin:
+                return self.access_token
+            if self.refresh_token and (self.refresh_expires_at is None or now < self.refresh_expires_at):
+                if self.refresh():
+                    return self.access_token
+                logging.info("Token refresh failed, falling back to a full login")
+            if self.login():
+                return self.access_token
+            return None
+
+    def _store(self, token_data):
+        now = datetime.now()
+        self.access_token = token_data.get('access_token')
+        self.refresh_token = token_data.get('refresh_token')
+        # Reason: without expires_in, assume the hour the old code used.
+        self.expires_at = now + timedelta(seconds=int(token_data.get('expires_in') or 3600))
+        refresh_expires_in = token_data.get('refresh_expires_in')
+        # Keycloak reports 0 for offline tokens that never expire
+        self.refresh_expires_at = now + timedelta(seconds=int(refresh_expires_in)) if refresh_expires_in else None
+        if self.access_token is None:
+            return False
+        self.save_cache()
+        return True
+
+    def _clear(self):
+        self.access_token = self.refresh_token = None
+        self.expires_at = self.refresh_expires_at = None
+
+    def refresh(self):
+        """
+        Exchange the refresh token for a new access token.
+
+        Returns:
+            bool: True on success.
+        """
+        payload = {
+            'grant_type': 'refresh_token',
+            'refresh_token': self.refresh_token,
+            'client_id': self.credentials['client_id'],
+            'client_secret': self.credentials['client_secret'],
+        }
+        try:
+            response = self._session().post(self.TOKEN_URL, data=payload)
+            if response.status_code == 200 and self._store(response.json()):
+                logging.info("Refreshed Linde access token")
+                return True
+            logging.error(f"Failed to refresh access token. Status code: {response.status_code}")
+        except (requests.RequestException, ValueError) as e:
+            logging.error(f"Error refreshing access token: {e}")
+        self._clear()
+        return False
+
+    def login(self):
+        """
+        Run the full login flow and exchange the authorization code for
+        access and refresh tokens.
+
+        Returns:
+            bool: True on success.
+        """
+        redirect_uri = self.credentials['redirect_uri']
+        session = self._login_session()
+        try:
+            # Step 1: Initial authentication request
+            auth_params = {
+                'response_type': 'code',
+                'client_id': self.credentials['client_id'],
+                'state': '',
+                'redirect_uri': redirect_uri,
+                'scope': 'openid profile email'
+            }
+            auth_response = session.get(self.AUTH_URL, params=auth_params)
+
+            # Step 2: Parse the login form and submit credentials
+            login_form = BeautifulSoup(auth_response.text, 'html.parser').find('form')
+            if login_form is None or not login_form.get('action'):
+                logging.error('Login page did not contain a login form.')
+                return False
+            hidden_inputs = login_form.find_all('input', type='hidden')
+            login_payload = {input_['name']: input_.get('value', '') for input_ in hidden_inputs if input_.get('name')}
+            login_payload.update({
+                'username': self.credentials['username'],
+                'password': self.credentials['password']
+            })
+            login_response = session.post(login_form['action'], data=login_payload)
+
+            # Step 3: Follow the redirection to capture the authorization code
+            redirect_response = session.get(login_response.url, allow_redirects=True)
+            auth_code = parse_qs(urlparse(redirect_response.url).query).get('code')
+            if not auth_code:
+                logging.error('Failed to retrieve authorization code.')
+                return False
+
+            # Step 4: Exchange authorization code for access token
+            token_payload = {
+                'grant_type': 'authorization_code',
+                'code': auth_code[0],
+                'redirect_uri': redirect_uri,
+                'client_id': self.credentials['client_id'],
+                'client_secret': self.credentials['client_secret']
+            }
+            token_response = session.post(self.TOKEN_URL, data=token_payload)
+            if token_response.status_code == 200 and self._store(token_response.json()):
+                logging.info("Obtained Linde access token")
+                return True
+            logging.error(f'Failed to obtain access token. Status code: {token_response.status_code}')
+        except (requests.RequestException, ValueError, KeyError) as e:
+            logging.error(f"Error during Linde login: {e}")
+        return False
+
+
+class Manifold():
+    """
+    One monitored manifold: where to find it in the Linde export, its banks
+    with their low-content thresholds, and the state polled for it (the
+    latest export row and one ReadingsWindow per bank).
+    """
+    def __init__(self, device_id=_DEFAULT_DEVICE, name=None, serials=(), country='826',
+                 banks=None, stale_days=3):
+        """
+        Args:
+            device_id (str): Key the readings and alerts are recorded under.
+            name (str | None): Display name; defaults to device_id.
+            serials (iterable): IDs the manifold may appear under in the
+                export, tried in order. Empty picks the lowest ID found.
+            country (str): Linde country code of the export listing it.
+            banks (dict | None): {bank: threshold}; an alert is sent when a
+                bank's contents drop to its threshold. Defaults to left and
+                right at 10.
+            stale_days (int): Days without a new messageTime before a
+                staleness alert is sent.
+        """
+        self.id = device_id
+        self.name = name or device_id
+        self.serials = tuple(str(serial) for serial in serials)
+        self.country = str(country)
+        self.banks = dict(banks) if banks else {'left': 10, 'right': 10}
+        self.stale_days = stale_days
+        self.data = {}
+        self.windows = {}
+        self.estimators = {}
+        self.last_readings = {}
+        # Polls in a row that brought no new reading, and the interval
+        # chosen after the last one (see LindeLink.poll_interval_for)
+        self.static_polls = 0
+        self.poll_interval = None
+
+    @classmethod
+    def from_config(cls, entry):
+        """
+        Build a Manifold from one manifolds.json entry. `banks` may be a
+        {bank: threshold} mapping or a plain list using the default
+        threshold of 10.
+
+        Raises:
+            ValueError: If the entry has no usable id.
+        """
+        device_id = str(entry.get('id') or '')
+        if not device_id or ',' in device_id:
+            raise ValueError(f"manifolds.json: invalid manifold id {entry.get('id')!r}")
+        banks = entry.get('banks')
+        if isinstance(banks, list):
+            banks = {bank: 10 for bank in banks}
+        return cls(device_id, name=entry.get('name'), serials=entry.get('serials', ()),
+                   country=entry.get('country', '826'), banks=banks,
+                   stale_days=entry.get('stale_days', 3))
+
+    def find(self, devices):
+        """
+        Pick this manifold's row out of a parsed export.
+
+        Args:
+            devices (dict): {device_id: row} as returned by parse_manifold_csv.
+
+        Returns:
+            dict | None: The row, or None if the manifold is not listed.
+        """
+        row = next((devices[serial] for serial in self.serials if serial in devices), None)
+        if row is None and not self.serials and devices:
+            # The parser already reduced the export to a single, deterministic device
+            row = next(iter(devices.values()))
+        return row
+
+    def bank_status(self):
+        """
+        Returns:
+            dict: {bank: {'contents', 'messageTime', 'lastChange',
+            'threshold', 'forecast'}} from the latest polled row, as served
+            by /status and the 'readings' event.
+        """
+        status = {}
+        for bank, threshold in self.banks.items():
+            contents_key, time_key, change_key = bank_fields(bank)
+            status[bank] = {
+                'contents': self.data.get(contents_key),
+                'messageTime': self.data.get(time_key),
+                'lastChange': self.data.get(change_key),
+                'threshold': threshold,
+                'forecast': self.estimators[bank].forecast(threshold) if bank in self.estimators else None,
+            }
+        return status
 
 
 class LindeLink():
     def __init__(self, debug=False):
-        self.bearer_token = None
-        self.data = {}
-        self.email_status = {'connected': True, 'last_check': None, 'error': None}
+        self._init_state()
 
         # Ensure the data directory exists
         if not os.path.exists(_DATADIR):
             os.makedirs(_DATADIR)
         self.log_file = os.path.join(_DATADIR, 'data_log.csv')
+        self.readings_db = os.path.join(_DATADIR, 'readings.db')
         self.last_alert_file = os.path.join(_DATADIR, 'last_alert.log')
 
         self.load_credentials()
+        self.load_manifolds()
+        self.http = LindeHTTPClient(metrics=self.metrics)
+        self.tokens = TokenManager(self.credentials, session=self.http, cache_file=os.path.join(_DATADIR, 'token_cache.json'))
         self.load_pos()
         self.setup_logging()
-        self.get_bearer_token()
-        self.check_email_connection()
+
+    def schedule_jobs(self, scheduler):
+        """
+        Register the background jobs: token upkeep, SMTP health checks,
+        polling and readings compaction. The token and SMTP jobs run first
+        so the first poll finds a token and the dashboard a fresh email
+        status.
+        """
+        scheduler.add('token', self.get_bearer_token, _TOKEN_CHECK_INTERVAL, jitter=1)
+        scheduler.add('smtp', self.check_email_connection, _SMTP_CHECK_INTERVAL, jitter=1)
+        scheduler.add('poll', self.collect_data, self.next_poll_interval(), delay=2, jitter=3)
+        scheduler.add('compaction', self.compact_readings, _COMPACT_INTERVAL, delay=600, jitter=300)
+
+    def start_background(self):
+        """
+        Start the background jobs on the scheduler thread, serving the
+        dashboard from stored readings meanwhile.
+        """
+        self.scheduler = Scheduler(metrics=self.metrics)
+        self.schedule_jobs(self.scheduler)
+        self.scheduler.start()
+
+    def stop_background(self):
+        """
+        Stop the scheduler once its current job, if any, has finished, and
+        disconnect the event subscribers.
+        """
+        if self.scheduler is not None:
+            self.scheduler.stop(timeout=30)
+        self.events.close()
+
+    @property
+    def email_status(self):
+        """{'connected', 'last_check', 'error'} of the last SMTP attempt."""
+        return self._email_status
+
+    @email_status.setter
+    def email_status(self, status):
+        previous = getattr(self, '_email_status', None)
+        self._email_status = status
+        # Reason: every successful send refreshes last_check; subscribers
+        # only need to hear about the connection going up or down
+        if previous is not None and (previous['connected'], previous['error']) != (status['connected'], status['error']):
+            self.events.publish('email', {
+                'connected': status['connected'],
+                'lastCheck': status['last_check'].isoformat() if status['last_check'] else None,
+                'error': status['error'],
+            })
+
+    def _init_state(self):
+        """
+        Set up the in-memory state that does not depend on network or disk.
+        """
+        self.tokens = None
+        self.devices = {}
+        self.manifolds = {_DEFAULT_DEVICE: Manifold()}
+        self.metrics = Metrics()
+        # Live updates for the dashboard (see RequestHandler.stream_events)
+        self.events = EventHub(metrics=self.metrics)
+        self.email_status = {'connected': True, 'last_check': None, 'error': None}
+        # Bumped whenever the inputs of the plot change, so cached renders
+        # are invalidated by comparing versions rather than by timers (see
+        # also alerts_generation).
+        self.readings_generation = 0
+        self.last_compaction = None
+        self.scheduler = None
+        self.poll_interval = None
+        self._order_stats = {}
+        self._order_stats_lock = threading.RLock()
+        self.plot_cache = RenderCache(maxsize=16)
+        self.plot_flight = SingleFlight()
+        self.series_cache = RenderCache(maxsize=64)
+        self.timeline_cache = RenderCache(maxsize=32)
+        # Dashboard pages and their fragments (see RequestHandler.get_page)
+        self.html_cache = RenderCache(maxsize=64)
+        self.pos_generation = 0
+
+    @property
+    def primary(self):
+        """The first configured manifold, shown by default."""
+        return next(iter(self.manifolds.values()))
+
+    # Reason: most of the dashboard and the /status top-level fields predate
+    # multi-manifold support and keep reading the primary manifold's state.
+    @property
+    def data(self):
+        return self.primary.data
+
+    @data.setter
+    def data(self, value):
+        self.primary.data = value
+
+    @property
+    def windows(self):
+        return self.primary.windows
+
+    @property
+    def alerts_generation(self):
+        """Version of the alert ledger, bumped by every new or edited alert."""
+        return self.alert_ledger.refresh()
+
+    def manifold(self, device=None):
+        """
+        Return the manifold recorded as `device`, or the primary one.
+
+        Raises:
+            KeyError: If no such manifold is configured.
+        """
+        return self.primary if device is None else self.manifolds[device]
+
+    def load_manifolds(self):
+        """
+        Load the monitored manifolds from manifolds.json. If it is absent,
+        monitor a single manifold identified by credentials.json
+        (manifold_ids) so existing setups keep working unchanged.
+
+        Raises:
+            ValueError: On an invalid manifolds.json.
+        """
+        manifolds = []
+        manifolds_file = os.path.join(_DATADIR, 'manifolds.json')
+        if os.path.exists(manifolds_file):
+            with open(manifolds_file, 'r') as file:
+                manifolds = [Manifold.from_config(entry) for entry in json.load(file).get('manifolds', [])]
+        if not manifolds:
+            manifolds = [Manifold(serials=self.credentials.get('manifold_ids') or [])]
+        if len({m.id for m in manifolds}) != len(manifolds):
+            raise ValueError('manifolds.json: manifold ids must be unique')
+        if len(manifolds) > 1 and not all(m.serials for m in manifolds):
+            raise ValueError('manifolds.json: every manifold needs serials when more than one is configured')
+        self.manifolds = {m.id: m for m in manifolds}
 
     def load_pos(self):
         """
@@ -60,21 +2500,18 @@ class LindeLink():
                 'created': None,
                 'expires': None,
             }]
+        self.pos_generation += 1
 
     def get_po_usage(self):
         """
-        Count past uses of each configured PO from last_alert.log. Only lines
-        recorded with the new 3-column format contribute; legacy 2-column
-        lines are ignored (no PO recorded at that time).
+        Count past uses of each configured PO from the alert ledger. Only
+        lines recorded with the new 3-column format contribute; legacy
+        2-column lines are ignored (no PO recorded at that time).
         """
         usage = {po['number']: 0 for po in self.pos}
-        if not os.path.exists(self.last_alert_file):
-            return usage
-        with open(self.last_alert_file, 'r') as file:
-            for line in file:
-                parts = line.strip().split(',')
-                if len(parts) >= 3 and parts[2] in usage:
-                    usage[parts[2]] += 1
+        for number, count in self.alert_ledger.po_usage().items():
+            if number in usage:
+                usage[number] = count
         return usage
 
     def select_po(self):
@@ -107,10 +2544,111 @@ class LindeLink():
         return min(candidates, key=lambda po: usage.get(po['number'], 0) / po.get('ratio', 1))
 
     def setup_logging(self):
-        # Ensure the log file has a header if it doesn't exist
-        if not os.path.exists(self.log_file) or os.path.getsize(self.log_file) == 0:
-            with open(self.log_file, 'w') as file:
-                file.write('messageTime,bank,lastChange,content\n')
+        # Readings live in the indexed store; data_log.csv is only read once
+        # to migrate the history recorded before the store existed.
+        self.readings = ReadingsStore(self.readings_db, wal=_STORAGE == 'sqlite')
+        self.open_logs()
+        self.migrated = self.migrate_logs()
+        # History recorded before manifolds were configured is the primary's
+        self.readings.rename_device(_DEFAULT_DEVICE, self.primary.id)
+        self.load_recent_readings()
+
+    def open_logs(self):
+        """
+        Open the order and staleness alert logs with the configured storage
+        engine: text files in the data directory ('files'), or indexed
+        tables in readings.db ('sqlite').
+        """
+        if _STORAGE == 'sqlite':
+            self.alert_ledger = SQLiteLedger(self.readings_db, default_device=self.primary.id)
+            self.staleness_log = SQLiteStalenessLog(self.readings_db, default_device=self.primary.id)
+        else:
+            self.alert_ledger = AlertLedger(self.last_alert_file, default_device=self.primary.id)
+            self.staleness_log = StalenessLog(os.path.join(_DATADIR, 'staleness_alert.log'),
+                                              default_device=self.primary.id)
+
+    def migrate_logs(self):
+        """
+        One-shot import of the legacy text logs into readings.db:
+        data_log.csv always, and last_alert.log and staleness_alert.log with
+        the sqlite storage engine. Each import is recorded in the database,
+        so later calls import nothing.
+
+        Returns:
+            dict: {table: number of rows imported}.
+        """
+        migrated = {'readings': self.readings.migrate_csv(self.log_file)}
+        if _STORAGE == 'sqlite':
+            migrated['orders'] = self.alert_ledger.import_log(self.last_alert_file)
+            migrated['staleness_alerts'] = self.staleness_log.import_log(
+                os.path.join(_DATADIR, 'staleness_alert.log'))
+        return migrated
+
+    def load_recent_readings(self):
+        """
+        Load the tail of the readings store into one in-memory window per
+        bank of every manifold, so the plot and dashboard never go to disk
+        in steady state. If a manifold has not been polled yet, seed its
+        data from its most recent stored readings so the dashboard has
+        something to show.
+        """
+        for manifold in self.manifolds.values():
+            manifold.windows = {}
+            manifold.estimators = {}
+            manifold.last_readings = {}
+            for bank in manifold.banks:
+                window = ReadingsWindow()
+                since = datetime.now() - window.max_age
+                rows = self.readings.range(bank=bank, start=since, device=manifold.id)
+                if len(rows) > window.capacity:
+                    since = rows[-window.capacity][0]
+                window.load([(t, lc, c) for t, _, lc, c in rows[-window.capacity:]], since)
+                manifold.windows[bank] = window
+                estimator = manifold.estimators[bank] = DepletionEstimator()
+                for t, _, _, c in rows:
+                    estimator.update(t, c)
+                last = window.last()
+                if last is not None:
+                    manifold.last_readings[bank] = (last[0], last[2])
+
+            if manifold.data:
+                continue
+            for bank, window in manifold.windows.items():
+                last = window.last()
+                if last is None:
+                    continue
+                message_time, last_change, content = last
+                contents_key, time_key, change_key = bank_fields(bank)
+                manifold.data[time_key] = message_time.strftime('%Y-%m-%dT%H:%M:%S')
+                manifold.data[change_key] = last_change.strftime('%Y-%m-%dT%H:%M:%S') if last_change else 'N/A'
+                manifold.data[contents_key] = f'{content:g}' if content is not None else '0'
+
+    def recent_readings(self, bank, start, end=None, device=None, spread=False):
+        """
+        Return (times, contents) arrays for `bank` of manifold `device` (the
+        primary one by default) in [start, end), served from the in-memory
+        window when it covers the range and from the readings store
+        otherwise.
+
+        With spread=True, return (times, contents, lows, highs), where lows
+        and highs are the min and max behind each sample: equal to the
+        contents for raw readings, wider for compacted segments.
+        """
+        manifold = self.manifold(device)
+        window = manifold.windows.get(bank)
+        if window is not None and window.covers(start):
+            times, contents = window.snapshot(start)
+            if end is not None:
+                keep = times < np.datetime64(end, 's')
+                times, contents = times[keep], contents[keep]
+            return (times, contents, contents, contents) if spread else (times, contents)
+        rows = self.readings.range(bank=bank, start=start, end=end, device=manifold.id, spread=spread)
+
+        def column(i):
+            return np.array([np.nan if r[i] is None else r[i] for r in rows], dtype='float64')
+
+        times = np.array([r[0] for r in rows], dtype='datetime64[s]')
+        return (times, column(3), column(4), column(5)) if spread else (times, column(3))
 
     def load_credentials(self):
         cred_file = os.path.join(_DATADIR, "credentials.json")
@@ -118,88 +2656,75 @@ class LindeLink():
             self.credentials = json.load(file)
 
     def get_bearer_token(self):
-        username = self.credentials['username']
-        password = self.credentials['password']
-        client_id = self.credentials['client_id']
-        client_secret = self.credentials['client_secret']
-        redirect_uri = self.credentials['redirect_uri']
-        auth_url = 'https://authentication.dfs.linde.com/auth/realms/digital-family/protocol/openid-connect/auth'
-        
-        # Initialize a session
-        session = requests.Session()
-        
-        # Step 1: Initial authentication request
-        auth_params = {
-            'response_type': 'code',
-            'client_id': client_id,
-            'state': '',
-            'redirect_uri': redirect_uri,
-            'scope': 'openid profile email'
-        }
-        auth_response = session.get(auth_url, params=auth_params)
-        
-        # Step 2: Parse the login form and submit credentials
-        login_page_soup = BeautifulSoup(auth_response.text, 'html.parser')
-        login_form = login_page_soup.find('form')
-        
-        login_url = login_form['action']
-        hidden_inputs = login_form.find_all('input', type='hidden')
-        login_payload = {input_['name']: input_['value'] for input_ in hidden_inputs}
-        login_payload.update({
-            'username': username,
-            'password': password
-        })
-        
-        login_response = session.post(login_url, data=login_payload)
-        
-        # Step 3: Follow the redirection to capture the authorization code
-        redirect_response = session.get(login_response.url, allow_redirects=True)
-        parsed_url = urlparse(redirect_response.url)
-        auth_code = parse_qs(parsed_url.query).get('code')
-        
-        if not auth_code:
-            print('Failed to retrieve authorization code.')
-        else:
-            auth_code = auth_code[0]
-            print(f'Authorization Code: {auth_code}')
-        
-            # Step 4: Exchange authorization code for access token
-            token_url = 'https://authentication.dfs.linde.com/auth/realms/digital-family/protocol/openid-connect/token'
-            token_payload = {
-                'grant_type': 'authorization_code',
-                'code': auth_code,
-                'redirect_uri': redirect_uri,
-                'client_id': client_id,
-                'client_secret': client_secret
-            }
-            token_response = session.post(token_url, data=token_payload)
-            
-            if token_response.status_code == 200:
-                token_data = token_response.json()
-                self.bearer_token = { 
-                                      "token" : token_data.get('access_token'), 
-                                      "last_obtained" : datetime.now()
-                                    }
-    
-            else:
-                print(f'Failed to obtain access token. Status code: {token_response.status_code}')
-                print(token_response.json())
+        """
+        Return a valid Linde access token, refreshing or logging in again
+        as needed.
+
+        Returns:
+            str | None: The access token, or None if authentication failed.
+        """
+        return self.tokens.get_token()
 
     def get_data(self):
-        
-        #get a new token every hour
-        if datetime.now() - self.bearer_token["last_obtained"] >= timedelta(minutes=60):
-            self.get_bearer_token()
-        
+        """
+        Poll every configured manifold. The export is downloaded once per
+        country, concurrently across countries, and each download is parsed
+        in a single streaming pass keeping only the monitored serials, so a
+        poll costs one pass over each export however many manifolds it lists.
+
+        Returns:
+            dict | bool: The primary manifold's row, or False if it could not
+            be polled.
+        """
+        token = self.get_bearer_token()
+        if token is None:
+            logging.error("No Linde access token available, skipping this poll.")
+            return False
+
+        by_country = {}
+        for manifold in self.manifolds.values():
+            by_country.setdefault(manifold.country, []).append(manifold)
+
+        with ThreadPoolExecutor(max_workers=min(len(by_country), _MAX_FETCH_WORKERS),
+                                thread_name_prefix='linde-fetch') as pool:
+            futures = {
+                country: pool.submit(self.fetch_devices, token, country,
+                                     list(dict.fromkeys(s for m in group for s in m.serials)))
+                for country, group in by_country.items()
+            }
+            exports = {country: future.result() for country, future in futures.items()}
+
+        self.devices, polled = {}, {}
+        for country, group in by_country.items():
+            if exports[country] is None:
+                continue
+            self.devices.update(exports[country])
+            for manifold in group:
+                polled[manifold.id] = self.poll_manifold(manifold, exports[country])
+
+        return polled.get(self.primary.id) or False
+
+    def fetch_devices(self, token, country, wanted_ids):
+        """
+        Download the manifold export of one Linde country and parse it.
+
+        Args:
+            token (str): Linde access token.
+            country (str): Linde country code.
+            wanted_ids (list): IDs to keep; empty keeps the lowest ID.
+
+        Returns:
+            dict | None: {device_id: row}, or None if the download failed.
+        """
         # URL to fetch the JSON file
-        url = "https://digitalmanifold.be.dfs.linde.com/api/v1/csv/digitalmanifolddetails/download?country=826"
+        url = f"https://digitalmanifold.be.dfs.linde.com/api/v1/csv/digitalmanifolddetails/download?country={country}"
     
         # Headers for the request
         headers = {
             "Accept": "application/json, text/plain, */*",
             "Accept-Encoding": "gzip, deflate, br",
             "Accept-Language": "en-GB,en;q=0.9,it-IT;q=0.8,it;q=0.7,en-US;q=0.6,fr;q=0.5",
-            "Authorization": "Bearer " + self.bearer_token["token"],
+            "Authorization": "Bearer " + token,
             "Connection": "keep-alive",
             "Content-Type": "application/json",
             "Host": "digitalmanifold.be.dfs.linde.com",
@@ -214,118 +2739,249 @@ class LindeLink():
             "User-Agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/117.0.0.0 Safari/537.36"
         }
     
-        # Make the GET request
-        response = requests.get(url, headers=headers)
-    
-        # Check if the request was successful
-        if response.status_code == 200:
-            # Decode the byte string to a regular string
-            csv_data = response.content.decode('utf-8')
-            
-            # Create a DictReader object
-            csv_reader = csv.DictReader(StringIO(csv_data))
-            
-            # Read and store each row from the CSV into a dictionary
-            for row in csv_reader:
-                json_dict = dict(row)
-            
-            self.data = json_dict
-
-            # Log the required data
-            with open(self.log_file, 'a') as file:
-                file.write(f"{json_dict.get('messageTimeLeft')},left,{json_dict.get('lastChangeLeft')},{json_dict.get('leftBankContents')}\n")
-                file.write(f"{json_dict.get('messageTimeRight')},right,{json_dict.get('lastChangeRight')},{json_dict.get('rightBankContents')}\n")
- 
-            # Check for low content and send alert email if needed
-            
-            if int(json_dict.get('leftBankContents', 0)) <= 10 and _ALERT:
-                self.check_and_send_alert('left')
-            if int(json_dict.get('rightBankContents', 0)) <= 10 and _ALERT:
-                self.check_and_send_alert('right')
-
-            # Check for no data transfer and send alert email if needed
-            self.check_message_time_freshness()
+        # Stream the download through the shared, pooled client and
+        # parse it line by line, keeping only the monitored devices
+        id_field = self.credentials.get('manifold_id_field', 'serialNumber')
+        try:
+            with self.http.get(url, headers=headers, stream=True) as response:
+                if response.status_code != 200:
+                    return None
+                # Reason: the export is UTF-8 with a BOM, but is served as
+                # text/csv without a charset, for which requests assumes
+                # ISO-8859-1
+                response.encoding = 'utf-8'
+                return parse_manifold_csv(response.iter_lines(decode_unicode=True),
+                                          id_field=id_field, wanted_ids=wanted_ids)
+        except requests.RequestException as e:
+            logging.error(f"Error downloading manifold data for country {country}: {e}")
+            return None
+
+    def poll_manifold(self, manifold, devices):
+        """
+        Record one manifold's row from a parsed export, then run its
+        low-content and staleness checks.
+
+        Returns:
+            dict | None: The row, or None if the manifold is not listed.
+        """
+        row = manifold.find(devices)
+        if row is None:
+            logging.error(f"Manifold {manifold.name} not found in the download "
+                          f"(wanted: {list(manifold.serials) or 'any'})")
+            return None
+        manifold.data = row
+
+        # Log the required data
+        readings = []
+        for bank in manifold.banks:
+            contents_key, time_key, change_key = bank_fields(bank)
+            readings.append((row.get(time_key), bank, row.get(change_key), row.get(contents_key)))
+        if self.record_readings(readings, device=manifold.id):
+            manifold.static_polls = 0
+            self.events.publish('readings', {'device': manifold.id, 'banks': manifold.bank_status()})
+        else:
+            manifold.static_polls += 1
+
+        # Check for low content and send alert email if needed
+        for bank, threshold in manifold.banks.items():
+            try:
+                content = int(row.get(bank_fields(bank)[0], 0))
+            except (ValueError, TypeError):
+                continue
+            if content <= threshold and _ALERT:
+                self.check_and_send_alert(bank, device=manifold.id)
+
+        # Check for no data transfer and send alert email if needed
+        self.check_message_time_freshness(manifold)
+        return row
+
+    def record_readings(self, rows, device=None):
+        """
+        Persist freshly polled readings and mirror them into the in-memory
+        windows. Rows without a parseable messageTime are dropped by both,
+        and so are rows repeating the last stored reading of their bank:
+        the export keeps serving the same messageTime and contents until
+        the manifold reports again.
+
+        Args:
+            rows (list): (messageTime, bank, lastChange, content) tuples.
+            device (str | None): Manifold the readings belong to; the
+                primary one by default.
 
-            return json_dict
-        else:
-            return False
+        Returns:
+            int: Number of readings stored.
+        """
+        manifold = self.manifold(device)
+        fresh = []
+        skipped = 0
+        for message_time, bank, last_change, content in rows:
+            dt = parse_message_time(message_time)
+            if dt is None:
+                continue
+            try:
+                value = float(content)
+            except (ValueError, TypeError):
+                value = None
+            # Reason: compared against the cached last reading rather than
+            # the store, so an unchanged poll costs no query at all
+            last = manifold.last_readings.get(bank)
+            if last == (dt, value):
+                skipped += 1
+                continue
+            if last is None or dt >= last[0]:
+                manifold.last_readings[bank] = (dt, value)
+            fresh.append(((message_time, bank, last_change, content), dt, value))
+
+        if skipped:
+            self.metrics.incr('ingest duplicates skipped', skipped)
+        if not fresh:
+            return 0
+        if self.readings.append_many([row for row, _, _ in fresh], device=manifold.id):
+            self.readings_generation += 1
+        self.metrics.incr('ingest readings stored', len(fresh))
+        now = datetime.now()
+        for (_, bank, last_change, _), dt, value in fresh:
+            window = manifold.windows.get(bank)
+            if window is None:
+                continue
+            window.append(dt, last_change, value)
+            window.trim(now)
+            manifold.estimators[bank].update(dt, value)
+        return len(fresh)
 
-    def start_data_collection(self):
+    def collect_data(self):
+        """
+        One polling pass: fetch every manifold, check for stale data even if
+        the fetch failed, pick the next poll interval and, when enabled,
+        refresh the static export.
+        """
         self.get_data()
-        
-        # Check for stale data even if get_data() fails
         if self.data:
             self.check_message_time_freshness()
-        
-        threading.Timer(3600, self.start_data_collection).start()  # Scheduled to run every hour
+        interval = self.next_poll_interval()
+        if self.scheduler is not None:
+            self.scheduler.set_interval('poll', interval)
+        if _EXPORT_DIR is not None:
+            export_static(_EXPORT_DIR)
+
+    def poll_interval_for(self, manifold):
+        """
+        Choose how long to wait before polling `manifold` again. Each bank
+        above its threshold asks for about a quarter of the time it needs to
+        reach the threshold at its current usage rate (see
+        DepletionEstimator; nothing if it is not being drawn down), or,
+        while there are too few readings since the last refill to tell
+        the rate, for less the closer it is to the threshold. The shortest
+        wins. The interval then doubles for every poll in a row that brought
+        no new reading, since the manifold has not reported since.
+
+        Returns:
+            int: Seconds, within [_POLL_MIN_INTERVAL, _POLL_MAX_INTERVAL].
+        """
+        interval = _POLL_MAX_INTERVAL
+        for bank, threshold in manifold.banks.items():
+            content = (manifold.last_readings.get(bank) or (None, None))[1]
+            # Reason: a bank at its threshold has had its alert; polling it
+            # faster would not get the alert out any sooner
+            if content is None or content <= threshold:
+                continue
+            headroom = content - threshold
+            estimator = manifold.estimators.get(bank)
+            rate = estimator.rate if estimator is not None else None
+            if rate is None:
+                interval = min(interval, _POLL_MAX_INTERVAL * headroom / 50)
+            elif rate > 0:
+                interval = min(interval, headroom / rate * 3600 / 4)
+        interval *= 2 ** min(manifold.static_polls, 10)
+        return round(max(_POLL_MIN_INTERVAL, min(_POLL_MAX_INTERVAL, interval)))
+
+    def next_poll_interval(self):
+        """
+        Update each manifold's poll interval and return the shortest, which
+        the single poll job runs at.
+
+        Returns:
+            int: Seconds until the next poll.
+        """
+        for manifold in self.manifolds.values():
+            manifold.poll_interval = self.poll_interval_for(manifold)
+        self.poll_interval = min(manifold.poll_interval for manifold in self.manifolds.values())
+        return self.poll_interval
+
+    def compact_readings(self):
+        """
+        Compact the readings store (see ReadingsStore.compact), invalidating
+        cached plots if anything changed.
+
+        Returns:
+            dict: Rows removed by each compaction step.
+        """
+        self.last_compaction = datetime.now()
+        removed = self.readings.compact(now=self.last_compaction)
+        if any(removed.values()):
+            self.readings_generation += 1
+            logging.info(f"Compacted readings: {removed}")
+        return removed
 
-    def check_message_time_freshness(self):
+    def check_message_time_freshness(self, manifold=None):
         """
-        Check if the messageTime for either bank is older than 3 days.
-        If so, send an alert email to the configured smtp_sender.
+        Check if the messageTime of any bank is older than the manifold's
+        stale_days (3 by default). If so, send an alert email to the
+        configured smtp_sender.
+
+        Args:
+            manifold (Manifold | None): Manifold to check; all by default.
         """
         current_time = datetime.now()
-        alert_sent = False
-        
-        # Check left bank message time
-        if 'messageTimeLeft' in self.data:
-            try:
-                left_time = datetime.strptime(self.data['messageTimeLeft'], '%Y-%m-%dT%H:%M:%S')
-                delta_left = current_time - left_time
-                
-                if delta_left.days > 3:
-                    self.send_data_staleness_alert('left', delta_left.days)
+        manifolds = [manifold] if manifold is not None else list(self.manifolds.values())
+
+        for manifold in manifolds:
+            alert_sent = False
+            for bank in manifold.banks:
+                time_key = bank_fields(bank)[1]
+                if time_key not in manifold.data:
+                    continue
+                try:
+                    message_time = datetime.strptime(manifold.data[time_key], '%Y-%m-%dT%H:%M:%S')
+                except (ValueError, TypeError):
+                    logging.error(f"Error parsing {bank} bank message time of {manifold.name}: {manifold.data.get(time_key)}")
+                    continue
+                delta = current_time - message_time
+                if delta.days <= manifold.stale_days:
+                    continue
+                # Only send one alert per manifold; further stale banks are
+                # the same general issue and are just added to the log
+                if not alert_sent:
+                    self.send_data_staleness_alert(bank, delta.days, device=manifold.id)
                     alert_sent = True
-            except (ValueError, TypeError):
-                logging.error(f"Error parsing left bank message time: {self.data.get('messageTimeLeft')}")
-        
-        # Check right bank message time
-        if 'messageTimeRight' in self.data:
-            try:
-                right_time = datetime.strptime(self.data['messageTimeRight'], '%Y-%m-%dT%H:%M:%S')
-                delta_right = current_time - right_time
-                
-                if delta_right.days > 3:
-                    # Only send second alert if it's not the same general issue
-                    if not alert_sent:
-                        self.send_data_staleness_alert('right', delta_right.days)
-                    # If we already sent an alert for left bank, let's add right bank to the log
-                    elif alert_sent:
-                        with open(os.path.join(_DATADIR, 'staleness_alert.log'), 'a') as file:
-                            file.write(f"{datetime.now().strftime('%Y-%m-%d %H:%M')},right,{delta_right.days}\n")
-            except (ValueError, TypeError):
-                logging.error(f"Error parsing right bank message time: {self.data.get('messageTimeRight')}")
+                else:
+                    self.staleness_log.record(datetime.now(), bank, delta.days, device=manifold.id)
 
-    def send_data_staleness_alert(self, bank, days_old):
+    def send_data_staleness_alert(self, bank, days_old, device=None):
         """
-        Send an alert email when data is stale (more than 3 days old).
+        Send an alert email when data is stale (more than stale_days old).
         
         Args:
             bank: The bank (left/right) with stale data
             days_old: Number of days since the last data update
+            device: The manifold with stale data; the primary one by default
         """
-        # Check if we've already sent an alert in the last 24 hours
-        alert_sent = False
-        alert_log_file = os.path.join(_DATADIR, 'staleness_alert.log')
-        
-        if os.path.exists(alert_log_file):
-            with open(alert_log_file, 'r') as file:
-                for line in file:
-                    last_time_str, last_bank, _ = line.strip().split(',')
-                    last_time = datetime.strptime(last_time_str, '%Y-%m-%d %H:%M')
-                    if (datetime.now() - last_time) < timedelta(hours=24):
-                        alert_sent = True
-                        break
-        
+        manifold = self.manifold(device)
+
+        # Check if we've already sent an alert for this manifold in the last 24 hours
+        last_sent = self.staleness_log.last_sent(manifold.id)
+        alert_sent = last_sent is not None and (datetime.now() - last_sent) < timedelta(hours=24)
+
         if not alert_sent:
             try:
+                where = f"the {bank} bank" if manifold.id == _DEFAULT_DEVICE else f"the {bank} bank of {manifold.name}"
                 msg = MIMEMultipart()
                 msg['From'] = self.credentials['smtp_sender']
                 msg['To'] = self.credentials['smtp_sender']  # Send to the sender as requested
                 msg['Subject'] = "ALERT: CO2 Bank Data Staleness"
                 
                 body = (f"Dear Administrator,\n\n"
-                        f"The CO2 bank monitoring system has detected stale data for the {bank} bank.\n"
+                        f"The CO2 bank monitoring system has detected stale data for {where}.\n"
                         f"The last data update was {days_old} days ago.\n\n"
                         f"This may indicate a connectivity issue with the Linde Digital Manifold system.\n"
                         f"Please check the system connection and authentication.\n\n"
@@ -339,7 +2995,7 @@ class LindeLink():
                         server.login(self.credentials['smtp_username'], self.credentials['smtp_password'])
                     
                     server.sendmail(self.credentials['smtp_sender'], [self.credentials['smtp_sender']], msg.as_string())
-                    logging.info(f"Data staleness alert email sent to {self.credentials['smtp_sender']} for {bank} bank.")
+                    logging.info(f"Data staleness alert email sent to {self.credentials['smtp_sender']} for {where}.")
 
                     # Update email status to indicate successful send
                     self.email_status = {
@@ -349,8 +3005,7 @@ class LindeLink():
                     }
 
                     # Log the alert
-                    with open(alert_log_file, 'a') as file:
-                        file.write(f"{datetime.now().strftime('%Y-%m-%d %H:%M')},{bank},{days_old}\n")
+                    self.staleness_log.record(datetime.now(), bank, days_old, device=manifold.id)
                     
             except Exception as e:
                 logging.error(f"Error sending data staleness alert: {e}")
@@ -360,7 +3015,8 @@ class LindeLink():
                     'error': f"Error: {str(e)}"
                 }
 
-    def send_alert_email(self, bank, test=False):
+    def send_alert_email(self, bank, test=False, device=None):
+        manifold = self.manifold(device)
         po = self.select_po()
         if po is None:
             logging.error(f"No valid PO available to send alert for {bank} bank.")
@@ -383,7 +3039,8 @@ class LindeLink():
             body = (f"Dear BOC team,\n\n"
                     "Please deliver 2x 40-VK cylinders to the cage space between SEC and FLOWERS building, SKEN. "
                     f"To be charged on Service PO Number: {po_number}.\n"
-                    f"Please collect the two empty cylinders on the {bank} bank.\n\n"
+                    f"Please collect the two empty cylinders on the {bank} bank"
+                    f"{'' if manifold.id == _DEFAULT_DEVICE else ' of ' + manifold.name}.\n\n"
                     "Many thanks,\n"
                     "Giorgio Gilestro")
             msg.attach(MIMEText(body, 'plain'))
@@ -407,9 +3064,9 @@ class LindeLink():
                 }
 
                 # Log the alert with bank and PO so usage drives future rotation
-                self.last_alert_time = datetime.now().strftime('%Y-%m-%d %H:%M')
-                with open(self.last_alert_file, 'a') as file:
-                    file.write(f"{self.last_alert_time},{bank},{po_number}\n")
+                now = datetime.now()
+                self.last_alert_time = now.strftime('%Y-%m-%d %H:%M')
+                self.note_order(now, bank, po_number, device=manifold.id)
 
         except smtplib.SMTPException as e:
             logging.error(f"SMTP error occurred while sending email for {bank} bank: {e}")
@@ -428,82 +3085,80 @@ class LindeLink():
             }
 
 
-    def check_and_send_alert(self, bank):
-        alert_sent = False
-        if os.path.exists(self.last_alert_file):
-            with open(self.last_alert_file, 'r') as file:
-                for line in file:
-                    parts = line.strip().split(',')
-                    if len(parts) < 2:
-                        continue
-                    last_time_str, last_bank = parts[0], parts[1]
-                    last_time = datetime.strptime(last_time_str, '%Y-%m-%d %H:%M')
-                    if last_bank == bank and (datetime.now() - last_time) < timedelta(hours=72):
-                        alert_sent = True
-                        break
-        if not alert_sent:
-            self.send_alert_email(bank)
+    def check_and_send_alert(self, bank, device=None):
+        device = self.manifold(device).id
+        last_time = self.alert_ledger.last_alert(bank, device)
+        if last_time is None or (datetime.now() - last_time) >= timedelta(hours=72):
+            self.send_alert_email(bank, device=device)
+
+    def order_stats(self, device=None):
+        """
+        Return the OrderStats of one manifold, rebuilt from the alert ledger
+        only when the ledger changed other than through note_order().
+
+        Args:
+            device (str | None): Manifold; the primary one by default.
+        """
+        manifold = self.manifold(device)
+        version = self.alert_ledger.refresh()
+        with self._order_stats_lock:
+            stats = self._order_stats.get(manifold.id)
+            if stats is None or stats.version != version:
+                stats = OrderStats(self.alert_ledger.orders(manifold.id), version)
+                self._order_stats[manifold.id] = stats
+            return stats
+
+    def note_order(self, when, bank, po, device=None):
+        """
+        Log an order in the alert ledger and fold it into the order
+        statistics in place, instead of rebuilding them on the next read.
+        """
+        device = self.manifold(device).id
+        when = when.replace(second=0, microsecond=0)
+        with self._order_stats_lock:
+            before = self.alert_ledger.refresh()
+            self.alert_ledger.append(when, bank, po, device=device)
+            after = self.alert_ledger.refresh()
+            self.events.publish('order', {'device': device, 'bank': bank, 'po': po,
+                                          'time': when.isoformat(timespec='minutes')})
+            # Reason: anything else bumping the version meanwhile (an edited
+            # log, another writer) leaves the stats stale, to be rebuilt
+            if after != before + 1:
+                return
+            for stats_device, stats in self._order_stats.items():
+                if stats.version != before:
+                    continue
+                if stats_device == device:
+                    stats.add(when, bank)
+                stats.version = after
 
-    def get_orders_history(self):
+    def get_orders_history(self, device=None, start=None, end=None):
         """
-        Read last_alert.log and return the full order history plus per-bank
-        statistics, so unusually short gaps between orders (a leak indicator)
-        can be highlighted in the dashboard.
+        Return the order history of one manifold plus per-bank statistics,
+        so unusually short gaps between orders (a leak indicator) can be
+        highlighted in the dashboard. Served from the incrementally
+        maintained OrderStats, so the cost is that of the returned orders.
+
+        Args:
+            device (str | None): Manifold whose orders to return; the
+                primary one by default.
+            start, end (datetime | None): Only return orders in
+                [start, end); the medians still cover the full history.
 
         Returns:
             tuple: (orders, median_interval) where
                 orders is a list of (datetime, bank, days_since_previous_same_bank)
                 sorted oldest-first,
-                median_interval is a dict {'left': float|None, 'right': float|None}
-                holding the median days between consecutive orders for each bank,
-                computed over the full history.
+                median_interval is a dict {bank: float|None} over the
+                manifold's banks holding the median days between consecutive
+                orders for each bank, computed over the full history.
         """
-        last_alert_file = os.path.join(_DATADIR, 'last_alert.log')
-        median_interval = {'left': None, 'right': None}
-        if not os.path.exists(last_alert_file):
-            return [], median_interval
-
-        orders = []
-        with open(last_alert_file, 'r') as file:
-            for line in file:
-                parts = line.strip().split(',')
-                if len(parts) < 2:
-                    continue
-                try:
-                    dt = datetime.strptime(parts[0], '%Y-%m-%d %H:%M')
-                except ValueError:
-                    continue
-                orders.append((dt, parts[1]))
-        orders.sort(key=lambda x: x[0])
-
-        # Median interval per bank over the full history.
+        manifold = self.manifold(device)
+        stats = self.order_stats(manifold.id)
         # Reason: per-bank median is the right baseline because each bank is
         # consumed independently, so a leak shows up as a short same-bank gap.
-        by_bank = {'left': [], 'right': []}
-        for dt, bank in orders:
-            if bank in by_bank:
-                by_bank[bank].append(dt)
-        for bank, dates in by_bank.items():
-            if len(dates) < 2:
-                continue
-            intervals = sorted((dates[i] - dates[i - 1]).total_seconds() / 86400
-                               for i in range(1, len(dates)))
-            mid = len(intervals) // 2
-            if len(intervals) % 2 == 0:
-                median_interval[bank] = (intervals[mid - 1] + intervals[mid]) / 2
-            else:
-                median_interval[bank] = intervals[mid]
-
-        # Annotate each order with days since the previous same-bank order.
-        enriched = []
-        last_seen = {}
-        for dt, bank in orders:
-            prev = last_seen.get(bank)
-            days_since = (dt - prev).total_seconds() / 86400 if prev else None
-            enriched.append((dt, bank, days_since))
-            last_seen[bank] = dt
-
-        return enriched, median_interval
+        median_interval = {bank: stats.median(bank) for bank in manifold.banks}
+        return stats.orders(start, end), median_interval
 
     def check_email_connection(self):
         """
@@ -538,50 +3193,504 @@ class LindeLink():
             }
             logging.error(f"Email connection error: {e}")
 
-        except Exception as e:
-            self.email_status = {
-                'connected': False,
-                'last_check': datetime.now(),
-                'error': f"Error: {str(e)}"
-            }
-            logging.error(f"Email connection test failed: {e}")
+        except Exception as e:
+            self.email_status = {
+                'connected': False,
+                'last_check': datetime.now(),
+                'error': f"Error: {str(e)}"
+            }
+            logging.error(f"Email connection test failed: {e}")
+
+
+# Response types worth gzipping (PNG plots are already compressed).
+_COMPRESSIBLE_TYPES = ('text/html', 'application/json', 'image/svg+xml')
+
+# Static parts of the dashboard page around its cached fragments (see
+# RequestHandler.get_page).
+_PAGE_HEAD = """
+        <html>
+        <head>
+            <title>Bank Status and Plot</title>
+            <style>
+                body { font-family: Arial, sans-serif; }
+                .email-alert {
+                    background-color: #ff9999;
+                    border: 2px solid #cc0000;
+                    border-radius: 5px;
+                    padding: 15px;
+                    margin: 20px auto;
+                    max-width: 600px;
+                    text-align: center;
+                }
+                .email-alert[hidden] { display: none; }
+                .email-alert i {
+                    color: #cc0000;
+                    font-size: 24px;
+                    margin-right: 10px;
+                }
+                .email-alert strong {
+                    color: #cc0000;
+                    font-size: 18px;
+                }
+                .email-alert p {
+                    margin: 5px 0;
+                }
+                .email-alert .error-detail {
+                    font-size: 12px;
+                    color: #660000;
+                    font-style: italic;
+                }
+                table {
+                    width: 50%;
+                    max-width: 600px;
+                    border-collapse: collapse;
+                    margin: 20px auto;
+                }
+                th, td {
+                    border: 1px solid #dddddd;
+                    text-align: left;
+                    padding: 8px;
+                }
+                th {
+                    background-color: #f2f2f2;
+                }
+                .center { text-align: center; }
+                .device-nav { margin: 10px 0; }
+                .device-nav a { margin: 0 6px; color: #1f77b4; text-decoration: none; }
+                .device-nav a.current { font-weight: bold; color: #333; }
+                .timeline-container {
+                    max-width: 820px;
+                    margin: 30px auto 10px;
+                    text-align: center;
+                }
+                .timeline-container svg circle { cursor: help; }
+                .timeline-legend {
+                    display: flex;
+                    justify-content: center;
+                    gap: 18px;
+                    flex-wrap: wrap;
+                    font-size: 12px;
+                    margin-top: 10px;
+                    color: #555;
+                }
+                .timeline-legend .dot {
+                    display: inline-block;
+                    width: 10px;
+                    height: 10px;
+                    border-radius: 50%;
+                    vertical-align: middle;
+                    margin-right: 5px;
+                }
+                .tabs {
+                    display: flex;
+                    justify-content: center;
+                    margin: 20px 0 0;
+                    gap: 4px;
+                    border-bottom: 1px solid #dddddd;
+                }
+                .tab-btn {
+                    background: #f2f2f2;
+                    border: 1px solid #dddddd;
+                    border-bottom: none;
+                    padding: 8px 18px;
+                    cursor: pointer;
+                    font-size: 14px;
+                    border-radius: 4px 4px 0 0;
+                    color: #333;
+                }
+                .tab-btn:hover { background: #e8e8e8; }
+                .tab-btn.active {
+                    background: #ffffff;
+                    font-weight: bold;
+                    position: relative;
+                    top: 1px;
+                }
+                .tab-pane { display: none; }
+                .tab-pane.active { display: block; }
+                footer {
+                    text-align: center;
+                    margin-top: 50px;
+                    padding: 10px;
+                    border-top: 1px solid #dddddd;
+                    font-size: 14px;
+                    width: 100%;
+                }
+            </style>
+            <link rel="stylesheet" href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.0.0-beta3/css/all.min.css">
+        </head>
+        <body>
+""".encode('utf-8')
+
+_PAGE_TABS = """
+            <div class="tabs">
+                <button class="tab-btn active" data-tab="status">Status</button>
+                <button class="tab-btn" data-tab="pos">Purchase Orders</button>
+            </div>
+            <div id="tab-status" class="tab-pane active">
+""".encode('utf-8')
+
+_PAGE_TAIL = """
+            </div>
+            <footer class="center">
+                CO<sub>2</sub> bank for the Dept of Life Sciences Fly Room - Imperial College London - <a href="https://dfs.linde.com/main/dashboard">Linde Dashboard</a>
+            </footer>
+            <script>
+                document.querySelectorAll('.tab-btn').forEach(function (btn) {
+                    btn.addEventListener('click', function () {
+                        document.querySelectorAll('.tab-btn').forEach(function (b) { b.classList.remove('active'); });
+                        document.querySelectorAll('.tab-pane').forEach(function (p) { p.classList.remove('active'); });
+                        btn.classList.add('active');
+                        document.getElementById('tab-' + btn.dataset.tab).classList.add('active');
+                    });
+                });
+
+                // Live updates from /events: the status table, the last alert,
+                // the plot and the email warning change in place.
+                (function () {
+                    var table = document.getElementById('bank-status');
+                    var plot = document.getElementById('plot');
+                    if (!window.EventSource || !table) { return; }
+
+                    function shade(value) {
+                        return value > 70 ? '#9FE481' : (value > 10 ? '#F68C70' : '#D0342C');
+                    }
+                    function gauge(value) {
+                        return value > 70 ? 'fa-tachometer-full' : (value > 10 ? 'fa-tachometer-half' : 'fa-tachometer');
+                    }
+                    function when(iso) {
+                        return iso ? iso.slice(0, 16).replace('T', ' ') : 'N/A';
+                    }
+                    function forecast(bank) {
+                        var f = bank.forecast;
+                        if (!f || f.usagePerHour === null) { return 'N/A'; }
+                        if (f.usagePerHour <= 0) { return 'Not in use'; }
+                        function projected(iso) { return iso ? 'by ' + when(iso) : 'in over 10 years'; }
+                        return (f.usagePerHour * 24).toFixed(1) + '% a day, ' + bank.threshold + '% ' +
+                            projected(f.thresholdAt) + ', empty ' + projected(f.emptyAt);
+                    }
+
+                    var source = new EventSource('/events');
+                    source.addEventListener('readings', function (e) {
+                        var update = JSON.parse(e.data);
+                        if (update.device !== table.dataset.device) { return; }
+                        Object.keys(update.banks).forEach(function (name) {
+                            var row = table.querySelector('tr[data-bank="' + CSS.escape(name) + '"]');
+                            if (!row) { return; }
+                            var bank = update.banks[name];
+                            var value = parseInt(bank.contents, 10) || 0;
+                            var contents = row.querySelector('.contents');
+                            var icon = contents.querySelector('i');
+                            contents.firstChild.nodeValue = value + ' ';
+                            contents.style.backgroundColor = shade(value);
+                            icon.className = 'fa ' + gauge(value);
+                            icon.style.color = shade(value);
+                            var messageTime = row.querySelector('.message-time');
+                            messageTime.textContent = when(bank.messageTime);
+                            messageTime.style.backgroundColor = '';
+                            row.querySelector('.last-change').textContent = when(bank.lastChange);
+                            row.querySelector('.forecast').textContent = forecast(bank);
+                        });
+                        if (plot) {
+                            var src = plot.dataset.src;
+                            plot.src = src + (src.indexOf('?') < 0 ? '?' : '&') + 'v=' + e.lastEventId;
+                        }
+                    });
+                    source.addEventListener('order', function (e) {
+                        var order = JSON.parse(e.data);
+                        if (order.device !== table.dataset.device) { return; }
+                        document.getElementById('last-alert').textContent =
+                            'The last alert was sent on ' + when(order.time) + ' for the ' + order.bank + ' bank';
+                    });
+                    source.addEventListener('email', function (e) {
+                        var status = JSON.parse(e.data);
+                        var alert = document.getElementById('email-alert');
+                        if (!alert) { return; }
+                        alert.hidden = status.connected;
+                        alert.querySelector('.last-check').textContent = status.lastCheck ? when(status.lastCheck) : 'Never';
+                        alert.querySelector('.error').textContent = status.error || 'Unknown error';
+                    });
+                })();
+            </script>
+        </body>
+        </html>
+""".encode('utf-8')
+
+
+class RequestHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        path, query = parsed.path, parse_qs(parsed.query)
+        device = query.get('device', [None])[0]
+        if device is not None and device not in link.manifolds:
+            if path == '/api/series':
+                self.send_json_error(404, f'unknown device {device!r}')
+            else:
+                self.send_error(404, 'Unknown device')
+            return
+        if path == '/':
+            self.send_cached(self.get_page(device=device))
+        elif path == '/status':
+            self.send_response(200)
+            self.send_header('Content-type', 'application/json')
+            self.end_headers()
+            self.wfile.write(json.dumps(self.get_status()).encode('utf-8'))
+        elif path == '/plot':
+            try:
+                days = int(query.get('days', ['10'])[0])
+                resample = query.get('resample', [None])[0]
+                if resample is not None:
+                    parse_interval(resample)
+                if not 1 <= days <= _MAX_PLOT_DAYS:
+                    raise ValueError
+            except ValueError:
+                self.send_error(400, f'days must be an integer in 1..{_MAX_PLOT_DAYS} and resample like 3H or 1D')
+                return
+            try:
+                entry = self.get_plot(days=days, resample=resample, device=device,
+                                      timeout=getattr(self.server, 'request_timeout', None))
+            except TimeoutError:
+                self.send_error(503, 'Plot rendering is busy, try again shortly')
+                return
+            self.send_cached(entry)
+        elif path == '/events':
+            self.stream_events()
+        elif path == '/metrics':
+            body = json.dumps(link.metrics.snapshot()).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        elif path == '/timeline.svg':
+            try:
+                entry = self.get_timeline(query)
+            except ValueError as e:
+                self.send_error(400, str(e))
+                return
+            self.send_cached(entry)
+        elif path == '/api/series':
+            try:
+                entry = self.get_series(query)
+            except ValueError as e:
+                self.send_json_error(400, str(e))
+                return
+            self.send_cached(entry)
+        else:
+            self.send_response(404)
+            self.end_headers()
+
+    def get_status(self):
+        """
+        Build the /status document: the polled readings and forecast of every
+        manifold, the email status and the background jobs.
+
+        Returns:
+            dict: JSON-serialisable status.
+        """
+        # Top-level fields describe the primary manifold, as before
+        # multi-manifold support; 'manifolds' lists all of them.
+        return {
+            'leftBankContents': link.data.get('leftBankContents'),
+            'rightBankContents': link.data.get('rightBankContents'),
+            'messageTimeLeft': link.data.get('messageTimeLeft'),
+            'messageTimeRight': link.data.get('messageTimeRight'),
+            'emailStatus': {
+                'connected': link.email_status['connected'],
+                'lastCheck': link.email_status['last_check'].isoformat() if link.email_status['last_check'] else None,
+                'error': link.email_status['error']
+            },
+            'pollInterval': link.poll_interval,
+            'jobs': link.scheduler.stats() if link.scheduler is not None else {},
+            'manifolds': {
+                manifold.id: {
+                    'name': manifold.name,
+                    'pollInterval': manifold.poll_interval,
+                    'banks': manifold.bank_status(),
+                }
+                for manifold in link.manifolds.values()
+            },
+        }
+
+    def stream_events(self):
+        """
+        Answer /events with a Server-Sent Events stream: send the headers,
+        then hand the connection over to link.events, which pushes a
+        'readings' event after every poll bringing new readings, an 'order'
+        event per alert sent and an 'email' event when the SMTP connection
+        goes up or down. The worker thread is free as soon as this returns.
+        """
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        # Reason: nginx would otherwise buffer the stream
+        self.send_header('X-Accel-Buffering', 'no')
+        self.end_headers()
+        self.wfile.flush()
+        self.close_connection = True
+        link.events.attach(self.connection, preamble=b'retry: 10000\n\n')
+
+    def send_cached(self, entry):
+        """
+        Send a RenderCache entry, answering a matching If-None-Match with
+        304 Not Modified so unchanged renders are not re-downloaded. Text
+        bodies are gzipped for clients that accept it; the compressed copy
+        is kept on the entry, so each render is compressed at most once.
+        """
+        gzipped = (entry['content_type'].split(';')[0] in _COMPRESSIBLE_TYPES
+                   and self.accepts_gzip())
+        # Reason: the two encodings are different representations, so they
+        # must not share a validator
+        etag = entry['etag'][:-1] + '-gzip"' if gzipped else entry['etag']
+        if etag in [tag.strip() for tag in self.headers.get('If-None-Match', '').split(',')]:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Last-Modified', entry['last_modified'])
+            self.end_headers()
+            return
+        body = entry['body']
+        if gzipped:
+            body = entry.get('gzip')
+            if body is None:
+                body = entry['gzip'] = gzip.compress(entry['body'], compresslevel=6)
+        self.send_response(200)
+        self.send_header('Content-type', entry['content_type'])
+        self.send_header('Content-Length', str(len(body)))
+        if gzipped:
+            self.send_header('Content-Encoding', 'gzip')
+        if entry['content_type'].split(';')[0] in _COMPRESSIBLE_TYPES:
+            self.send_header('Vary', 'Accept-Encoding')
+        self.send_header('ETag', etag)
+        self.send_header('Last-Modified', entry['last_modified'])
+        self.send_header('Cache-Control', 'no-cache')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def accepts_gzip(self):
+        """True if the request's Accept-Encoding allows gzip."""
+        for coding in self.headers.get('Accept-Encoding', '').split(','):
+            name, _, params = coding.partition(';')
+            if name.strip().lower() not in ('gzip', '*'):
+                continue
+            q = params.strip()
+            try:
+                return not q.startswith('q=') or float(q[2:]) > 0
+            except ValueError:
+                return False
+        return False
+
+    def send_json_error(self, code, message):
+        body = json.dumps({'error': message}).encode('utf-8')
+        self.send_response(code)
+        self.send_header('Content-type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def get_series(self, query):
+        """
+        Serve /api/series: the readings of one bank over [from, to),
+        downsampled server-side to at most `points` samples so the client
+        can chart and zoom across years of history cheaply.
+
+        Query parameters:
+            device: Manifold id; defaults to the primary manifold.
+            bank: One of the manifold's banks, e.g. 'left' (required).
+            from, to: ISO dates or datetimes; default to the past 10 days.
+            points: Maximum samples to return (default 500, max 5000).
+
+        The body carries parallel arrays `t` (epoch seconds of the naive
+        manifold timestamps) and `v` (contents).
+
+        Returns:
+            dict: RenderCache entry holding the JSON body.
+
+        Raises:
+            ValueError: On a missing or malformed parameter.
+        """
+        def param(name, default=None):
+            values = query.get(name)
+            return values[0] if values else default
+
+        manifold = link.manifold(param('device'))
+        bank = param('bank')
+        if bank not in manifold.windows:
+            raise ValueError(f"bank must be one of: {', '.join(sorted(manifold.windows))}")
+        raw_from, raw_to = param('from'), param('to')
+        try:
+            points = int(param('points', 500))
+            end = parse_query_time(raw_to)
+            start = parse_query_time(raw_from)
+        except ValueError:
+            raise ValueError("from/to must be ISO dates and points an integer")
+        if not 2 <= points <= 5000:
+            raise ValueError("points must be between 2 and 5000")
+        if start is None:
+            # Reason: to the minute, so repeated open-ended requests share
+            # a window, and with it a cache entry, until the minute turns
+            try:
+                start = (end or datetime.now().replace(second=0, microsecond=0)) - timedelta(days=10)
+            except OverflowError:
+                raise ValueError("to is too early for the default 10-day range")
+        if end is not None and end <= start:
+            raise ValueError("from must be earlier than to")
+
+        # Keyed on the resolved window, so the default 10 days follow the
+        # clock, and versioned on the readings, so a new one is picked up
+        key = (manifold.id, bank, start, end, points)
+        version = link.readings_generation
+        entry = link.series_cache.get(key, version)
+        if entry is not None:
+            return entry
+
+        times, contents = link.recent_readings(bank, start, end, device=manifold.id)
+        sampled_times, sampled_values = downsample_minmax(times, contents, points)
+        body = json.dumps({
+            'device': manifold.id,
+            'bank': bank,
+            'from': start.isoformat(),
+            'to': end.isoformat() if end else None,
+            'sourcePoints': int(len(times)),
+            'points': int(len(sampled_times)),
+            't': sampled_times.astype('int64').tolist(),
+            'v': sampled_values.tolist(),
+        }, separators=(',', ':')).encode('utf-8')
+        return link.series_cache.put(key, version, body, 'application/json')
+
+    def get_plot(self, days=10, resample=None, timeout=None, device=None):
+        """
+        Return the cached plot for a (device, days, resample) triple,
+        rendering it only when a new reading or a new alert has arrived since
+        the last render. Each triple is cached separately, least recently
+        used first out.
+
+        Args:
+            days (int): Size of the plotted window in days.
+            resample (str | None): Bucket interval such as '1D'; None picks
+                one automatically for long windows.
+            timeout (float | None): Seconds to wait for a busy renderer
+                before giving up with TimeoutError.
+            device (str | None): Manifold to plot; the primary one by default.
 
+        Returns:
+            dict: RenderCache entry holding the PNG bytes and validators.
+        """
+        device = link.manifold(device).id
+        key = (device, days, resample)
+        version = (link.readings_generation, link.alerts_generation)
+        entry = link.plot_cache.get(key, version)
+        if entry is not None:
+            return entry
 
+        def render():
+            # Re-check: another flight may have filled the cache meanwhile
+            cached = link.plot_cache.get(key, version)
+            if cached is not None:
+                return cached
+            body = self.generate_plot(resampling_value=resample, days=days, device=device)
+            return link.plot_cache.put(key, version, body, 'image/png')
 
-class RequestHandler(BaseHTTPRequestHandler):
-    def do_GET(self):
-        if self.path == '/':
-            self.send_response(200)
-            self.send_header('Content-type', 'text/html; charset=utf-8')
-            self.end_headers()
-            self.wfile.write(self.generate_html().encode('utf-8'))
-        elif self.path == '/status':
-            self.send_response(200)
-            self.send_header('Content-type', 'application/json')
-            self.end_headers()
-            response = {
-                'leftBankContents': link.data.get('leftBankContents'),
-                'rightBankContents': link.data.get('rightBankContents'),
-                'messageTimeLeft': link.data.get('messageTimeLeft'),
-                'messageTimeRight': link.data.get('messageTimeRight'),
-                'emailStatus': {
-                    'connected': link.email_status['connected'],
-                    'lastCheck': link.email_status['last_check'].isoformat() if link.email_status['last_check'] else None,
-                    'error': link.email_status['error']
-                }
-            }
-            self.wfile.write(json.dumps(response).encode('utf-8'))
-        elif self.path == '/plot':
-            self.send_response(200)
-            self.send_header('Content-type', 'image/png')
-            self.end_headers()
-            self.generate_plot()
-            plot_path = os.path.join(_DATADIR, 'plot.png')
-            with open(plot_path, 'rb') as file:
-                self.wfile.write(file.read())
-        else:
-            self.send_response(404)
-            self.end_headers()
+        # Concurrent requests for the same render share a single flight
+        return link.plot_flight.do((key, version), render, timeout=timeout)
 
     def render_pos_tab(self):
         """
@@ -662,30 +3771,71 @@ class RequestHandler(BaseHTTPRequestHandler):
         </table>
         """
 
-    def render_orders_timeline(self, window_days=365):
+    def get_timeline(self, query, default_days=365):
         """
-        Render the order history of the past `window_days` as an inline SVG
-        timeline. Left-bank orders sit above the axis, right-bank below; each
-        marker is colored by how short the gap to the previous same-bank order
-        is, relative to that bank's median (a short gap is the leading
-        indicator of a slow leak).
+        Serve /timeline.svg: the orders of one manifold over [from, to) as
+        an SVG timeline (see timeline_svg). Rendered SVGs are cached per
+        range until the alert ledger changes; an open-ended range is also
+        re-rendered once a day, as its window moves with the clock.
 
-        Args:
-            window_days (int): Size of the displayed time window in days.
+        Query parameters:
+            device: Manifold id; defaults to the primary manifold.
+            from, to: ISO dates or datetimes; default to the past
+                `default_days` days.
 
         Returns:
-            str: HTML fragment containing the SVG and a colour legend, or an
-            empty string if there is nothing to show.
+            dict: RenderCache entry holding the SVG body.
+
+        Raises:
+            ValueError: On a malformed parameter.
         """
-        all_orders, median_interval = link.get_orders_history()
-        if not all_orders:
-            return ''
+        def param(name):
+            values = query.get(name)
+            return values[0] if values else None
 
-        now = datetime.now()
-        start = now - timedelta(days=window_days)
-        visible = [(dt, bank, days) for dt, bank, days in all_orders if dt >= start]
-        if not visible:
-            return ''
+        manifold = link.manifold(param('device'))
+        raw_from, raw_to = param('from'), param('to')
+        try:
+            end = parse_query_time(raw_to)
+            start = parse_query_time(raw_from)
+        except ValueError:
+            raise ValueError("from/to must be ISO dates")
+        version = link.alerts_generation
+        if start is None or end is None:
+            version = (version, datetime.now().date())
+        end = end or datetime.now()
+        try:
+            start = start or end - timedelta(days=default_days)
+        except OverflowError:
+            raise ValueError(f"to is too early for the default {default_days}-day range")
+        if end <= start:
+            raise ValueError("from must be earlier than to")
+
+        key = (manifold.id, raw_from, raw_to, default_days)
+        entry = link.timeline_cache.get(key, version)
+        if entry is not None:
+            return entry
+        body = self.timeline_svg(start, end, device=manifold.id).encode('utf-8')
+        return link.timeline_cache.put(key, version, body, 'image/svg+xml')
+
+    def timeline_svg(self, start, end, device=None):
+        """
+        Draw the orders of one manifold between `start` and `end` as an SVG
+        timeline. First-bank (left) orders sit above the axis, the others
+        (right) below; each marker is colored by how short the gap to the
+        previous same-bank order is, relative to that bank's median (a
+        short gap is the leading indicator of a slow leak).
+
+        The visible orders are bisected out of the sorted history, and
+        markers closer than a marker's width are merged into a cluster
+        labelled with its count and colored by its most alarming order, so
+        the SVG stays the same size however many orders the range holds.
+
+        Returns:
+            str: The SVG document.
+        """
+        visible, median_interval = link.get_orders_history(device, start=start, end=end)
+        banks = list(median_interval)
 
         # SVG geometry
         width, height = 820, 160
@@ -693,12 +3843,15 @@ class RequestHandler(BaseHTTPRequestHandler):
         plot_w = width - m_left - m_right
         plot_h = height - m_top - m_bottom
         axis_y = m_top + plot_h / 2
-        total_span = (now - start).total_seconds()
+        total_span = (end - start).total_seconds()
 
         def x_for(dt):
             frac = (dt - start).total_seconds() / total_span
             return m_left + frac * plot_w
 
+        # Colors from least to most alarming, so a cluster takes the last
+        severity = ['#888888', '#1f77b4', '#3CA055', '#F68C70', '#D0342C']
+
         def color_for(days_since, bank):
             median = median_interval.get(bank)
             if days_since is None:
@@ -712,60 +3865,113 @@ class RequestHandler(BaseHTTPRequestHandler):
                 return '#F68C70'  # orange — faster than usual
             return '#3CA055'      # green — at or near baseline
 
-        # Month tick marks and labels along the axis
+        # Axis ticks: months, quarters, years or longer for long ranges, so
+        # there are at most about 15 whatever the range; weeks or days when
+        # zoomed in
+        span_days = total_span / 86400
+        if span_days > 90:
+            for step_months in (1, 3, 6, 12, 24, 60):
+                if span_days / 30.44 / step_months <= 15:
+                    break
+            while span_days / 30.44 / step_months > 15:
+                step_months *= 10
+            def month_start(index):
+                # `index` counts months since January of year 0; None past
+                # the last representable year
+                return datetime(index // 12, index % 12 + 1, 1) if index < 10000 * 12 else None
+
+            # The first month start at or after `start` on a multiple of the step
+            first = start.year * 12 + start.month - 1 + (start > datetime(start.year, start.month, 1))
+            cur = month_start(-(-first // step_months) * step_months)
+
+            def next_tick(dt):
+                return month_start(dt.year * 12 + dt.month - 1 + step_months)
+
+            def tick_label(dt):
+                if step_months >= 12:
+                    return str(dt.year)
+                return dt.strftime('%b %y') if dt.month == 1 else dt.strftime('%b')
+        else:
+            step = timedelta(days=7 if span_days > 14 else 1)
+            cur = datetime(start.year, start.month, start.day)
+            if step.days == 7:
+                cur += timedelta(days=-cur.weekday() % 7)
+            if cur < start:
+                cur += step
+
+            def next_tick(dt):
+                return dt + step
+
+            def tick_label(dt):
+                return dt.strftime('%d %b')
         ticks = []
-        cur = datetime(start.year, start.month, 1)
-        if cur < start:
-            cur = datetime(cur.year + (cur.month == 12), 1 if cur.month == 12 else cur.month + 1, 1)
-        while cur <= now:
+        while cur is not None and cur <= end:
             x = x_for(cur)
             ticks.append(
                 f'<line x1="{x:.1f}" y1="{axis_y - 4}" x2="{x:.1f}" y2="{axis_y + 4}" stroke="#aaa" />'
             )
-            label = cur.strftime('%b %y') if cur.month == 1 else cur.strftime('%b')
             ticks.append(
                 f'<text x="{x:.1f}" y="{axis_y + plot_h / 2 + 14}" '
-                f'text-anchor="middle" font-size="11" fill="#555">{label}</text>'
+                f'text-anchor="middle" font-size="11" fill="#555">{tick_label(cur)}</text>'
             )
-            cur = datetime(cur.year + (cur.month == 12), 1 if cur.month == 12 else cur.month + 1, 1)
+            cur = next_tick(cur)
 
         # Bank-side labels
+        above, below = banks[0].title(), '/'.join(bank.title() for bank in banks[1:])
         side_labels = [
             f'<text x="{m_left - 8}" y="{axis_y - 14}" text-anchor="end" '
-            f'dominant-baseline="middle" font-size="11" fill="#555">Left</text>',
+            f'dominant-baseline="middle" font-size="11" fill="#555">{above}</text>',
             f'<text x="{m_left - 8}" y="{axis_y + 14}" text-anchor="end" '
-            f'dominant-baseline="middle" font-size="11" fill="#555">Right</text>',
+            f'dominant-baseline="middle" font-size="11" fill="#555">{below}</text>',
         ]
 
-        # Order markers
-        markers = []
+        # Group the orders of each side into runs closer than a marker
+        clusters = {True: [], False: []}
         for dt, bank, days_since in visible:
             x = x_for(dt)
-            cy = axis_y - 14 if bank == 'left' else axis_y + 14
-            color = color_for(days_since, bank)
-            median = median_interval.get(bank)
-            if days_since is None:
-                detail = f"first recorded {bank}-bank order"
+            side = clusters[bank == banks[0]]
+            if side and x - side[-1]['x'] < 11:
+                side[-1]['orders'].append((dt, bank, days_since))
             else:
-                ratio_str = f", {days_since / median * 100:.0f}% of {median:.0f}d median" if median else ""
-                detail = f"{days_since:.1f}d since previous {bank}-bank order{ratio_str}"
-            tooltip = f"{dt.strftime('%Y-%m-%d %H:%M')} | {bank} bank | {detail}"
-            markers.append(
-                f'<circle cx="{x:.1f}" cy="{cy:.1f}" r="5" fill="{color}" '
-                f'stroke="#333" stroke-width="0.5"><title>{tooltip}</title></circle>'
-            )
+                side.append({'x': x, 'orders': [(dt, bank, days_since)]})
+
+        # Order markers
+        markers = []
+        for is_first, side in clusters.items():
+            cy = axis_y - 14 if is_first else axis_y + 14
+            for cluster in side:
+                orders = cluster['orders']
+                if len(orders) == 1:
+                    dt, bank, days_since = orders[0]
+                    median = median_interval.get(bank)
+                    if days_since is None:
+                        detail = f"first recorded {bank}-bank order"
+                    else:
+                        ratio_str = f", {days_since / median * 100:.0f}% of {median:.0f}d median" if median else ""
+                        detail = f"{days_since:.1f}d since previous {bank}-bank order{ratio_str}"
+                    tooltip = f"{dt.strftime('%Y-%m-%d %H:%M')} | {bank} bank | {detail}"
+                    markers.append(
+                        f'<circle cx="{cluster["x"]:.1f}" cy="{cy:.1f}" r="5" fill="{color_for(days_since, bank)}" '
+                        f'stroke="#333" stroke-width="0.5"><title>{tooltip}</title></circle>'
+                    )
+                    continue
+                color = max((color_for(days, bank) for _, bank, days in orders), key=severity.index)
+                x = (x_for(orders[0][0]) + x_for(orders[-1][0])) / 2
+                tooltip = (f"{len(orders)} orders | {orders[0][0].strftime('%Y-%m-%d %H:%M')} to "
+                           f"{orders[-1][0].strftime('%Y-%m-%d %H:%M')} | zoom in for details")
+                markers.append(
+                    f'<g><title>{tooltip}</title>'
+                    f'<circle cx="{x:.1f}" cy="{cy:.1f}" r="8" fill="{color}" stroke="#333" stroke-width="0.5" />'
+                    f'<text x="{x:.1f}" y="{cy:.1f}" text-anchor="middle" dominant-baseline="central" '
+                    f'font-size="9" fill="#fff">{len(orders)}</text></g>'
+                )
 
         axis_line = (
             f'<line x1="{m_left}" y1="{axis_y}" x2="{m_left + plot_w}" y2="{axis_y}" '
             f'stroke="#666" stroke-width="1" />'
         )
 
-        left_med = median_interval.get('left')
-        right_med = median_interval.get('right')
-        left_med_str = f"{left_med:.1f} days" if left_med is not None else 'N/A'
-        right_med_str = f"{right_med:.1f} days" if right_med is not None else 'N/A'
-
-        svg = (
+        return (
             f'<svg viewBox="0 0 {width} {height}" xmlns="http://www.w3.org/2000/svg" '
             f'style="max-width:100%;height:auto;">'
             f'{axis_line}'
@@ -775,11 +3981,38 @@ class RequestHandler(BaseHTTPRequestHandler):
             f'</svg>'
         )
 
+    def render_orders_timeline(self, window_days=365, device=None):
+        """
+        Render the order history of the past `window_days` as an inline SVG
+        timeline (see timeline_svg) with its colour legend, served from the
+        same cache as /timeline.svg.
+
+        Args:
+            window_days (int): Size of the displayed time window in days.
+            device (str | None): Manifold whose orders to show; the primary
+                one by default.
+
+        Returns:
+            str: HTML fragment containing the SVG and a colour legend, or an
+            empty string if there is nothing to show.
+        """
+        device = link.manifold(device).id
+        start = datetime.now() - timedelta(days=window_days)
+        visible, median_interval = link.get_orders_history(device, start=start)
+        if not visible:
+            return ''
+        svg = self.get_timeline({'device': [device]}, default_days=window_days)['body'].decode('utf-8')
+
+        median_str = ', '.join(
+            f"{bank.title()}: {median:.1f} days" if median is not None else f"{bank.title()}: N/A"
+            for bank, median in median_interval.items()
+        )
+
         return f"""
         <div class="timeline-container">
             <h3>Orders over the past {window_days // 30} months</h3>
             <p><small>Median interval between same-bank orders &mdash;
-            Left: {left_med_str}, Right: {right_med_str}.
+            {median_str}.
             Hover a dot for details.</small></p>
             {svg}
             <div class="timeline-legend">
@@ -791,15 +4024,124 @@ class RequestHandler(BaseHTTPRequestHandler):
         </div>
         """
 
-    def generate_html(self):
-        # Generate the current status table
-        left_content = int(link.data.get('leftBankContents', 0))
-        right_content = int(link.data.get('rightBankContents', 0))
-        left_message_time = link.data.get('messageTimeLeft', 'N/A')
-        right_message_time = link.data.get('messageTimeRight', 'N/A')
-        left_last_change = link.data.get('lastChangeLeft', 'N/A')
-        right_last_change = link.data.get('lastChangeRight', 'N/A')
+    def get_page(self, device=None):
+        """
+        Return the dashboard page of one manifold, assembled from cached
+        fragments that are each re-rendered only by the event that changes
+        them:
+
+        - banner (title, device navigation, email warning): the email status
+        - status table: a new reading or alert, and the hour turning, as the
+          message-time colours age
+        - orders timeline: an alert, and the date rolling over
+        - POs tab: an alert or a PO change, and the date rolling over, for
+          the expiry highlighting
+
+        The page itself is cached on the combination of those versions, so
+        a hit costs no rendering at all.
+
+        Args:
+            device (str | None): Manifold to show; the primary one by default.
+
+        Returns:
+            dict: RenderCache entry holding the HTML.
+        """
+        manifold = link.manifold(device)
+        now = datetime.now()
+        email = link.email_status
+        alerts = link.alerts_generation
+        fragments = [
+            ('banner', self.render_banner,
+             (tuple(link.manifolds), email['connected'], email['error'],
+              None if email['connected'] else email['last_check'])),
+            ('status', self.render_status,
+             (link.readings_generation, alerts, now.replace(minute=0, second=0, microsecond=0))),
+            ('timeline', lambda m: self.render_orders_timeline(window_days=365, device=m.id),
+             (alerts, now.date())),
+            ('pos', lambda m: self.render_pos_tab(), (link.pos_generation, alerts, now.date())),
+        ]
+        key = ('page', manifold.id)
+        version = tuple(fragment_version for _, _, fragment_version in fragments)
+        entry = link.html_cache.get(key, version)
+        if entry is not None:
+            return entry
+
+        parts = {}
+        for name, render, fragment_version in fragments:
+            cached = link.html_cache.get((name, manifold.id), fragment_version)
+            if cached is None:
+                cached = link.html_cache.put((name, manifold.id), fragment_version,
+                                             render(manifold).encode('utf-8'), 'text/html; charset=utf-8')
+            parts[name] = cached['body']
+
+        device_query = '' if manifold is link.primary else f'?device={quote(manifold.id)}'
+        plot = f"""
+                <div class="center">
+                    <img id="plot" src="/plot{device_query}" data-src="/plot{device_query}" alt="Bank Contents Plot">
+                </div>
+            </div>
+            <div id="tab-pos" class="tab-pane">
+"""
+        body = b''.join([
+            _PAGE_HEAD, parts['banner'], _PAGE_TABS, parts['status'], parts['timeline'],
+            plot.encode('utf-8'), parts['pos'], _PAGE_TAIL,
+        ])
+        return link.html_cache.put(key, version, body, 'text/html; charset=utf-8')
+
+    def generate_html(self, device=None):
+        """Return the dashboard page of one manifold as a string (see get_page)."""
+        return self.get_page(device)['body'].decode('utf-8')
+
+    def render_banner(self, manifold):
+        """
+        Render the page title, the device navigation and, while email is
+        failing, the email warning.
+        """
+        # Device navigation, only when there is more than one manifold
+        device_nav_html = ''
+        if len(link.manifolds) > 1:
+            ids = list(link.manifolds)
+            position = ids.index(manifold.id)
+            links = []
+            for i, other in enumerate(link.manifolds.values()):
+                href = '/' if i == 0 else f'/?device={quote(other.id)}'
+                style = ' class="current"' if other is manifold else ''
+                links.append(f'<a href="{href}"{style}>{html_escape(other.name)}</a>')
+            prev_id, next_id = ids[position - 1], ids[(position + 1) % len(ids)]
+            device_nav_html = f"""
+            <div class="device-nav center">
+                <a href="/?device={quote(prev_id)}" title="Previous manifold">&larr;</a>
+                {' | '.join(links)}
+                <a href="/?device={quote(next_id)}" title="Next manifold">&rarr;</a>
+            </div>
+            """
+
+        # Email warning, hidden while the connection works; the page's
+        # 'email' event listener shows, fills in and hides it in place
+        email = link.email_status
+        error_msg = (email.get('error') or 'Unknown error') if not email['connected'] else ''
+        last_check = email.get('last_check')
+        last_check_str = last_check.strftime('%Y-%m-%d %H:%M') if last_check else 'Never'
+        email_alert_html = f"""
+            <div class="email-alert" id="email-alert"{' hidden' if email['connected'] else ''}>
+                <i class="fa fa-exclamation-triangle"></i>
+                <strong>Email Connection Problem!</strong>
+                <p>Email alerts are currently not working. Last check: <span class="last-check">{last_check_str}</span></p>
+                <p class="error-detail">Error: <span class="error">{html_escape(error_msg)}</span></p>
+            </div>
+            """
+
+        return f"""
+            <h2 class="center">FlyRoom CO<sub>2</sub> Bank Status{'' if manifold.id == _DEFAULT_DEVICE else ' &mdash; ' + html_escape(manifold.name)}</h2>
+            {device_nav_html}
+            {email_alert_html}
+"""
 
+    def render_status(self, manifold):
+        """
+        Render the status table of one manifold, one row per bank, with the
+        last alert above it.
+        """
         def get_color(value):
             if value > 70:
                 return 'background-color: #9FE481;'  # pastel green
@@ -840,305 +4182,254 @@ class RequestHandler(BaseHTTPRequestHandler):
             else:
                 return '<i class="fa fa-tachometer" style="color: #D0342C;"></i>'  # pastel red
 
-        left_color = get_color(left_content)
-        right_color = get_color(right_content)
-        left_message_time_color = get_date_color(left_message_time)
-        right_message_time_color = get_date_color(right_message_time)
-        left_last_change_color = get_date_color(left_last_change)
-        right_last_change_color = get_date_color(right_last_change)
+        def format_forecast(estimator, threshold):
+            rate = estimator.rate if estimator is not None else None
+            if rate is None:
+                return 'N/A'
+            if rate <= 0:
+                return 'Not in use'
 
-        left_message_time_formatted = format_date(left_message_time)
-        right_message_time_formatted = format_date(right_message_time)
-        left_last_change_formatted = format_date(left_last_change)
-        right_last_change_formatted = format_date(right_last_change)
+            def projected(level):
+                # None when the projection is more than ten years out
+                when = estimator.time_to(level)
+                return f"by {when:%Y-%m-%d %H:%M}" if when is not None else 'in over 10 years'
 
-        left_icon = get_icon(left_content)
-        right_icon = get_icon(right_content)
+            return f"{rate * 24:.1f}% a day, {threshold}% {projected(threshold)}, empty {projected(0)}"
 
-        # Read the last alert date and time
-        last_alert_message = 'No alerts sent yet'
-        last_alert_file = os.path.join(_DATADIR, 'last_alert.log')
-        if os.path.exists(last_alert_file):
-            with open(last_alert_file, 'r') as file:
-                lines = file.readlines()
-                last_entry = lines[-1].strip()  # Get the latest entry
-                parts = last_entry.split(',')
-                if len(parts) >= 2:
-                    last_alert_time, bank_side = parts[0], parts[1]
-                    last_alert_message = f"The last alert was sent on {last_alert_time} for the {bank_side} bank"
-
-        # Orders timeline (past 12 months) — short same-bank gaps may indicate a leak
-        orders_html = self.render_orders_timeline(window_days=365)
-
-        # Purchase Orders tab content
-        pos_html = self.render_pos_tab()
-
-
-        # Check if email connection has problems
-        email_alert_html = ''
-        if not link.email_status['connected']:
-            error_msg = link.email_status.get('error', 'Unknown error')
-            last_check = link.email_status.get('last_check')
-            if last_check:
-                last_check_str = last_check.strftime('%Y-%m-%d %H:%M')
-            else:
-                last_check_str = 'Never'
+        # Generate the current status table, one row per bank
+        bank_rows = ''
+        for bank in manifold.banks:
+            contents_key, time_key, change_key = bank_fields(bank)
+            try:
+                content = int(manifold.data.get(contents_key, 0))
+            except (ValueError, TypeError):
+                content = 0
+            message_time = manifold.data.get(time_key, 'N/A')
+            last_change = manifold.data.get(change_key, 'N/A')
+            bank_rows += f"""
+                    <tr data-bank="{html_escape(bank)}">
+                        <td>{bank.title()}</td>
+                        <td class="contents" style="{get_color(content)}">{content} {get_icon(content)}</td>
+                        <td class="message-time" style="{get_date_color(message_time)}">{format_date(message_time)}</td>
+                        <td class="last-change">{format_date(last_change)}</td>
+                        <td class="forecast">{format_forecast(manifold.estimators.get(bank), manifold.banks[bank])}</td>
+                    </tr>"""
 
-            email_alert_html = f"""
-            <div class="email-alert">
-                <i class="fa fa-exclamation-triangle"></i>
-                <strong>Email Connection Problem!</strong>
-                <p>Email alerts are currently not working. Last check: {last_check_str}</p>
-                <p class="error-detail">Error: {error_msg}</p>
-            </div>
-            """
+        # Read the last alert date and time of this manifold
+        last_alert_message = 'No alerts sent yet'
+        last_order = link.alert_ledger.last_order(manifold.id)
+        if last_order is not None:
+            last_alert_time, bank_side, _ = last_order
+            last_alert_message = f"The last alert was sent on {last_alert_time.strftime('%Y-%m-%d %H:%M')} for the {bank_side} bank"
 
-        html = f"""
-        <html>
-        <head>
-            <title>Bank Status and Plot</title>
-            <style>
-                body {{ font-family: Arial, sans-serif; }}
-                .email-alert {{
-                    background-color: #ff9999;
-                    border: 2px solid #cc0000;
-                    border-radius: 5px;
-                    padding: 15px;
-                    margin: 20px auto;
-                    max-width: 600px;
-                    text-align: center;
-                }}
-                .email-alert i {{
-                    color: #cc0000;
-                    font-size: 24px;
-                    margin-right: 10px;
-                }}
-                .email-alert strong {{
-                    color: #cc0000;
-                    font-size: 18px;
-                }}
-                .email-alert p {{
-                    margin: 5px 0;
-                }}
-                .email-alert .error-detail {{
-                    font-size: 12px;
-                    color: #660000;
-                    font-style: italic;
-                }}
-                table {{
-                    width: 50%;
-                    max-width: 600px;
-                    border-collapse: collapse;
-                    margin: 20px auto;
-                }}
-                th, td {{
-                    border: 1px solid #dddddd;
-                    text-align: left;
-                    padding: 8px;
-                }}
-                th {{
-                    background-color: #f2f2f2;
-                }}
-                .center {{ text-align: center; }}
-                .timeline-container {{
-                    max-width: 820px;
-                    margin: 30px auto 10px;
-                    text-align: center;
-                }}
-                .timeline-container svg circle {{ cursor: help; }}
-                .timeline-legend {{
-                    display: flex;
-                    justify-content: center;
-                    gap: 18px;
-                    flex-wrap: wrap;
-                    font-size: 12px;
-                    margin-top: 10px;
-                    color: #555;
-                }}
-                .timeline-legend .dot {{
-                    display: inline-block;
-                    width: 10px;
-                    height: 10px;
-                    border-radius: 50%;
-                    vertical-align: middle;
-                    margin-right: 5px;
-                }}
-                .tabs {{
-                    display: flex;
-                    justify-content: center;
-                    margin: 20px 0 0;
-                    gap: 4px;
-                    border-bottom: 1px solid #dddddd;
-                }}
-                .tab-btn {{
-                    background: #f2f2f2;
-                    border: 1px solid #dddddd;
-                    border-bottom: none;
-                    padding: 8px 18px;
-                    cursor: pointer;
-                    font-size: 14px;
-                    border-radius: 4px 4px 0 0;
-                    color: #333;
-                }}
-                .tab-btn:hover {{ background: #e8e8e8; }}
-                .tab-btn.active {{
-                    background: #ffffff;
-                    font-weight: bold;
-                    position: relative;
-                    top: 1px;
-                }}
-                .tab-pane {{ display: none; }}
-                .tab-pane.active {{ display: block; }}
-                footer {{
-                    text-align: center;
-                    margin-top: 50px;
-                    padding: 10px;
-                    border-top: 1px solid #dddddd;
-                    font-size: 14px;
-                    width: 100%;
-                }}
-            </style>
-            <link rel="stylesheet" href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.0.0-beta3/css/all.min.css">
-        </head>
-        <body>
-            <h2 class="center">FlyRoom CO<sub>2</sub> Bank Status</h2>
-            {email_alert_html}
-            <div class="tabs">
-                <button class="tab-btn active" data-tab="status">Status</button>
-                <button class="tab-btn" data-tab="pos">Purchase Orders</button>
-            </div>
-            <div id="tab-status" class="tab-pane active">
-                <p class="center">{last_alert_message}</p>
-                <table>
+        return f"""
+                <p class="center" id="last-alert">{last_alert_message}</p>
+                <table id="bank-status" data-device="{html_escape(manifold.id)}">
                     <tr>
                         <th>Bank</th>
                         <th>Contents</th>
                         <th>Message Time</th>
                         <th>Last Change</th>
+                        <th>Forecast</th>
                     </tr>
-                    <tr>
-                        <td>Left</td>
-                        <td style="{left_color}">{left_content} {left_icon}</td>
-                        <td style="{left_message_time_color}">{left_message_time_formatted}</td>
-                        <td>{left_last_change_formatted}</td>
-                    </tr>
-                    <tr>
-                        <td>Right</td>
-                        <td style="{right_color}">{right_content} {right_icon}</td>
-                        <td style="{right_message_time_color}">{right_message_time_formatted}</td>
-                        <td>{right_last_change_formatted}</td>
-                    </tr>
+                    {bank_rows}
                 </table>
-                {orders_html}
-                <div class="center">
-                    <img src="/plot" alt="Bank Contents Plot">
-                </div>
-            </div>
-            <div id="tab-pos" class="tab-pane">
-                {pos_html}
-            </div>
-            <footer class="center">
-                CO<sub>2</sub> bank for the Dept of Life Sciences Fly Room - Imperial College London - <a href="https://dfs.linde.com/main/dashboard">Linde Dashboard</a>
-            </footer>
-            <script>
-                document.querySelectorAll('.tab-btn').forEach(function (btn) {{
-                    btn.addEventListener('click', function () {{
-                        document.querySelectorAll('.tab-btn').forEach(function (b) {{ b.classList.remove('active'); }});
-                        document.querySelectorAll('.tab-pane').forEach(function (p) {{ p.classList.remove('active'); }});
-                        btn.classList.add('active');
-                        document.getElementById('tab-' + btn.dataset.tab).classList.add('active');
-                    }});
-                }});
-            </script>
-        </body>
-        </html>
+"""
+
+    def generate_plot(self, resampling_value=None, days=10, device=None):
         """
-        return html
+        Render the bank contents of one manifold over the past `days` days,
+        one panel per bank. The readings come
+        from the in-memory ring buffers (or the readings store for windows
+        longer than they hold); the drawing itself happens in the renderer
+        pool, which receives only compact arrays.
+
+        Args:
+            resampling_value (str | None): Bucket interval such as '1D'.
+                Each bucket is drawn as its mean with a min-max band.
+                None draws raw readings for short windows and picks an
+                interval automatically for long ones.
+            days (int): Size of the plotted window in days.
+            device (str | None): Manifold to plot; the primary one by default.
 
+        Returns:
+            bytes: The PNG image.
+        """
+        manifold = link.manifold(device)
+        now = datetime.now()
+        time_window = now - timedelta(days=days)
+        resampling_value = resampling_value or auto_interval(days)
 
+        banks, ranges = {}, {}
+        for bank in manifold.banks:
+            if resampling_value:
+                times, contents, lows, highs = link.recent_readings(bank, time_window, device=manifold.id, spread=True)
+                times, contents, mins, maxs = resample_buckets(times, contents, parse_interval(resampling_value),
+                                                               lows, highs)
+                ranges[bank] = (mins, maxs)
+            else:
+                times, contents = link.recent_readings(bank, time_window, device=manifold.id)
+            banks[bank] = (times.astype('int64'), contents)
 
+        # Read the last alert dates and times
+        alert_times = {bank: [] for bank in manifold.banks}
+        for last_time, last_bank, _ in link.alert_ledger.orders(manifold.id, start=time_window):
+            if last_bank in alert_times:
+                alert_times[last_bank].append(last_time)
 
-    def generate_plot(self, resampling_value='3H', days=10):
-        # Load data from CSV log file
-        df = pd.read_csv(link.log_file, parse_dates=['messageTime'])
-        df['messageTime'] = pd.to_datetime(df['messageTime'], errors='coerce')
+        job = {
+            'days': days,
+            'name': None if manifold.id == _DEFAULT_DEVICE else manifold.name,
+            'start': int(np.datetime64(time_window, 's').astype('int64')),
+            'end': int(np.datetime64(now, 's').astype('int64')),
+            'banks': banks,
+            'ranges': ranges,
+            'resample': resampling_value,
+            'alerts': {bank: np.array(times, dtype='datetime64[s]').astype('int64')
+                       for bank, times in alert_times.items()},
+            'format': 'png',
+        }
+        timeout = getattr(getattr(self, 'server', None), 'request_timeout', None)
+        return render_plot_job(job, timeout=timeout)
 
-        # Filter data for the past 7 days
-        now = datetime.now()
-        time_window = now - timedelta(days=days)
-        df_filtered = df[df['messageTime'] >= time_window]
 
-        # Ensure 'content' column is numeric
-        df_filtered = df_filtered.copy()
-        df_filtered['content'] = pd.to_numeric(df_filtered['content'], errors='coerce')
+class EventStreamMixin():
+    """
+    Leaves connections handed over to link.events open once their request
+    has been handled, instead of shutting them down.
+    """
 
-        # Separate left and right banks
-        df_left = df_filtered[df_filtered['bank'] == 'left'].set_index('messageTime')
-        df_right = df_filtered[df_filtered['bank'] == 'right'].set_index('messageTime')
+    def shutdown_request(self, request):
+        if link.events.owns(request):
+            return
+        super().shutdown_request(request)
 
-        # Ensure that 'content' column is a valid numeric type for interpolation
-        # Then Interpolate data
-        df_left_interpolated = df_left.infer_objects(copy=False).interpolate(method='time')
-        df_right_interpolated = df_right.infer_objects(copy=False).interpolate(method='time')
 
-        # Read the last alert dates and times
-        alert_times = {'left': [], 'right': []}
-        last_alert_file = os.path.join(_DATADIR, 'last_alert.log')
-        if os.path.exists(last_alert_file):
-            with open(last_alert_file, 'r') as file:
-                for line in file:
-                    parts = line.strip().split(',')
-                    if len(parts) < 2:
-                        continue
-                    last_time_str, last_bank = parts[0], parts[1]
-                    last_time = datetime.strptime(last_time_str, '%Y-%m-%d %H:%M')
-                    if last_bank in alert_times:
-                        alert_times[last_bank].append(last_time)
-
-        # Create a figure with two subplots
-        fig, axs = plt.subplots(2, 1, figsize=(10, 6), sharex=True)
-
-        # Plot left bank data on the first subplot
-        axs[0].plot(df_left.index, df_left['content'], 'o', label='Left Bank Real Data', color='#1f77b4')
-        axs[0].plot(df_left_interpolated.index, df_left_interpolated['content'], '-', label='Left Bank Interpolated', color='#1f77b4', alpha=0.5)
-        for alert_time in alert_times['left']:
-            axs[0].axvline(x=alert_time, color='#cfcfc4', linestyle='--', label='_nolegend_')
-        axs[0].set_ylabel('Left Bank Content')
-        axs[0].set_ylim([-5, 105])
-        axs[0].grid(True)
-
-        # Plot right bank data on the second subplot
-        axs[1].plot(df_right.index, df_right['content'], 'x', label='Right Bank Real Data', color='#ff7f0e')
-        axs[1].plot(df_right_interpolated.index, df_right_interpolated['content'], '-', label='Right Bank Interpolated', color='#ff7f0e', alpha=0.5)
-        for alert_time in alert_times['right']:
-            axs[1].axvline(x=alert_time, color='#cfcfc4', linestyle='--', label='_nolegend_')
-        axs[1].set_xlabel('Time')
-        axs[1].set_ylabel('Right Bank Content')
-        axs[1].set_ylim([-5, 105])
-        axs[1].grid(True)
-
-        # Add a single legend below the plots
-        handles0, labels0 = axs[0].get_legend_handles_labels()
-        handles1, labels1 = axs[1].get_legend_handles_labels()
-        handles = handles0 + handles1 + [plt.Line2D([0], [0], color='#cfcfc4', linestyle='--', label='Alert Sent')]
-        labels = labels0 + labels1 + ['Alert Sent']
-        fig.legend(handles=handles, labels=labels, loc='lower center', ncol=3)  # Move legend to bottom
-
-        axs[0].set_title(f"Bank Contents for the Past {days} Days")
-
-        plt.xlim(time_window, now)  # Ensure x-axis limits are set correctly
-        plt.tight_layout(rect=[0, 0.1, 1, 0.95])  # Adjust layout to make space for the legend at the bottom
-        plot_path = os.path.join(_DATADIR, 'plot.png')
-        plt.savefig(plot_path)
-        plt.close()
-
-
-def run_server(server_class=HTTPServer, handler_class=RequestHandler, port=_DEFAULT_PORT):
-    server_address = ('', port)
-    httpd = server_class(server_address, handler_class)
-    print(f'Starting httpd server on port {port}')
+class EventStreamHTTPServer(EventStreamMixin, HTTPServer):
+    """HTTPServer handling one request at a time, with /events support."""
+
+
+class PooledHTTPServer(EventStreamMixin, HTTPServer):
+    """
+    HTTPServer that hands each accepted connection to a bounded thread pool,
+    so a slow /plot render or a slow client cannot stall /status.
+
+    At most `workers` requests run at once and at most `backlog` more wait
+    for a worker; beyond that, connections are answered with 503 straight
+    away instead of queueing without bound.
+    """
+
+    def __init__(self, server_address, handler_class, workers=_DEFAULT_WORKERS,
+                 request_timeout=_DEFAULT_REQUEST_TIMEOUT, backlog=None):
+        super().__init__(server_address, handler_class)
+        self.request_timeout = request_timeout
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='http')
+        self._slots = threading.BoundedSemaphore(workers + (backlog if backlog is not None else workers * 4))
+
+    def process_request(self, request, client_address):
+        if not self._slots.acquire(blocking=False):
+            try:
+                request.sendall(b'HTTP/1.0 503 Service Unavailable\r\n'
+                                b'Content-Length: 0\r\nRetry-After: 1\r\n\r\n')
+            except OSError:
+                pass
+            self.shutdown_request(request)
+            return
+        # Per-request timeout: a client that stops sending or reading
+        # releases its worker after request_timeout seconds.
+        request.settimeout(self.request_timeout)
+        self._pool.submit(self._process_request_in_pool, request, client_address)
+
+    def _process_request_in_pool(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+            self._slots.release()
+
+    def server_close(self):
+        super().server_close()
+        self._pool.shutdown(wait=False)
+
+
+def make_server(mode='threaded', port=_DEFAULT_PORT, handler_class=RequestHandler,
+                workers=_DEFAULT_WORKERS, request_timeout=_DEFAULT_REQUEST_TIMEOUT, host=''):
+    """
+    Build the HTTP server for the given mode: 'threaded' (bounded worker
+    pool, the default) or 'single' (one request at a time).
+    """
+    if mode == 'single':
+        return EventStreamHTTPServer((host, port), handler_class)
+    if mode == 'threaded':
+        return PooledHTTPServer((host, port), handler_class, workers=workers, request_timeout=request_timeout)
+    raise ValueError(f"Unknown server mode: {mode}")
+
+
+def run_server(mode='threaded', port=_DEFAULT_PORT, workers=_DEFAULT_WORKERS,
+               request_timeout=_DEFAULT_REQUEST_TIMEOUT):
+    httpd = make_server(mode=mode, port=port, workers=workers, request_timeout=request_timeout)
+    print(f'Starting {mode} httpd server on port {port}')
     httpd.serve_forever()
 
+
+def export_static(out_dir):
+    """
+    Write a static snapshot of the dashboard to `out_dir`, so a front end
+    such as nginx can serve read traffic without reaching this process:
+    for the primary manifold `index.html`, `plot.png` and `timeline.svg`,
+    for any other one the same names suffixed with `-<device id>`, plus
+    `status.json` covering them all. Text files get a precompressed `.gz`
+    twin for nginx's gzip_static.
+
+    Each file is written to a temporary name and renamed into place, so a
+    reader never sees a partial file; the pages are written last, once
+    everything they reference is in place. With the snapshot in /srv/linde,
+    nginx can map the dashboard's query-string URLs onto it with:
+
+        root /srv/linde;
+        gzip_static on;
+        location = /            { try_files /index-$arg_device.html /index.html; }
+        location = /plot        { try_files /plot-$arg_device.png /plot.png; }
+        location = /timeline.svg { try_files /timeline-$arg_device.svg /timeline.svg; }
+        location = /status      { try_files /status.json =404; }
+
+    Args:
+        out_dir (str): Output directory; created if missing.
+
+    Returns:
+        list: Names of the files written, .gz twins excluded.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    # Reason: the renderers use the handler only as a namespace over the
+    # link and its caches; no request is involved
+    renderer = object.__new__(RequestHandler)
+
+    def write(name, body, compress=False):
+        for path, data in ((name, body), (name + '.gz', gzip.compress(body, compresslevel=9) if compress else None)):
+            if data is None:
+                continue
+            tmp_path = os.path.join(out_dir, f'.{path}.tmp')
+            with open(tmp_path, 'wb') as file:
+                file.write(data)
+            os.replace(tmp_path, os.path.join(out_dir, path))
+        return name
+
+    written = []
+    pages = []
+    for manifold in link.manifolds.values():
+        suffix = '' if manifold is link.primary else '-' + quote(manifold.id, safe='')
+        written.append(write(f'plot{suffix}.png', renderer.get_plot(device=manifold.id)['body']))
+        written.append(write(f'timeline{suffix}.svg', renderer.get_timeline({'device': [manifold.id]})['body'],
+                             compress=True))
+        pages.append((f'index{suffix}.html', renderer.get_page(manifold.id)['body']))
+    written.append(write('status.json', json.dumps(renderer.get_status()).encode('utf-8'), compress=True))
+    for name, body in pages:
+        written.append(write(name, body, compress=True))
+    return written
+
+
 if __name__ == '__main__':
 
     parser = optparse.OptionParser()
@@ -1146,6 +4437,28 @@ if __name__ == '__main__':
     parser.add_option("--notify", dest="notify", default=False, help="Notify via email", action="store_true")
     parser.add_option("--port", dest="port", default=_DEFAULT_PORT, help="Port for the webserver")
     parser.add_option("--debug", dest="debug", default=False, help="Enable debug logging", action="store_true")
+    parser.add_option("--server", dest="server", default="threaded", choices=["threaded", "single"],
+                      help="HTTP server mode: threaded (bounded worker pool) or single")
+    parser.add_option("--workers", dest="workers", default=_DEFAULT_WORKERS, type="int",
+                      help="Number of HTTP worker threads in threaded mode")
+    parser.add_option("--render-workers", dest="render_workers", default=_DEFAULT_RENDER_WORKERS, type="int",
+                      help="Number of plot renderer processes (0 renders inside the web process)")
+    parser.add_option("--render-recycle", dest="render_recycle", default=_DEFAULT_RENDER_RECYCLE, type="int",
+                      help="Recycle each renderer process after this many plots")
+    parser.add_option("--request-timeout", dest="request_timeout", default=_DEFAULT_REQUEST_TIMEOUT, type="float",
+                      help="Per-request timeout in seconds")
+    parser.add_option("--storage", dest="storage", default="files", choices=["files", "sqlite"],
+                      help="Storage engine for the alert logs: files or sqlite (WAL-mode readings.db)")
+    parser.add_option("--poll-min", dest="poll_min", default=_POLL_MIN_INTERVAL, type="int",
+                      help="Shortest interval between polls in seconds, used near a bank's threshold")
+    parser.add_option("--poll-max", dest="poll_max", default=_POLL_MAX_INTERVAL, type="int",
+                      help="Longest interval between polls in seconds, used while the banks are full")
+    parser.add_option("--export", dest="export", default=None,
+                      help="Write a static snapshot of the dashboard (with .gz twins) to this directory after every poll")
+    parser.add_option("--no-server", dest="no_server", default=False, action="store_true",
+                      help="Only collect, alert and export; do not start the web server")
+    parser.add_option("--migrate", dest="migrate", default=False, action="store_true",
+                      help="Import data_log.csv, last_alert.log and staleness_alert.log into readings.db and exit")
 
     (options, args) = parser.parse_args()
 
@@ -1167,7 +4480,36 @@ if __name__ == '__main__':
     _DATADIR = option_dict["path"]
     _ALERT = option_dict["notify"]
     _PORT = int(option_dict["port"])
+    _STORAGE = option_dict["storage"]
+    if not 0 < option_dict["poll_min"] <= option_dict["poll_max"]:
+        parser.error("--poll-min must be positive and at most --poll-max")
+    _POLL_MIN_INTERVAL = option_dict["poll_min"]
+    _POLL_MAX_INTERVAL = option_dict["poll_max"]
+    _EXPORT_DIR = option_dict["export"]
+    if option_dict["no_server"] and _EXPORT_DIR is None:
+        parser.error("--no-server needs --export, or nothing would serve the dashboard")
+
+    if option_dict["migrate"]:
+        # Opening the sqlite engine runs the one-shot imports
+        _STORAGE = 'sqlite'
+        migrated = LindeLink().migrated
+        print(f"Storage in {os.path.join(_DATADIR, 'readings.db')} is up to date "
+              f"(start with --storage sqlite to use it for the alert logs): "
+              + ', '.join(f"{table}: {count}" for table, count in migrated.items()))
+        os.sys.exit(0)
+
+    if option_dict["render_workers"] > 0:
+        _RENDERER = RendererPool(processes=option_dict["render_workers"],
+                                 max_jobs_per_worker=option_dict["render_recycle"])
 
     link = LindeLink()
-    link.start_data_collection()
-    run_server(port=_PORT)
+    link.start_background()
+    try:
+        if option_dict["no_server"]:
+            print(f'Exporting the dashboard to {_EXPORT_DIR} after every poll')
+            threading.Event().wait()
+        else:
+            run_server(mode=option_dict["server"], port=_PORT, workers=option_dict["workers"],
+                       request_timeout=option_dict["request_timeout"])
+    finally:
+        link.stop_background()
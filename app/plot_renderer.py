@@ -0,0 +1,127 @@
+"""Plot rendering for the Linde dashboard.
+
+This module is what runs inside the renderer worker processes. The web
+process only needs it to hand jobs over, so matplotlib is imported lazily
+inside render_plot() and never loaded by the server itself.
+
+A job is a plain dict of compact numpy arrays, cheap to pickle across the
+process boundary:
+
+    {
+        'days': 10,                       # window size, for the title
+        'name': 'Gas room 2' | None,      # manifold name, for the title
+        'start': int, 'end': int,         # x-axis limits, epoch seconds
+        'banks': {                        # one panel per bank, in order
+            'left':  (times int64[s], contents float64),
+            'right': (times int64[s], contents float64),
+        },
+        'ranges': {'left': (mins, maxs), ...},   # optional, resampled plots
+        'resample': '1D' | None,                # bucket interval, for the title
+        'alerts': {'left': int64[s], 'right': int64[s]},
+        'format': 'png' | 'svg',
+    }
+"""
+from io import BytesIO
+
+import numpy as np
+
+_BANK_STYLE = {
+    'left': {'marker': 'o', 'color': '#1f77b4', 'name': 'Left'},
+    'right': {'marker': 'x', 'color': '#ff7f0e', 'name': 'Right'},
+}
+
+# Banks other than left/right cycle through these
+_EXTRA_MARKERS = ('s', '^', 'D', 'v')
+_EXTRA_COLORS = ('#2ca02c', '#d62728', '#9467bd', '#8c564b')
+
+CONTENT_TYPES = {'png': 'image/png', 'svg': 'image/svg+xml'}
+
+
+def interpolate_gaps(times, contents):
+    """
+    Fill NaN contents by linear interpolation in time between the nearest
+    valid readings. Leading and trailing gaps stay NaN (no extrapolation).
+    """
+    filled = contents.astype('float64', copy=True)
+    valid = ~np.isnan(filled)
+    if valid.sum() < 2:
+        return filled
+    x = times.astype('int64')
+    first, last = np.flatnonzero(valid)[[0, -1]]
+    inner = slice(first, last + 1)
+    filled[inner] = np.interp(x[inner], x[valid], filled[valid])
+    return filled
+
+
+def _bank_style(bank, index):
+    style = _BANK_STYLE.get(bank)
+    if style is None:
+        style = {'marker': _EXTRA_MARKERS[index % len(_EXTRA_MARKERS)],
+                 'color': _EXTRA_COLORS[index % len(_EXTRA_COLORS)],
+                 'name': bank.title()}
+    return style
+
+
+def render_plot(job):
+    """
+    Render a bank contents plot with one panel per bank.
+
+    Args:
+        job (dict): Plot job as described in the module docstring.
+
+    Returns:
+        bytes: The encoded image.
+    """
+    # Reason: the object-oriented Figure API keeps no global state, unlike
+    # pyplot, so it is also safe when rendering in-process from threads.
+    from matplotlib.figure import Figure
+    from matplotlib.lines import Line2D
+
+    bank_names = list(job['banks']) or ['left', 'right']
+    fig = Figure(figsize=(10, 3 * len(bank_names)))
+    axs = fig.subplots(len(bank_names), 1, sharex=True, squeeze=False)[:, 0]
+
+    for index, (ax, bank) in enumerate(zip(axs, bank_names)):
+        style = _bank_style(bank, index)
+        times, contents = job['banks'].get(bank, (np.empty(0, 'int64'), np.empty(0)))
+        x = np.asarray(times, dtype='int64').astype('datetime64[s]')
+        contents = np.asarray(contents, dtype='float64')
+        if bank in job.get('ranges', {}):
+            # Resampled: bucket means with the min-max spread as a band
+            mins, maxs = job['ranges'][bank]
+            ax.fill_between(x, mins, maxs, color=style['color'], alpha=0.2, linewidth=0,
+                            label=f"{style['name']} Bank Min-Max")
+            ax.plot(x, contents, '.-', markersize=3, label=f"{style['name']} Bank Mean", color=style['color'])
+        else:
+            ax.plot(x, contents, style['marker'], label=f"{style['name']} Bank Real Data", color=style['color'])
+            ax.plot(x, interpolate_gaps(x, contents), '-', label=f"{style['name']} Bank Interpolated",
+                    color=style['color'], alpha=0.5)
+        for alert_time in np.asarray(job['alerts'].get(bank, ()), dtype='int64').astype('datetime64[s]'):
+            ax.axvline(x=alert_time, color='#cfcfc4', linestyle='--', label='_nolegend_')
+        ax.set_ylabel(f"{style['name']} Bank Content")
+        ax.set_ylim([-5, 105])
+        ax.grid(True)
+    axs[-1].set_xlabel('Time')
+
+    # Add a single legend below the plots
+    handles, labels = [], []
+    for ax in axs:
+        ax_handles, ax_labels = ax.get_legend_handles_labels()
+        handles += ax_handles
+        labels += ax_labels
+    handles.append(Line2D([0], [0], color='#cfcfc4', linestyle='--', label='Alert Sent'))
+    labels.append('Alert Sent')
+    fig.legend(handles=handles, labels=labels, loc='lower center', ncol=3)
+
+    title = f"Bank Contents for the Past {job['days']} Days"
+    if job.get('name'):
+        title = f"{job['name']}: {title}"
+    if job.get('resample'):
+        title += f" ({job['resample']} buckets)"
+    axs[0].set_title(title)
+    axs[-1].set_xlim(np.datetime64(job['start'], 's'), np.datetime64(job['end'], 's'))
+    fig.tight_layout(rect=[0, 0.1, 1, 0.95])
+
+    buffer = BytesIO()
+    fig.savefig(buffer, format=job.get('format', 'png'))
+    return buffer.getvalue()
@@ -0,0 +1,119 @@
+"""Benchmark: order history and timeline cost with a long alert log.
+
+Writes a last_alert.log of synthetic orders (100k by default), then times a
+dashboard's worth of order-history reads the way they were computed before
+the statistics were kept incrementally (reparse the log, sort the orders,
+build and sort the per-bank interval lists) against the incremental path:
+one OrderStats build, then new orders folded in with note_order() and the
+365-day timeline served from a bisected window.
+
+Usage:
+    python benchmarks/bench_orders_history.py [--orders 100000] [--renders 20]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'app')))
+
+import linde_manager  # noqa: E402
+
+
+def write_log(path, count):
+    rng = random.Random(42)
+    now = datetime.now().replace(second=0, microsecond=0)
+    when = now - timedelta(hours=count * 2)
+    with open(path, 'w') as f:
+        for _ in range(count):
+            when += timedelta(minutes=rng.randint(60, 180))
+            f.write(f"{when.strftime('%Y-%m-%d %H:%M')},{rng.choice(('left', 'right'))},PO-A\n")
+
+
+def build_link(data_dir):
+    linde_manager._DATADIR = data_dir
+    link = object.__new__(linde_manager.LindeLink)
+    link._init_state()
+    link.credentials = {}
+    link.pos = []
+    link.last_alert_file = os.path.join(data_dir, 'last_alert.log')
+    link.log_file = os.path.join(data_dir, 'data_log.csv')
+    link.readings_db = os.path.join(data_dir, 'readings.db')
+    link.setup_logging()
+    linde_manager.link = link
+    return link
+
+
+def rescan_history(path, banks=('left', 'right')):
+    """The pre-incremental computation: full reparse, sort and medians."""
+    orders = []
+    with open(path) as f:
+        for line in f:
+            parts = line.strip().split(',')
+            try:
+                orders.append((datetime.strptime(parts[0], '%Y-%m-%d %H:%M'), parts[1]))
+            except (ValueError, IndexError):
+                continue
+    orders.sort()
+    median = {}
+    for bank in banks:
+        dates = [dt for dt, b in orders if b == bank]
+        intervals = sorted((dates[i] - dates[i - 1]).total_seconds() / 86400 for i in range(1, len(dates)))
+        median[bank] = intervals[len(intervals) // 2] if intervals else None
+    enriched, last_seen = [], {}
+    for dt, bank in orders:
+        prev = last_seen.get(bank)
+        enriched.append((dt, bank, (dt - prev).total_seconds() / 86400 if prev else None))
+        last_seen[bank] = dt
+    start = datetime.now() - timedelta(days=365)
+    return [o for o in enriched if o[0] >= start], median
+
+
+def timed(func, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat
+
+
+def main(count, renders):
+    data_dir = tempfile.mkdtemp(prefix='linde-bench-')
+    link = build_link(data_dir)
+    write_log(link.last_alert_file, count)
+    handler = object.__new__(linde_manager.RequestHandler)
+    start = datetime.now() - timedelta(days=365)
+
+    rescan = timed(lambda: rescan_history(link.last_alert_file), renders)
+    link.alert_ledger.refresh()
+    build = timed(lambda: linde_manager.OrderStats(link.alert_ledger.orders(), link.alert_ledger.refresh()), 1)
+    link.get_orders_history()
+    history = timed(lambda: link.get_orders_history(start=start), renders)
+    timeline = timed(lambda: handler.render_orders_timeline(), renders)
+
+    when = [datetime.now()]
+
+    def new_order():
+        when[0] += timedelta(hours=2)
+        link.note_order(when[0], 'left', 'PO-A')
+
+    append = timed(new_order, renders)
+    after_append = timed(lambda: link.get_orders_history(start=start), renders)
+
+    print(f"{count} orders, {len(link.get_orders_history(start=start)[0])} in the 365-day window")
+    print(f"  rescan per render:              {rescan * 1000:9.2f} ms")
+    print(f"  OrderStats build (once):        {build * 1000:9.2f} ms")
+    print(f"  incremental history per render: {history * 1000:9.2f} ms")
+    print(f"  timeline render (incremental):  {timeline * 1000:9.2f} ms")
+    print(f"  note_order (log + fold in):     {append * 1000:9.2f} ms")
+    print(f"  history after a new order:      {after_append * 1000:9.2f} ms")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--orders', type=int, default=100000)
+    parser.add_argument('--renders', type=int, default=20)
+    args = parser.parse_args()
+    main(args.orders, args.renders)
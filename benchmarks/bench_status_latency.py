@@ -0,0 +1,115 @@
+"""Benchmark: /status latency while /plot is under load.
+
+Starts the dashboard against a synthetic data directory in each server mode,
+keeps several clients hammering /plot (with the plot cache invalidated
+continuously so every request renders), and measures /status latency from a
+separate client. In 'threaded' mode the /status p99 should stay flat; in
+'single' mode it grows with the render time.
+
+Usage:
+    python benchmarks/bench_status_latency.py [--seconds 5] [--plot-clients 4]
+"""
+import argparse
+import http.client
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'app')))
+
+import linde_manager  # noqa: E402
+
+
+def build_link(data_dir):
+    linde_manager._DATADIR = data_dir
+    link = object.__new__(linde_manager.LindeLink)
+    link._init_state()
+    link.credentials = {}
+    link.pos = []
+    link.last_alert_file = os.path.join(data_dir, 'last_alert.log')
+    link.log_file = os.path.join(data_dir, 'data_log.csv')
+    link.readings_db = os.path.join(data_dir, 'readings.db')
+    link.setup_logging()
+    now = datetime.now().replace(microsecond=0)
+    link.readings.append_many([
+        ((now - timedelta(hours=h)).strftime('%Y-%m-%dT%H:%M:%S'), bank, None, (h * 7) % 100)
+        for h in range(24 * 10, 0, -1) for bank in ('left', 'right')
+    ])
+    link.load_recent_readings()
+    linde_manager.link = link
+    return link
+
+
+class QuietHandler(linde_manager.RequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def get(port, path):
+    start = time.perf_counter()
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+    conn.request('GET', path)
+    conn.getresponse().read()
+    conn.close()
+    return time.perf_counter() - start
+
+
+def percentile(samples, q):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def run(mode, seconds, plot_clients):
+    link = build_link(tempfile.mkdtemp(prefix='linde-bench-'))
+    httpd = linde_manager.make_server(mode=mode, port=0, host='127.0.0.1', handler_class=QuietHandler)
+    port = httpd.server_address[1]
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+
+    stop = threading.Event()
+
+    def invalidate():
+        while not stop.is_set():
+            link.readings_generation += 1
+            time.sleep(0.01)
+
+    def plot_client():
+        while not stop.is_set():
+            get(port, '/plot')
+
+    workers = [threading.Thread(target=invalidate, daemon=True)]
+    workers += [threading.Thread(target=plot_client, daemon=True) for _ in range(plot_clients)]
+
+    idle = [get(port, '/status') for _ in range(50)]
+    for t in workers:
+        t.start()
+    loaded = []
+    deadline = time.time() + seconds
+    while time.time() < deadline:
+        loaded.append(get(port, '/status'))
+        time.sleep(0.02)
+    stop.set()
+    for t in workers:
+        t.join(timeout=60)
+    httpd.shutdown()
+    httpd.server_close()
+
+    def fmt(samples):
+        return (f"p50 {statistics.median(samples) * 1000:7.1f} ms   "
+                f"p99 {percentile(samples, 0.99) * 1000:7.1f} ms   n={len(samples)}")
+
+    print(f"{mode:>8} idle   /status: {fmt(idle)}")
+    print(f"{mode:>8} loaded /status: {fmt(loaded)}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--plot-clients', type=int, default=4)
+    parser.add_argument('--modes', nargs='+', default=['threaded', 'single'])
+    args = parser.parse_args()
+    for mode in args.modes:
+        run(mode, args.seconds, args.plot_clients)
@@ -8,6 +8,8 @@ __init__ (token fetch, SMTP probe).
 import json
 import os
 import sys
+import threading
+from http.server import HTTPServer
 
 import pytest
 
@@ -16,7 +18,7 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..',
 import linde_manager  # noqa: E402
 
 
-def _make_link(data_dir, pos=None, log_lines=None, credentials=None):
+def _make_link(data_dir, pos=None, log_lines=None, credentials=None, manifolds=None):
     """
     Build a LindeLink-like object backed by a temp data dir, without running
     __init__ (which would attempt network and SMTP I/O).
@@ -27,11 +29,17 @@ def _make_link(data_dir, pos=None, log_lines=None, credentials=None):
     }
     (data_dir / 'credentials.json').write_text(json.dumps(creds))
     linde_manager._DATADIR = str(data_dir)
+    if manifolds is not None:
+        (data_dir / 'manifolds.json').write_text(json.dumps({'manifolds': manifolds}))
 
     link = object.__new__(linde_manager.LindeLink)
     link.credentials = creds
     link.last_alert_file = str(data_dir / 'last_alert.log')
     link.log_file = str(data_dir / 'data_log.csv')
+    link.readings_db = str(data_dir / 'readings.db')
+    link._init_state()
+    link.load_manifolds()
+    link.setup_logging()
 
     if pos is not None:
         (data_dir / 'pos.json').write_text(json.dumps({'pos': pos}))
@@ -49,6 +57,32 @@ def _make_link(data_dir, pos=None, log_lines=None, credentials=None):
 @pytest.fixture
 def make_link(tmp_path):
     """Factory fixture: build a LindeLink against a fresh temp data dir."""
-    def _factory(pos=None, log_lines=None, credentials=None):
-        return _make_link(tmp_path, pos=pos, log_lines=log_lines, credentials=credentials)
+    def _factory(pos=None, log_lines=None, credentials=None, manifolds=None):
+        return _make_link(tmp_path, pos=pos, log_lines=log_lines, credentials=credentials,
+                          manifolds=manifolds)
     return _factory
+
+
+@pytest.fixture
+def http_get():
+    """
+    Serve RequestHandler on an ephemeral port for the duration of a test and
+    return a helper performing GET requests against it.
+    """
+    import http.client
+
+    httpd = HTTPServer(('127.0.0.1', 0), linde_manager.RequestHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+
+    def _get(path, headers=None):
+        conn = http.client.HTTPConnection('127.0.0.1', httpd.server_address[1], timeout=30)
+        conn.request('GET', path, headers=headers or {})
+        response = conn.getresponse()
+        body = response.read()
+        conn.close()
+        return response, body
+
+    yield _get
+    httpd.shutdown()
+    httpd.server_close()
@@ -0,0 +1,71 @@
+"""Tests for the adaptive poll interval: slow while the banks are full,
+fast near a threshold when they are being drawn down, and backing off while
+the manifold stops reporting.
+"""
+import json
+from datetime import datetime, timedelta
+
+import linde_manager
+
+
+def _at(dt):
+    return dt.strftime('%Y-%m-%dT%H:%M:%S')
+
+
+def _record_hourly(link, now, left, right):
+    for hours_ago, l, r in zip(range(len(left) - 1, -1, -1), left, right):
+        t = _at(now - timedelta(hours=hours_ago))
+        link.record_readings([(t, 'left', None, l), (t, 'right', None, r)])
+
+
+def test_interval_follows_consumption_and_threshold_proximity(make_link):
+    link = make_link(pos=[])
+    now = datetime.now().replace(microsecond=0)
+    primary = link.primary
+
+    # A single reading: the closer to the threshold, the sooner
+    link.record_readings([(_at(now - timedelta(hours=4)), 'left', None, 24),
+                          (_at(now - timedelta(hours=4)), 'right', None, 90)])
+    assert link.poll_interval_for(primary) == linde_manager._POLL_MAX_INTERVAL * 14 // 50
+
+    # Left is 6% above its threshold and losing 2% an hour: 45 minutes
+    _record_hourly(link, now, [22, 20, 18, 16], [90, 90, 90, 90])
+    assert link.poll_interval_for(primary) == 2700
+
+    # Nearly empty and falling: as often as allowed
+    _record_hourly(link, now + timedelta(hours=2), [14, 11], [90, 90])
+    assert link.poll_interval_for(primary) == linde_manager._POLL_MIN_INTERVAL
+
+    # At the threshold the alert is out, so the steady right bank sets the pace
+    link.record_readings([(_at(now + timedelta(hours=3)), 'left', None, 9)])
+    assert link.poll_interval_for(primary) == linde_manager._POLL_MAX_INTERVAL
+
+    # A refill restarts the estimate; a full bank is polled rarely
+    link.record_readings([(_at(now + timedelta(hours=4)), 'left', None, 95)])
+    assert link.poll_interval_for(primary) == linde_manager._POLL_MAX_INTERVAL
+
+
+def test_backs_off_while_message_time_is_static(make_link, monkeypatch):
+    link = make_link(pos=[])
+    now = datetime.now().replace(microsecond=0)
+    _record_hourly(link, now, [22, 20, 18, 16], [90, 90, 90, 90])
+    row = {'serialNumber': 'A1'}
+    for bank, content in (('left', 16), ('right', 90)):
+        contents_key, time_key, change_key = linde_manager.bank_fields(bank)
+        row.update({contents_key: str(content), time_key: _at(now), change_key: None})
+    monkeypatch.setattr(link, 'check_message_time_freshness', lambda manifold=None: None)
+
+    intervals = []
+    for _ in range(3):
+        link.poll_manifold(link.primary, {'A1': row})
+        intervals.append(link.next_poll_interval())
+    assert link.primary.static_polls == 3
+    assert intervals == [2 * 2700, 4 * 2700, linde_manager._POLL_MAX_INTERVAL]
+
+
+def test_poll_interval_in_status(make_link, http_get):
+    link = make_link(pos=[])
+    link.next_poll_interval()
+    status = json.loads(http_get('/status')[1])
+    assert status['pollInterval'] == linde_manager._POLL_MAX_INTERVAL
+    assert status['manifolds'][linde_manager._DEFAULT_DEVICE]['pollInterval'] == linde_manager._POLL_MAX_INTERVAL
@@ -0,0 +1,101 @@
+"""Tests for the in-memory alert ledger over last_alert.log: one load,
+incremental appends, reload on external edits, and the dashboard reading
+from it instead of rescanning the file.
+"""
+import builtins
+from datetime import datetime, timedelta
+
+import linde_manager
+
+
+def _ledger(tmp_path, lines=()):
+    path = tmp_path / 'last_alert.log'
+    if lines:
+        path.write_text(''.join(line + '\n' for line in lines))
+    return linde_manager.AlertLedger(str(path)), path
+
+
+def test_indexes_orders_last_alerts_and_po_usage(tmp_path):
+    ledger, _ = _ledger(tmp_path, [
+        '2025-03-01 10:00,left,PO-A',
+        '2025-01-01 10:00,right',            # legacy line, no PO
+        '2025-02-01 10:00,left,PO-B,cage',
+        'garbage',
+    ])
+    assert [o[0].month for o in ledger.orders()] == [1, 3]
+    assert ledger.orders(start=datetime(2025, 2, 1)) == [(datetime(2025, 3, 1, 10, 0), 'left', 'PO-A')]
+    assert ledger.orders('cage') == [(datetime(2025, 2, 1, 10, 0), 'left', 'PO-B')]
+    assert ledger.last_alert('left') == datetime(2025, 3, 1, 10, 0)
+    assert ledger.last_alert('right', 'cage') is None
+    assert ledger.po_usage() == {'PO-A': 1, 'PO-B': 1}
+    assert ledger.last_order() == (datetime(2025, 3, 1, 10, 0), 'left', 'PO-A')
+    assert ledger.last_order('cage') == (datetime(2025, 2, 1, 10, 0), 'left', 'PO-B')
+    assert ledger.last_order('nope') is None
+
+
+def test_append_updates_index_without_rescanning(tmp_path, monkeypatch):
+    ledger, path = _ledger(tmp_path, ['2025-01-01 10:00,left,PO-A'])
+    version = ledger.refresh()
+
+    reads = []
+    real_open = builtins.open
+
+    def counting_open(file, mode='r', *args, **kwargs):
+        if 'r' in mode:
+            reads.append(file)
+        return real_open(file, mode, *args, **kwargs)
+
+    monkeypatch.setattr(linde_manager, 'open', counting_open, raising=False)
+    ledger.append(datetime(2025, 2, 1, 9, 30, 15), 'right', 'PO-B', device='cage')
+    assert ledger.last_alert('right', 'cage') == datetime(2025, 2, 1, 9, 30)
+    assert ledger.po_usage() == {'PO-A': 1, 'PO-B': 1}
+    assert ledger.refresh() == version + 1
+    assert reads == []
+    assert path.read_text().splitlines()[-1] == '2025-02-01 09:30,right,PO-B,cage'
+
+
+def test_external_edit_is_reloaded(tmp_path):
+    ledger, path = _ledger(tmp_path, ['2025-01-01 10:00,left,PO-A'])
+    version = ledger.refresh()
+    assert ledger.refresh() == version
+
+    with open(path, 'a') as f:
+        f.write('2025-01-05 10:00,left,PO-A\n')
+    assert ledger.po_usage() == {'PO-A': 2}
+    assert ledger.refresh() == version + 1
+
+    path.write_text('2025-01-09 10:00,right,PO-C\n')
+    assert ledger.po_usage() == {'PO-C': 1}
+    assert ledger.last_alert('left') is None
+
+
+def test_dashboard_and_polls_read_the_ledger(make_link, monkeypatch):
+    now = datetime.now().replace(second=0, microsecond=0)
+    link = make_link(pos=[{'number': 'PO-A', 'ratio': 1}], log_lines=[
+        f"{(now - timedelta(days=40)).strftime('%Y-%m-%d %H:%M')},left,PO-A",
+        f"{(now - timedelta(days=10)).strftime('%Y-%m-%d %H:%M')},left,PO-A",
+        f"{(now - timedelta(hours=1)).strftime('%Y-%m-%d %H:%M')},right,PO-A",
+    ])
+    link.alert_ledger.refresh()
+
+    reads = []
+    real_open = builtins.open
+
+    def counting_open(file, mode='r', *args, **kwargs):
+        if str(file).endswith('last_alert.log') and 'r' in mode:
+            reads.append(file)
+        return real_open(file, mode, *args, **kwargs)
+
+    monkeypatch.setattr(linde_manager, 'open', counting_open, raising=False)
+    sent = []
+    monkeypatch.setattr(link, 'send_alert_email', lambda bank, test=False, device=None: sent.append(bank))
+
+    handler = object.__new__(linde_manager.RequestHandler)
+    page = handler.generate_html()
+    assert 'for the right bank' in page
+    assert link.get_po_usage() == {'PO-A': 3}
+    assert link.select_po()['number'] == 'PO-A'
+    link.check_and_send_alert('right')
+    link.check_and_send_alert('left')
+    assert sent == ['left']
+    assert reads == []
@@ -0,0 +1,88 @@
+"""Tests for readings compaction: duplicate removal, hourly and daily
+segments, and range reads stitching the tiers back together.
+"""
+from datetime import datetime, timedelta
+
+import linde_manager
+
+NOW = datetime(2025, 6, 1, 12, 0)
+
+
+def _store(tmp_path):
+    return linde_manager.ReadingsStore(str(tmp_path / 'readings.db'))
+
+
+def _at(dt):
+    return dt.strftime('%Y-%m-%dT%H:%M:%S')
+
+
+def test_drops_duplicate_polls(tmp_path):
+    store = _store(tmp_path)
+    t = _at(NOW - timedelta(days=1))
+    store.append_many([(t, 'left', None, 50), (t, 'left', None, 50), (t, 'right', None, 50)])
+    store.append_many([(t, 'left', None, 50)], device='cage')
+    assert store.compact(now=NOW) == {'duplicates': 1, 'hourly': 0, 'daily': 0}
+    assert store.count() == 3
+
+
+def test_rolls_old_readings_into_hourly_then_daily_segments(tmp_path):
+    store = _store(tmp_path)
+    old_hour = datetime(2025, 1, 10, 8, 0)        # older than 90 days
+    ancient_day = datetime(2024, 3, 1, 0, 0)       # older than 365 days
+    store.append_many([
+        (_at(old_hour + timedelta(minutes=5)), 'left', None, 60),
+        (_at(old_hour + timedelta(minutes=35)), 'left', None, 40),
+        (_at(old_hour + timedelta(minutes=50)), 'left', None, None),
+        (_at(ancient_day + timedelta(hours=1)), 'left', None, 90),
+        (_at(ancient_day + timedelta(hours=2)), 'left', None, 80),
+        (_at(ancient_day + timedelta(hours=2, minutes=30)), 'left', None, 70),
+        (_at(NOW - timedelta(days=1)), 'left', '2025-05-01T00:00:00', 30),
+    ])
+
+    removed = store.compact(now=NOW)
+    assert removed == {'duplicates': 0, 'hourly': 6, 'daily': 2}
+    assert store.count() == 1
+
+    # The tiers read back as one series, oldest first
+    rows = store.range(bank='left', spread=True)
+    assert [r[0] for r in rows] == [ancient_day, old_hour, NOW - timedelta(days=1)]
+    assert rows[0][3:] == (80.0, 70.0, 90.0)     # daily mean weighted by count
+    assert rows[1][3:] == (50.0, 40.0, 60.0)
+    assert rows[2][2:] == ('2025-05-01T00:00:00', 30.0, 30.0, 30.0)
+    assert len(store.range(bank='left', start=datetime(2025, 1, 1))) == 2
+
+    # Compaction is idempotent, and late readings merge into their segment
+    assert store.compact(now=NOW) == {'duplicates': 0, 'hourly': 0, 'daily': 0}
+    store.append(_at(old_hour + timedelta(minutes=55)), 'left', None, 20)
+    store.compact(now=NOW)
+    assert store.range(bank='left', start=old_hour, end=old_hour + timedelta(hours=1), spread=True)[0][3:] == (40.0, 20.0, 60.0)
+
+
+def test_footprint_stays_bounded(tmp_path):
+    store = _store(tmp_path)
+    start = NOW - timedelta(days=3 * 365)
+    store.append_many([
+        (_at(start + timedelta(hours=h)), 'left', None, h % 100) for h in range(3 * 365 * 24)
+    ])
+    store.compact(now=NOW)
+    segments = store.range(bank='left', end=NOW - timedelta(days=90))
+    # ~2 years of days plus ~9 months of hours, instead of 3 years of hours
+    assert len(segments) < 2 * 365 + 276 * 24
+    assert store.count() <= 91 * 24
+
+
+def test_resampled_plot_uses_segment_spread(make_link):
+    link = make_link(pos=[])
+    now = datetime.now()
+    old = (now - timedelta(days=200)).replace(minute=0, second=0, microsecond=0)
+    link.readings.append_many([(_at(old + timedelta(minutes=m)), 'left', None, v)
+                               for m, v in ((1, 10), (20, 50), (40, 90))])
+    generation = link.readings_generation
+    assert link.compact_readings()['hourly'] == 3
+    assert link.readings_generation == generation + 1
+
+    times, contents, lows, highs = link.recent_readings('left', now - timedelta(days=365), spread=True)
+    assert list(contents) == [50.0] and list(lows) == [10.0] and list(highs) == [90.0]
+    _, means, mins, maxs = linde_manager.resample_buckets(times, contents, 86400, lows, highs)
+    assert (means[0], mins[0], maxs[0]) == (50.0, 10.0, 90.0)
+    assert [len(a) for a in link.recent_readings('right', now - timedelta(days=365), spread=True)] == [0, 0, 0, 0]
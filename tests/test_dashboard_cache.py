@@ -0,0 +1,76 @@
+"""Tests for the fragment-cached dashboard page: each fragment re-renders
+only on its own invalidating event, and the page is served with gzip and
+ETag/304 support.
+"""
+import gzip
+from datetime import datetime
+
+import linde_manager
+
+
+def _count_renders(monkeypatch):
+    handler = object.__new__(linde_manager.RequestHandler)
+    calls = []
+    for name in ('render_banner', 'render_status', 'render_orders_timeline', 'render_pos_tab'):
+        original = getattr(handler, name)
+
+        def counting(*args, _name=name, _original=original, **kwargs):
+            calls.append(_name)
+            return _original(*args, **kwargs)
+
+        monkeypatch.setattr(handler, name, counting)
+    return handler, calls
+
+
+def test_fragments_rerender_only_on_their_own_events(make_link, monkeypatch):
+    link = make_link(pos=[{'number': 'PO-A', 'ratio': 1}])
+    handler, calls = _count_renders(monkeypatch)
+
+    first = handler.get_page()
+    assert sorted(calls) == ['render_banner', 'render_orders_timeline', 'render_pos_tab', 'render_status']
+    calls.clear()
+    assert handler.get_page() is first
+    assert calls == []
+
+    link.record_readings([(datetime.now().strftime('%Y-%m-%dT%H:%M:%S'), 'left', None, 42)])
+    assert '42' in handler.generate_html()
+    assert calls == ['render_status']
+
+    calls.clear()
+    link.note_order(datetime.now(), 'left', 'PO-A')
+    handler.get_page()
+    assert sorted(calls) == ['render_orders_timeline', 'render_pos_tab', 'render_status']
+
+    calls.clear()
+    link.load_pos()
+    handler.get_page()
+    assert calls == ['render_pos_tab']
+
+    calls.clear()
+    assert '<div class="email-alert" id="email-alert" hidden>' in handler.generate_html()
+    calls.clear()
+    link.email_status = {'connected': False, 'last_check': datetime.now(), 'error': '<refused>'}
+    page = handler.generate_html()
+    assert '<div class="email-alert" id="email-alert">' in page
+    assert '<span class="error">&lt;refused&gt;</span>' in page
+    assert calls == ['render_banner']
+
+
+def test_page_is_gzipped_with_etag(make_link, http_get):
+    make_link(pos=[])
+    plain_response, plain = http_get('/')
+    assert plain_response.getheader('Content-Encoding') is None
+    assert b'Bank Status' in plain
+
+    response, body = http_get('/', headers={'Accept-Encoding': 'br, gzip;q=0.8'})
+    assert response.getheader('Content-Encoding') == 'gzip'
+    assert response.getheader('Vary') == 'Accept-Encoding'
+    assert gzip.decompress(body) == plain
+    assert len(body) < len(plain) / 3
+    etag = response.getheader('ETag')
+    assert etag != plain_response.getheader('ETag')
+
+    assert http_get('/', headers={'Accept-Encoding': 'gzip', 'If-None-Match': etag})[0].status == 304
+    assert http_get('/', headers={'If-None-Match': etag})[0].status == 200
+    assert http_get('/', headers={'Accept-Encoding': 'gzip;q=0'})[0].getheader('Content-Encoding') is None
+    assert http_get('/plot', headers={'Accept-Encoding': 'gzip'})[0].getheader('Content-Encoding') is None
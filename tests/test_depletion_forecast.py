@@ -0,0 +1,94 @@
+"""Tests for the streaming depletion estimator and the time-to-threshold
+and time-to-empty forecast on /status and the dashboard.
+"""
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+import linde_manager
+
+T0 = datetime(2025, 1, 1)
+
+
+def test_rate_and_forecast_of_a_steady_drawdown():
+    estimator = linde_manager.DepletionEstimator()
+    assert estimator.rate is None
+    for hour in range(10):
+        estimator.update(T0 + timedelta(hours=hour), 80 - 1.5 * hour)
+    assert estimator.rate == pytest.approx(1.5)
+    # 66.5% left at 1.5% an hour
+    assert estimator.time_to(10) == T0 + timedelta(hours=9 + 56.5 / 1.5)
+    assert estimator.forecast(10) == {
+        'usagePerHour': 1.5,
+        'thresholdAt': (T0 + timedelta(hours=9 + 56.5 / 1.5)).isoformat(timespec='minutes'),
+        'emptyAt': (T0 + timedelta(hours=9 + 66.5 / 1.5)).isoformat(timespec='minutes'),
+    }
+
+
+def test_refill_restarts_the_fit_and_noise_does_not():
+    estimator = linde_manager.DepletionEstimator()
+    for hour, content in enumerate([30, 28, 26, 24, 95, 94]):
+        estimator.update(T0 + timedelta(hours=hour), content)
+    assert estimator.samples == 2
+    assert estimator.rate == pytest.approx(1.0)
+
+    estimator.update(T0 + timedelta(hours=6), 95)      # +1%: sensor noise
+    assert estimator.samples == 3
+    estimator.update(T0 + timedelta(hours=6), 50)      # not newer: ignored
+    estimator.update(T0 + timedelta(hours=7), None)
+    assert estimator.last_content == 95
+
+
+def test_recent_readings_outweigh_old_ones_over_a_long_run():
+    estimator = linde_manager.DepletionEstimator(half_life=timedelta(hours=6))
+    t = T0
+    for day in range(400):
+        # Slow use for most of the cylinder's life, refilled every 20 days
+        for hour in range(24):
+            estimator.update(t, 100 - (day % 20) * 4 - hour / 6)
+            t += timedelta(hours=1)
+    for hour in range(48):
+        estimator.update(t, estimator.last_content - 2)
+        t += timedelta(hours=1)
+    assert estimator.rate == pytest.approx(2.0, rel=0.05)
+    assert abs(estimator._t) < 100 and abs(estimator._tt) < 1e5
+
+
+def test_forecast_in_status_and_dashboard(make_link, http_get):
+    now = datetime.now().replace(minute=0, second=0, microsecond=0)
+    link = make_link(pos=[])
+    for hour in range(5):
+        t = (now - timedelta(hours=4 - hour)).strftime('%Y-%m-%dT%H:%M:%S')
+        link.record_readings([(t, 'left', None, 50 - hour), (t, 'right', None, 90)])
+
+    banks = json.loads(http_get('/status')[1])['manifolds'][linde_manager._DEFAULT_DEVICE]['banks']
+    assert banks['left']['forecast']['usagePerHour'] == 1.0
+    assert banks['left']['forecast']['thresholdAt'] == (now + timedelta(hours=36)).isoformat(timespec='minutes')
+    assert banks['left']['forecast']['emptyAt'] == (now + timedelta(hours=46)).isoformat(timespec='minutes')
+    assert banks['right']['forecast'] == {'usagePerHour': 0.0, 'thresholdAt': None, 'emptyAt': None}
+
+    page = http_get('/')[1].decode('utf-8')
+    assert f"24.0% a day, 10% by {(now + timedelta(hours=36)):%Y-%m-%d %H:%M}" in page
+    assert 'Not in use' in page
+
+    # The estimate is rebuilt from the stored readings on restart
+    restarted = make_link(pos=[])
+    assert restarted.primary.estimators['left'].rate == pytest.approx(1.0)
+
+
+def test_near_flat_drawdown_renders(make_link, http_get):
+    # The idle bank of a pair: 90% for days, one step down, then idle again
+    now = datetime.now().replace(minute=0, second=0, microsecond=0)
+    link = make_link(pos=[])
+    for hour in range(13 * 24, -1, -1):
+        t = (now - timedelta(hours=hour)).strftime('%Y-%m-%dT%H:%M:%S')
+        link.record_readings([(t, 'left', None, 90 if hour > 8 * 24 else 89), (t, 'right', None, 50)])
+    estimator = link.primary.estimators['left']
+    assert estimator.rate > 0 and estimator.time_to(0) is None
+
+    response, body = http_get('/')
+    assert response.status == 200
+    assert '10% in over 10 years, empty in over 10 years' in body.decode('utf-8')
+    assert json.loads(http_get('/status')[1])['manifolds'][linde_manager._DEFAULT_DEVICE]['banks']['left'][
+        'forecast']['emptyAt'] is None
@@ -0,0 +1,143 @@
+"""Tests for the /events Server-Sent Events stream: readings, orders and
+email status changes are pushed to every subscriber, subscribers do not hold
+a worker thread, and dead or slow subscribers are dropped.
+"""
+import http.client
+import json
+import socket
+import threading
+import time
+from datetime import datetime
+
+import pytest
+
+import linde_manager
+
+
+@pytest.fixture
+def server():
+    servers = []
+
+    def _start(**kwargs):
+        httpd = linde_manager.make_server(port=0, host='127.0.0.1', **kwargs)
+        threading.Thread(target=httpd.serve_forever, daemon=True).start()
+        servers.append(httpd)
+        return httpd.server_address[1]
+
+    yield _start
+    for httpd in servers:
+        httpd.shutdown()
+        httpd.server_close()
+    linde_manager.link.events.close()
+
+
+def _read_until(sock, marker, received=b''):
+    deadline = time.time() + 5
+    while marker not in received:
+        assert time.time() < deadline, received
+        chunk = sock.recv(4096)
+        assert chunk, received
+        received += chunk
+    return received
+
+
+def _subscribe(port):
+    sock = socket.create_connection(('127.0.0.1', port), timeout=5)
+    sock.sendall(b'GET /events HTTP/1.1\r\nHost: localhost\r\n\r\n')
+    return sock, _read_until(sock, b'retry: 10000\n\n')
+
+
+def _wait_for(condition):
+    deadline = time.time() + 5
+    while not condition():
+        assert time.time() < deadline
+        time.sleep(0.01)
+
+
+def _events(raw):
+    events = []
+    stream = raw.split(b'\r\n\r\n', 1)[1]
+    for block in stream.decode('utf-8').split('\n\n'):
+        fields = dict(line.split(': ', 1) for line in block.splitlines() if line and not line.startswith(':'))
+        if 'event' in fields:
+            events.append((fields['event'], json.loads(fields['data'])))
+    return events
+
+
+@pytest.mark.parametrize('mode', ['threaded', 'single'])
+def test_pushes_readings_orders_and_email_status(make_link, server, monkeypatch, mode):
+    link = make_link(pos=[{'number': 'PO-A', 'ratio': 1}])
+    monkeypatch.setattr(link, 'check_message_time_freshness', lambda manifold=None: None)
+    port = server(mode=mode)
+    sock, headers = _subscribe(port)
+    assert b'Content-Type: text/event-stream' in headers
+    _wait_for(lambda: len(link.events) == 1)
+
+    now = datetime.now().strftime('%Y-%m-%dT%H:%M:%S')
+    row = {}
+    for bank, content in (('left', 42), ('right', 80)):
+        contents_key, time_key, change_key = linde_manager.bank_fields(bank)
+        row.update({contents_key: str(content), time_key: now, change_key: None})
+    link.poll_manifold(link.primary, {'A1': row})
+    # A repeated reading stores nothing, so nothing is pushed
+    link.poll_manifold(link.primary, {'A1': row})
+    link.note_order(datetime(2025, 6, 1, 9, 30), 'left', 'PO-A')
+    link.email_status = {'connected': True, 'last_check': datetime.now(), 'error': None}
+    link.email_status = {'connected': False, 'last_check': datetime(2025, 6, 1, 10, 0), 'error': 'Error: refused'}
+
+    events = _events(_read_until(sock, b'event: email', headers))
+    assert [name for name, _ in events] == ['readings', 'order', 'email']
+    readings = events[0][1]
+    assert readings['device'] == linde_manager._DEFAULT_DEVICE
+    assert readings['banks']['left']['contents'] == '42'
+    assert readings['banks']['right']['messageTime'] == now
+    assert set(readings['banks']['left']) == {'contents', 'messageTime', 'lastChange', 'threshold', 'forecast'}
+    assert events[1][1] == {'device': linde_manager._DEFAULT_DEVICE, 'bank': 'left',
+                            'po': 'PO-A', 'time': '2025-06-01T09:30'}
+    assert events[2][1] == {'connected': False, 'lastCheck': '2025-06-01T10:00:00', 'error': 'Error: refused'}
+
+    sock.close()
+    _wait_for(lambda: len(link.events) == 0)
+
+
+def test_subscribers_do_not_hold_workers(make_link, server):
+    link = make_link(pos=[])
+    port = server(mode='threaded', workers=1)
+    subscribers = [_subscribe(port)[0] for _ in range(20)]
+    _wait_for(lambda: len(link.events) == 20)
+
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+    conn.request('GET', '/status')
+    assert conn.getresponse().status == 200
+    conn.close()
+
+    link.events.publish('order', {'bank': 'left'})
+    for sock in subscribers:
+        assert b'event: order\ndata: {"bank":"left"}\n\n' in _read_until(sock, b'"left"}\n\n')
+        sock.close()
+
+
+def test_drops_slow_subscribers():
+    metrics = linde_manager.Metrics()
+    hub = linde_manager.EventHub(max_backlog=64 * 1024, metrics=metrics)
+    slow, slow_peer = socket.socketpair()
+    fast, fast_peer = socket.socketpair()
+    slow.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 4096)
+    hub.attach(slow)
+    hub.attach(fast)
+    try:
+        # The fast peer keeps reading; the slow one never does
+        for i in range(200):
+            hub.publish('readings', {'n': i, 'padding': 'x' * 2000})
+            fast_peer.settimeout(5)
+            _read_until(fast_peer, f'"n":{i},'.encode())
+        _wait_for(lambda: not hub.owns(slow))
+        assert hub.owns(fast)
+        assert metrics.snapshot()['counters']['events subscribers dropped'] == 1
+    finally:
+        hub.close()
+    assert len(hub) == 0
+    for sock in (slow_peer, fast_peer):
+        sock.settimeout(5)
+        while sock.recv(65536):
+            pass
@@ -0,0 +1,145 @@
+"""Tests for the shared Linde HTTP client: retries with backoff on
+transient failures, Retry-After handling, timeouts, and per-attempt
+latency metrics.
+"""
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+import requests
+
+import linde_manager
+
+
+@pytest.fixture
+def scripted_server():
+    """Local server answering each request with the next scripted status."""
+    script = []
+    seen = []
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_GET(self):
+            seen.append((self.path, self.headers.get('Connection')))
+            status, headers = script.pop(0) if script else (200, {})
+            body = b'ok'
+            self.send_response(status)
+            for k, v in headers.items():
+                self.send_header(k, v)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        do_POST = do_GET
+
+        def log_message(self, format, *args):
+            pass
+
+    httpd = HTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield f'http://127.0.0.1:{httpd.server_address[1]}', script, seen
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def _client(**kwargs):
+    client = linde_manager.LindeHTTPClient(**kwargs)
+    client.delays = []
+    client.sleep = client.delays.append
+    return client
+
+
+def test_retries_transient_status_then_succeeds(scripted_server):
+    url, script, seen = scripted_server
+    script.extend([(503, {}), (502, {})])
+    client = _client(backoff=1.0, max_backoff=30)
+    response = client.get(url + '/download')
+    assert response.status_code == 200
+    assert len(seen) == 3
+    # Full jitter: each delay is within [0, backoff * 2**attempt]
+    assert len(client.delays) == 2
+    assert 0 <= client.delays[0] <= 1.0 and 0 <= client.delays[1] <= 2.0
+
+    snapshot = client.metrics.snapshot()
+    name = next(n for n in snapshot['timings'] if n.endswith('/download'))
+    assert snapshot['timings'][name]['count'] == 3
+    assert snapshot['counters'][f'{name} retries'] == 2
+    assert snapshot['counters'][f'{name} status 200'] == 1
+
+
+def test_honours_retry_after(scripted_server):
+    url, script, _ = scripted_server
+    script.append((429, {'Retry-After': '7'}))
+    client = _client(max_backoff=30)
+    assert client.get(url).status_code == 200
+    assert client.delays == [7.0]
+
+
+def test_retry_after_capped(scripted_server):
+    url, script, _ = scripted_server
+    script.append((503, {'Retry-After': '3600'}))
+    client = _client(max_backoff=5)
+    client.get(url)
+    assert client.delays == [5]
+
+
+def test_gives_up_after_max_retries(scripted_server):
+    url, script, seen = scripted_server
+    script.extend([(503, {})] * 5)
+    client = _client(max_retries=2)
+    assert client.get(url).status_code == 503
+    assert len(seen) == 3
+
+
+def test_non_retryable_status_returned_immediately(scripted_server):
+    url, script, seen = scripted_server
+    script.append((404, {}))
+    client = _client()
+    assert client.get(url).status_code == 404
+    assert len(seen) == 1 and client.delays == []
+
+
+def test_posts_are_not_retried_unless_asked(scripted_server):
+    url, script, seen = scripted_server
+    script.extend([(503, {}), (503, {})])
+    client = _client()
+    assert client.post(url + '/token').status_code == 503
+    assert len(seen) == 1 and client.delays == []
+    assert client.post(url + '/token', retry=True).status_code == 200
+    assert len(seen) == 3
+
+
+def test_connection_errors_are_not_retried_for_posts():
+    client = _client(max_retries=3, timeout=(0.5, 0.5))
+    with pytest.raises(requests.ConnectionError):
+        client.post('http://127.0.0.1:9/unreachable', data={'code': 'single-use'})
+    assert client.delays == []
+
+
+def test_connection_errors_raise_after_retries():
+    client = _client(max_retries=1, timeout=(0.5, 0.5))
+    with pytest.raises(requests.ConnectionError):
+        client.get('http://127.0.0.1:9/unreachable')
+    assert len(client.delays) == 1
+
+
+def test_connections_are_reused(scripted_server):
+    url, _, seen = scripted_server
+    client = _client()
+    client.get(url + '/a')
+    client.get(url + '/b')
+    adapter = client.session.get_adapter(url)
+    assert len(adapter.poolmanager.pools) == 1
+
+
+def test_metrics_endpoint(make_link, http_get):
+    link = make_link(pos=[])
+    link.metrics.observe('http GET example/x', 0.25)
+    link.metrics.incr('http GET example/x status 200')
+    response, body = http_get('/metrics')
+    assert response.status == 200
+    data = json.loads(body)
+    assert data['timings']['http GET example/x']['p50_ms'] == 250.0
+    assert data['counters']['http GET example/x status 200'] == 1
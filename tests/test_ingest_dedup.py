@@ -0,0 +1,45 @@
+"""Tests for ingest deduplication: a poll repeating the last stored reading
+of a bank writes nothing and is counted in the metrics.
+"""
+from datetime import datetime, timedelta
+
+
+def _at(dt):
+    return dt.strftime('%Y-%m-%dT%H:%M:%S')
+
+
+def test_unchanged_poll_is_skipped(make_link):
+    link = make_link(pos=[])
+    t = datetime.now().replace(microsecond=0) - timedelta(hours=2)
+    poll = [(_at(t), 'left', None, 60), (_at(t), 'right', None, 70)]
+
+    assert link.record_readings(poll) == 2
+    generation = link.readings_generation
+    assert link.record_readings(poll) == 0
+    assert link.readings_generation == generation
+    assert link.readings.count() == 2
+    assert len(link.windows['left']) == 1
+
+    # Only the bank that reported again is stored
+    assert link.record_readings([(_at(t + timedelta(hours=1)), 'left', None, 55), (_at(t), 'right', None, '70')]) == 1
+    assert link.readings.count() == 3
+    assert link.metrics.snapshot()['counters']['ingest duplicates skipped'] == 3
+    assert link.metrics.snapshot()['counters']['ingest readings stored'] == 3
+
+
+def test_cache_is_seeded_from_the_store(make_link, tmp_path):
+    t = datetime.now().replace(microsecond=0) - timedelta(hours=2)
+    link = make_link(pos=[])
+    link.record_readings([(_at(t), 'left', None, 60)])
+
+    restarted = make_link(pos=[])
+    assert restarted.record_readings([(_at(t), 'left', None, 60)]) == 0
+    assert restarted.readings.count() == 1
+
+
+def test_late_reading_does_not_replace_the_cached_one(make_link):
+    link = make_link(pos=[])
+    t = datetime.now().replace(microsecond=0) - timedelta(hours=2)
+    link.record_readings([(_at(t), 'left', None, 60)])
+    assert link.record_readings([(_at(t - timedelta(hours=1)), 'left', None, 65)]) == 1
+    assert link.record_readings([(_at(t), 'left', None, 60)]) == 0
@@ -0,0 +1,102 @@
+"""Tests for the streaming Digital Manifold CSV parser and device selection
+in get_data.
+"""
+import linde_manager
+
+HEADER = 'serialNumber,leftBankContents,rightBankContents,messageTimeLeft,messageTimeRight,lastChangeLeft,lastChangeRight'
+
+
+def _rows(*devices):
+    yield '\ufeff' + HEADER
+    for serial, left, right in devices:
+        yield f'{serial},{left},{right},2025-01-01T10:00:00,2025-01-01T10:00:00,,'
+
+
+def test_keeps_only_wanted_devices():
+    devices = linde_manager.parse_manifold_csv(
+        _rows(('A1', 50, 60), ('B2', 70, 80), ('C3', 10, 20)), wanted_ids=['C3', 'A1'])
+    assert set(devices) == {'A1', 'C3'}
+    assert devices['C3']['leftBankContents'] == '10'
+    # The BOM must not leak into the first column name
+    assert 'serialNumber' in devices['A1']
+
+
+def test_without_configuration_choice_is_deterministic():
+    forward = linde_manager.parse_manifold_csv(_rows(('B2', 1, 1), ('A1', 2, 2), ('C3', 3, 3)))
+    backward = linde_manager.parse_manifold_csv(_rows(('C3', 3, 3), ('A1', 2, 2), ('B2', 1, 1)))
+    assert list(forward) == list(backward) == ['A1']
+
+
+def test_parser_consumes_lazily():
+    """Rows are pulled one at a time; non-matching ones are not retained."""
+    pulled = []
+
+    def lines():
+        for line in _rows(*[(f'X{i:05d}', 50, 50) for i in range(10000)]):
+            pulled.append(1)
+            yield line
+
+    devices = linde_manager.parse_manifold_csv(lines(), wanted_ids=['X00042'])
+    assert list(devices) == ['X00042']
+    assert len(pulled) == 10001
+
+
+def test_empty_and_missing_id_column():
+    assert linde_manager.parse_manifold_csv(iter([])) == {}
+    devices = linde_manager.parse_manifold_csv(
+        iter(['leftBankContents,rightBankContents', '1,2', '3,4']), id_field='serialNumber')
+    assert devices == {'': {'leftBankContents': '3', 'rightBankContents': '4'}}
+
+
+class _StreamedResponse:
+    """Streams UTF-8 bytes like requests does for text/csv without a charset."""
+    status_code = 200
+    encoding = 'ISO-8859-1'
+
+    def __init__(self, lines):
+        self._lines = [line.encode('utf-8') for line in lines]
+
+    def iter_lines(self, decode_unicode=False):
+        if decode_unicode:
+            return (line.decode(self.encoding) for line in self._lines)
+        return iter(self._lines)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class _FakeHTTP:
+    def __init__(self, lines):
+        self.lines = lines
+        self.kwargs = None
+
+    def get(self, url, **kwargs):
+        self.kwargs = kwargs
+        return _StreamedResponse(self.lines)
+
+
+class _FakeTokens:
+    def get_token(self):
+        return 'TOKEN'
+
+
+def test_get_data_uses_configured_manifold(make_link):
+    link = make_link(pos=[], credentials={'PO': 'X', 'smtp_recipient': 'r@x', 'manifold_ids': ['B2']})
+    link.tokens = _FakeTokens()
+    link.http = _FakeHTTP(list(_rows(('A1', 50, 60), ('B2', 70, 80))))
+    data = link.get_data()
+    assert link.http.kwargs['stream'] is True
+    assert data['serialNumber'] == 'B2'
+    assert link.data['leftBankContents'] == '70'
+    assert set(link.devices) == {'B2'}
+
+
+def test_get_data_fails_when_manifold_missing(make_link):
+    link = make_link(pos=[], credentials={'PO': 'X', 'smtp_recipient': 'r@x', 'manifold_ids': ['ZZ']})
+    link.tokens = _FakeTokens()
+    link.http = _FakeHTTP(list(_rows(('A1', 50, 60))))
+    assert link.get_data() is False
+    assert link.data == {}
@@ -0,0 +1,191 @@
+"""Tests for multi-manifold monitoring: configuration, per-device readings,
+one concurrent download per country export, per-manifold alerts and the
+device-aware dashboard routes.
+"""
+import json
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+
+import linde_manager
+
+HEADER = 'serialNumber,leftBankContents,rightBankContents,middleBankContents,messageTimeLeft,messageTimeRight,messageTimeMiddle'
+
+MANIFOLDS = [
+    {'id': 'flyroom', 'name': 'Fly Room', 'serials': ['A1']},
+    {'id': 'cage', 'name': 'Cage', 'serials': ['B2'], 'banks': {'left': 30, 'right': 10, 'middle': 10}},
+    {'id': 'remote', 'serials': ['Z9'], 'country': '250', 'banks': ['left']},
+]
+
+
+def _export(now, *devices):
+    stamp = now.strftime('%Y-%m-%dT%H:%M:%S')
+    lines = [HEADER]
+    for serial, left, right, middle in devices:
+        lines.append(f'{serial},{left},{right},{middle},{stamp},{stamp},{stamp}')
+    return lines
+
+
+class _Response:
+    status_code = 200
+    encoding = 'utf-8'
+
+    def __init__(self, lines):
+        self._lines = lines
+
+    def iter_lines(self, decode_unicode=False):
+        return iter(self._lines)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class _CountryHTTP:
+    """Serves one export per country and records the concurrent downloads."""
+    def __init__(self, exports):
+        self.exports = exports
+        self.urls = []
+        self.threads = set()
+
+    def get(self, url, **kwargs):
+        self.urls.append(url)
+        self.threads.add(threading.current_thread().name)
+        return _Response(self.exports[url.rsplit('=', 1)[1]])
+
+
+class _FakeTokens:
+    def get_token(self):
+        return 'TOKEN'
+
+
+def _polled_link(make_link, now):
+    link = make_link(pos=[{'number': 'PO-A', 'ratio': 1}], manifolds=MANIFOLDS)
+    link.tokens = _FakeTokens()
+    link.http = _CountryHTTP({
+        '826': _export(now, ('A1', 60, 70, ''), ('B2', 25, 80, 90), ('C3', 1, 1, 1)),
+        '250': _export(now, ('Z9', 40, '', '')),
+    })
+    return link
+
+
+def test_load_manifolds_config(make_link):
+    link = make_link(pos=[], manifolds=MANIFOLDS)
+    assert list(link.manifolds) == ['flyroom', 'cage', 'remote']
+    assert link.primary.name == 'Fly Room'
+    assert link.manifolds['cage'].banks == {'left': 30, 'right': 10, 'middle': 10}
+    assert link.manifolds['remote'].banks == {'left': 10}
+    assert link.manifolds['remote'].name == 'remote'
+    assert set(link.manifolds['cage'].windows) == {'left', 'right', 'middle'}
+
+
+def test_load_manifolds_falls_back_to_credentials(make_link):
+    link = make_link(pos=[], credentials={'manifold_ids': ['B2']})
+    assert list(link.manifolds) == [linde_manager._DEFAULT_DEVICE]
+    assert link.primary.serials == ('B2',)
+
+
+def test_several_manifolds_need_serials(make_link, tmp_path):
+    link = make_link(pos=[])
+    (tmp_path / 'manifolds.json').write_text(json.dumps({'manifolds': [{'id': 'a'}, {'id': 'b', 'serials': ['X']}]}))
+    try:
+        link.load_manifolds()
+    except ValueError as e:
+        assert 'serials' in str(e)
+    else:
+        raise AssertionError('expected ValueError')
+
+
+def test_get_data_fetches_each_country_once_and_stores_per_device(make_link):
+    now = datetime.now().replace(microsecond=0)
+    link = _polled_link(make_link, now)
+
+    data = link.get_data()
+
+    assert data['serialNumber'] == 'A1'
+    assert sorted(url.rsplit('=', 1)[1] for url in link.http.urls) == ['250', '826']
+    assert all(name.startswith('linde-fetch') for name in link.http.threads)
+    assert set(link.devices) == {'A1', 'B2', 'Z9'}
+    assert link.manifolds['cage'].data['middleBankContents'] == '90'
+
+    since = now - timedelta(hours=1)
+    assert list(link.recent_readings('left', since)[1]) == [60.0]
+    assert list(link.recent_readings('left', since, device='cage')[1]) == [25.0]
+    assert list(link.recent_readings('middle', since, device='cage')[1]) == [90.0]
+    assert list(link.recent_readings('left', since, device='remote')[1]) == [40.0]
+    assert {r[3] for r in link.readings.range(bank='left', device='cage')} == {25.0}
+    assert len(link.readings.range(device=None)) == 6
+
+
+def test_thresholds_and_alert_state_are_per_manifold(make_link, monkeypatch):
+    now = datetime.now().replace(microsecond=0)
+    link = _polled_link(make_link, now)
+    alerted = []
+    monkeypatch.setattr(linde_manager, '_ALERT', True)
+    monkeypatch.setattr(link, 'send_alert_email', lambda bank, test=False, device=None: alerted.append((device, bank)))
+
+    link.get_data()
+    # Only the cage's left bank (25 <= 30) is below its threshold
+    assert alerted == [('cage', 'left')]
+
+    # A recent cage alert suppresses the cage only; legacy lines without a
+    # device column belong to the primary manifold
+    with open(link.last_alert_file, 'w') as f:
+        f.write(f"{(now - timedelta(hours=1)).strftime('%Y-%m-%d %H:%M')},left,PO-A,cage\n")
+        f.write(f"{(now - timedelta(hours=1)).strftime('%Y-%m-%d %H:%M')},right,PO-A\n")
+    alerted.clear()
+    link.check_and_send_alert('left', device='cage')
+    link.check_and_send_alert('left', device='remote')
+    link.check_and_send_alert('right', device='flyroom')
+    assert alerted == [('remote', 'left')]
+
+    orders, median = link.get_orders_history('cage')
+    assert [o[1] for o in orders] == ['left'] and set(median) == {'left', 'right', 'middle'}
+    assert [o[1] for o in link.get_orders_history()[0]] == ['right']
+
+
+def test_legacy_store_gains_device_column(tmp_path):
+    db = str(tmp_path / 'readings.db')
+    conn = sqlite3.connect(db)
+    conn.execute('CREATE TABLE readings (messageTime TEXT NOT NULL, bank TEXT NOT NULL, lastChange TEXT, content REAL)')
+    conn.execute("INSERT INTO readings VALUES ('2025-01-01T10:00:00', 'left', NULL, 50)")
+    conn.commit()
+    conn.close()
+
+    store = linde_manager.ReadingsStore(db)
+    assert [r[3] for r in store.range()] == [50.0]
+    assert store.rename_device(linde_manager._DEFAULT_DEVICE, 'flyroom') == 1
+    assert store.range() == []
+    assert [r[3] for r in store.range(device='flyroom')] == [50.0]
+
+
+def test_dashboard_pages_through_devices(make_link, http_get):
+    now = datetime.now().replace(microsecond=0)
+    link = _polled_link(make_link, now)
+    link.get_data()
+
+    response, body = http_get('/status')
+    status = json.loads(body)
+    assert status['leftBankContents'] == '60'
+    assert status['manifolds']['cage']['banks']['left'] == {
+        'contents': '25', 'messageTime': now.strftime('%Y-%m-%dT%H:%M:%S'), 'lastChange': None, 'threshold': 30,
+        'forecast': {'usagePerHour': None, 'thresholdAt': None, 'emptyAt': None}}
+
+    response, body = http_get('/?device=cage')
+    page = body.decode('utf-8')
+    assert response.status == 200
+    assert 'Cage' in page and '<td>Middle</td>' in page
+    assert 'src="/plot?device=cage"' in page
+    assert 'href="/?device=remote"' in page
+
+    response, body = http_get('/plot?device=remote')
+    assert response.status == 200 and body.startswith(b'\x89PNG')
+    assert ('remote', 10, None) in link.plot_cache._entries
+
+    response, body = http_get('/api/series?device=cage&bank=middle')
+    assert json.loads(body)['v'] == [90.0]
+
+    assert http_get('/?device=nope')[0].status == 404
+    assert http_get('/api/series?device=nope&bank=left')[0].status == 404
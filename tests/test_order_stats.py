@@ -0,0 +1,60 @@
+"""Tests for the incrementally maintained order statistics: the two-heap
+running median, out-of-order inserts, and new orders folded in without
+rebuilding from the alert ledger.
+"""
+import random
+import statistics
+from datetime import datetime, timedelta
+
+import pytest
+
+import linde_manager
+
+
+def test_running_median_matches_statistics_median():
+    rng = random.Random(7)
+    running = linde_manager.RunningMedian()
+    values = []
+    assert running.median is None
+    for _ in range(501):
+        value = rng.uniform(0, 60)
+        running.add(value)
+        values.append(value)
+        assert running.median == pytest.approx(statistics.median(values))
+    assert len(running) == 501
+
+
+def test_out_of_order_order_reindexes_intervals():
+    t0 = datetime(2025, 1, 1)
+    stats = linde_manager.OrderStats([(t0, 'left'), (t0 + timedelta(days=20), 'left')])
+    stats.add(t0 + timedelta(days=5), 'left')
+    assert [o[2] for o in stats.orders()] == [None, 5.0, 15.0]
+    assert stats.median('left') == 10.0
+    assert stats.orders(start=t0 + timedelta(days=1))[0][0] == t0 + timedelta(days=5)
+    assert stats.median('right') is None
+
+
+def test_new_orders_are_folded_in_without_a_rebuild(make_link, monkeypatch):
+    link = make_link(pos=[{'number': 'PO-A', 'ratio': 1}], log_lines=[
+        '2025-01-01 10:00,left,PO-A',
+        '2025-01-11 10:00,left,PO-A',
+    ])
+    link.get_orders_history()
+    link.get_orders_history('default')
+
+    def no_rebuild(*args, **kwargs):
+        raise AssertionError('order stats were rebuilt from the ledger')
+
+    monkeypatch.setattr(link.alert_ledger, 'orders', no_rebuild)
+    link.note_order(datetime(2025, 1, 31, 10, 0, 42), 'left', 'PO-A')
+    orders, median = link.get_orders_history()
+    assert orders[-1] == (datetime(2025, 1, 31, 10, 0), 'left', 20.0)
+    assert median['left'] == 15.0
+    assert link.get_orders_history(start=datetime(2025, 1, 5))[0][0][0] == datetime(2025, 1, 11, 10, 0)
+    monkeypatch.undo()
+
+    # An edit to the log from outside is picked up on the next read
+    with open(link.last_alert_file, 'a') as f:
+        f.write('2025-02-10 10:00,left,PO-A\n')
+    orders, median = link.get_orders_history()
+    assert len(orders) == 4 and median['left'] == 10.0
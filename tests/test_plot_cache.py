@@ -0,0 +1,115 @@
+"""Tests for the /plot render cache: renders happen only when readings or
+alerts change, and clients can revalidate with If-None-Match.
+"""
+from datetime import datetime, timedelta
+
+import linde_manager
+
+
+def _seed(link):
+    now = datetime.now().replace(microsecond=0)
+    link.record_readings([
+        ((now - timedelta(hours=h)).strftime('%Y-%m-%dT%H:%M:%S'), bank, None, 50 + h)
+        for h in range(24, 0, -4) for bank in ('left', 'right')
+    ])
+
+
+def test_plot_rendered_once_per_input_version(make_link, http_get, monkeypatch):
+    link = make_link(pos=[])
+    _seed(link)
+    calls = []
+    original = linde_manager.RequestHandler.generate_plot
+
+    def counting(self, *args, **kwargs):
+        calls.append(kwargs.get('days'))
+        return original(self, *args, **kwargs)
+
+    monkeypatch.setattr(linde_manager.RequestHandler, 'generate_plot', counting)
+
+    response, body = http_get('/plot')
+    assert response.status == 200
+    assert response.getheader('Content-type') == 'image/png'
+    assert int(response.getheader('Content-Length')) == len(body)
+    assert body.startswith(b'\x89PNG')
+    etag = response.getheader('ETag')
+    assert etag and response.getheader('Last-Modified')
+
+    response, body = http_get('/plot')
+    assert response.status == 200
+    assert len(calls) == 1
+
+    response, body = http_get('/plot', headers={'If-None-Match': etag})
+    assert response.status == 304
+    assert body == b''
+    assert len(calls) == 1
+
+    # A new reading bumps the generation and forces a re-render
+    link.record_readings([(datetime.now().strftime('%Y-%m-%dT%H:%M:%S'), 'left', None, 5)])
+    response, _ = http_get('/plot', headers={'If-None-Match': etag})
+    assert response.status == 200
+    assert len(calls) == 2
+
+
+class _FakeSMTP:
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def sendmail(self, *args):
+        pass
+
+
+def test_alert_bumps_plot_version(make_link, monkeypatch):
+    link = make_link(pos=[{'number': 'PO-A', 'ratio': 1}])
+    link.credentials.update({'smtp_sender': 'a@x', 'smtp_recipient': 'b@x',
+                             'smtp_server': 'localhost', 'smtp_port': 25, 'use_auth': 'False'})
+    monkeypatch.setattr(linde_manager.smtplib, 'SMTP', _FakeSMTP)
+    before = link.alerts_generation
+    link.send_alert_email('left')
+    assert link.alerts_generation == before + 1
+
+
+def test_concurrent_plot_requests_share_one_render(make_link, monkeypatch):
+    import threading
+    import time
+
+    link = make_link(pos=[])
+    calls = []
+
+    def slow_render(self, resampling_value='3H', days=10, device=None):
+        calls.append(days)
+        time.sleep(0.2)
+        return b'\x89PNG fake'
+
+    monkeypatch.setattr(linde_manager.RequestHandler, 'generate_plot', slow_render)
+    handler = linde_manager.RequestHandler.__new__(linde_manager.RequestHandler)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(handler.get_plot(days=10)))
+               for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(calls) == 1
+    assert len(results) == 8
+    assert all(r['body'] == b'\x89PNG fake' for r in results)
+
+
+def test_single_flight_propagates_errors():
+    import pytest
+
+    flight = linde_manager.SingleFlight()
+
+    def boom():
+        raise RuntimeError('render failed')
+
+    with pytest.raises(RuntimeError):
+        flight.do('k', boom)
+    # The failed call is forgotten, so the next caller retries
+    assert flight.do('k', lambda: 42) == 42
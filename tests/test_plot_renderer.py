@@ -0,0 +1,88 @@
+"""Tests for the plot renderer: gap interpolation, PNG/SVG output, the
+out-of-process pool, and that the web process never imports matplotlib.
+"""
+import multiprocessing
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+import linde_manager
+import plot_renderer
+
+
+def _job(fmt='png'):
+    times = np.arange(0, 10 * 3600, 3600, dtype='int64') + 1_700_000_000
+    contents = np.linspace(90, 20, len(times))
+    contents[3] = np.nan
+    return {
+        'days': 1,
+        'start': int(times[0]),
+        'end': int(times[-1]),
+        'banks': {'left': (times, contents), 'right': (times, contents[::-1])},
+        'alerts': {'left': np.array([times[5]]), 'right': np.array([], dtype='int64')},
+        'format': fmt,
+    }
+
+
+def test_interpolate_gaps_fills_inner_nans_only():
+    times = np.array([0, 10, 20, 30, 40], dtype='int64').astype('datetime64[s]')
+    contents = np.array([np.nan, 10.0, np.nan, 30.0, np.nan])
+    filled = plot_renderer.interpolate_gaps(times, contents)
+    assert np.isnan(filled[0]) and np.isnan(filled[-1])
+    assert filled[2] == pytest.approx(20.0)
+
+
+def test_render_png_and_svg():
+    assert plot_renderer.render_plot(_job('png')).startswith(b'\x89PNG')
+    assert b'<svg' in plot_renderer.render_plot(_job('svg'))
+
+
+def test_render_empty_banks():
+    job = _job()
+    job['banks'] = {}
+    job['alerts'] = {}
+    assert plot_renderer.render_plot(job).startswith(b'\x89PNG')
+
+
+def test_renderer_pool_recycles_workers():
+    pool = linde_manager.RendererPool(processes=1, max_jobs_per_worker=1, max_queued=1)
+    try:
+        for _ in range(2):
+            assert pool.render(_job(), timeout=60).startswith(b'\x89PNG')
+    finally:
+        pool.close()
+
+
+class _LostJobs():
+    """Stands in for a pool whose worker died mid-render: no job completes."""
+
+    def apply_async(self, func, args, callback=None, error_callback=None):
+        return self
+
+    def get(self, timeout=None):
+        assert timeout is not None, 'unbounded wait for a render'
+        raise multiprocessing.TimeoutError
+
+
+def test_renderer_pool_bounds_the_wait_for_lost_jobs():
+    pool = linde_manager.RendererPool(processes=1, max_queued=1, render_timeout=0.1)
+    real_pool, pool._pool = pool._pool, _LostJobs()
+    try:
+        # Each timed-out job gives its slot back, so the queue never fills up
+        for _ in range(3):
+            with pytest.raises(TimeoutError, match='Timed out waiting'):
+                pool.render(_job())
+    finally:
+        pool._pool = real_pool
+        pool.close()
+
+
+def test_web_process_does_not_import_matplotlib():
+    app_dir = os.path.dirname(linde_manager.__file__)
+    code = "import sys, linde_manager; print('matplotlib' in sys.modules)"
+    result = subprocess.run([sys.executable, '-c', code], cwd=app_dir,
+                            capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == 'False'
@@ -0,0 +1,78 @@
+"""Tests for parameterised /plot: interval parsing, vectorised bucket
+resampling, and separate LRU-cached renders per (days, resample).
+"""
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+import linde_manager
+
+
+@pytest.mark.parametrize('value, seconds', [
+    ('30min', 1800), ('3H', 10800), ('1d', 86400), ('D', 86400), ('2W', 14 * 86400),
+])
+def test_parse_interval(value, seconds):
+    assert linde_manager.parse_interval(value) == seconds
+
+
+@pytest.mark.parametrize('value', ['', '0D', '3X', 'D3', None])
+def test_parse_interval_rejects(value):
+    with pytest.raises(ValueError):
+        linde_manager.parse_interval(value)
+
+
+def test_auto_interval_bounds_point_count():
+    assert linde_manager.auto_interval(10) is None
+    for days in (90, 365, 3650):
+        interval = linde_manager.auto_interval(days)
+        assert days * 86400 / linde_manager.parse_interval(interval) <= 400
+
+
+def test_resample_buckets_mean_min_max():
+    day = 86400
+    times = (np.array([0, 3600, 7200, day + 10, day + 20, 3 * day], dtype='int64')
+             .astype('datetime64[s]'))
+    values = np.array([10.0, 20.0, np.nan, 5.0, 7.0, 1.0])
+    starts, means, mins, maxs = linde_manager.resample_buckets(times, values, day)
+    assert list(starts.astype('int64')) == [0, day, 3 * day]
+    assert list(means) == [15.0, 6.0, 1.0]
+    assert list(mins) == [10.0, 5.0, 1.0]
+    assert list(maxs) == [20.0, 7.0, 1.0]
+
+
+def test_resample_buckets_empty():
+    starts, means, _, _ = linde_manager.resample_buckets(
+        np.empty(0, dtype='datetime64[s]'), np.empty(0), 3600)
+    assert len(starts) == 0 and len(means) == 0
+
+
+def test_plot_window_and_resample_cached_separately(make_link, http_get, monkeypatch):
+    link = make_link(pos=[])
+    now = datetime.now().replace(microsecond=0)
+    link.record_readings([
+        ((now - timedelta(hours=h)).strftime('%Y-%m-%dT%H:%M:%S'), bank, None, (h * 3) % 100)
+        for h in range(24 * 90, 0, -6) for bank in ('left', 'right')
+    ])
+    calls = []
+    original = linde_manager.RequestHandler.generate_plot
+
+    def counting(self, resampling_value=None, days=10, device=None):
+        calls.append((days, resampling_value))
+        return original(self, resampling_value=resampling_value, days=days, device=device)
+
+    monkeypatch.setattr(linde_manager.RequestHandler, 'generate_plot', counting)
+
+    response, body = http_get('/plot?days=90&resample=1D')
+    assert response.status == 200 and body.startswith(b'\x89PNG')
+    http_get('/plot?days=90&resample=1D')
+    http_get('/plot?days=30')
+    http_get('/plot')
+    assert calls == [(90, '1D'), (30, None), (10, None)]
+
+
+def test_plot_rejects_bad_parameters(make_link, http_get):
+    make_link(pos=[])
+    for query in ('days=0', 'days=abc', f'days={linde_manager._MAX_PLOT_DAYS + 1}', 'resample=3X'):
+        response, _ = http_get(f'/plot?{query}')
+        assert response.status == 400, query
@@ -0,0 +1,58 @@
+"""Tests for the indexed readings store: range queries, ingest validation,
+and the one-shot migration from the legacy data_log.csv.
+"""
+from datetime import datetime
+
+import linde_manager
+
+
+def _store(tmp_path):
+    return linde_manager.ReadingsStore(str(tmp_path / 'readings.db'))
+
+
+def test_range_filters_by_bank_and_time(tmp_path):
+    store = _store(tmp_path)
+    store.append_many([
+        ('2025-01-01T10:00:00', 'left', '2024-12-30T00:00:00', '80'),
+        ('2025-01-01T10:00:00', 'right', '2024-12-30T00:00:00', '60'),
+        ('2025-01-05T10:00:00', 'left', '2024-12-30T00:00:00', '70'),
+        ('2025-01-10T10:00:00', 'left', '2024-12-30T00:00:00', '50'),
+    ])
+    rows = store.range(bank='left', start=datetime(2025, 1, 2), end=datetime(2025, 1, 10, 10, 0))
+    assert [(r[0], r[3]) for r in rows] == [(datetime(2025, 1, 5, 10, 0), 70.0)]
+    assert len(store.range()) == 4
+    assert {r[1] for r in store.range(start=datetime(2025, 1, 1))} == {'left', 'right'}
+
+
+def test_append_rejects_unparseable_message_time(tmp_path):
+    store = _store(tmp_path)
+    assert store.append(None, 'left', None, '50') is False
+    assert store.append('None', 'left', None, '50') is False
+    assert store.append('2025-01-01T10:00:00', 'left', None, 'n/a') is True
+    rows = store.range()
+    assert len(rows) == 1
+    assert rows[0][3] is None
+
+
+def test_migrate_csv_is_one_shot(tmp_path):
+    csv_path = tmp_path / 'data_log.csv'
+    csv_path.write_text(
+        'messageTime,bank,lastChange,content\n'
+        '2025-01-01T10:00:00,left,2024-12-30T00:00:00,80\n'
+        '2025-01-01T10:00:00,right,2024-12-30T00:00:00,60\n'
+        'None,left,None,None\n'
+    )
+    store = _store(tmp_path)
+    assert store.migrate_csv(str(csv_path)) == 2
+    assert store.migrate_csv(str(csv_path)) == 0
+    assert store.count() == 2
+
+    # The migration flag is persisted, so a fresh connection does not re-import
+    store.close()
+    assert _store(tmp_path).migrate_csv(str(csv_path)) == 0
+
+
+def test_migrate_missing_csv(tmp_path):
+    store = _store(tmp_path)
+    assert store.migrate_csv(str(tmp_path / 'absent.csv')) == 0
+    assert store.count() == 0
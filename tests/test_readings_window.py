@@ -0,0 +1,82 @@
+"""Tests for the in-memory ring buffer of recent readings and its wiring
+into LindeLink (startup load from the store, append on poll, trim by age).
+"""
+from datetime import datetime, timedelta
+
+import numpy as np
+
+import linde_manager
+
+
+def test_ring_buffer_overwrites_oldest_when_full():
+    window = linde_manager.ReadingsWindow(capacity=3, max_age=timedelta(days=365))
+    base = datetime(2025, 1, 1)
+    window.load([], since=base)
+    for i in range(5):
+        window.append(base + timedelta(hours=i), None, float(i))
+
+    times, contents = window.snapshot()
+    assert len(window) == 3
+    assert list(contents) == [2.0, 3.0, 4.0]
+    # Evicted readings mean the buffer only covers from the oldest kept one
+    assert window.horizon == base + timedelta(hours=2)
+    assert not window.covers(base)
+    assert window.covers(base + timedelta(hours=2))
+
+
+def test_trim_drops_readings_older_than_max_age():
+    window = linde_manager.ReadingsWindow(capacity=10, max_age=timedelta(days=2))
+    now = datetime(2025, 1, 10)
+    window.load([
+        (now - timedelta(days=3), None, 10.0),
+        (now - timedelta(days=1), None, 20.0),
+    ], since=now - timedelta(days=5))
+    window.trim(now)
+    _, contents = window.snapshot()
+    assert list(contents) == [20.0]
+    assert window.horizon == now - timedelta(days=2)
+
+
+def test_last_and_snapshot_start():
+    window = linde_manager.ReadingsWindow(capacity=10)
+    t0 = datetime(2025, 1, 1, 10, 0)
+    window.load([
+        (t0, '2024-12-30T08:00:00', 80.0),
+        (t0 + timedelta(hours=1), None, None),
+    ], since=t0)
+    assert window.last() == (t0 + timedelta(hours=1), None, None)
+    times, contents = window.snapshot(start=t0 + timedelta(minutes=30))
+    assert times[0] == np.datetime64(t0 + timedelta(hours=1), 's')
+    assert np.isnan(contents[0])
+
+
+def test_link_loads_tail_and_records_polls(make_link):
+    link = make_link(pos=[])
+    now = datetime.now().replace(microsecond=0)
+    old = now - timedelta(days=60)
+    link.readings.append_many([
+        (old, 'left', None, 90),
+        (now - timedelta(hours=2), 'left', '2025-01-01T00:00:00', 70),
+        (now - timedelta(hours=2), 'right', None, 40),
+    ])
+    link.data = {}
+    link.load_recent_readings()
+
+    # Only the recent tail is buffered; self.data is seeded for the dashboard
+    assert len(link.windows['left']) == 1
+    assert link.data['leftBankContents'] == '70'
+    assert link.data['lastChangeLeft'] == '2025-01-01T00:00:00'
+    assert link.data['rightBankContents'] == '40'
+
+    link.record_readings([
+        (now.strftime('%Y-%m-%dT%H:%M:%S'), 'left', None, '65'),
+        ('None', 'right', None, '39'),   # unparseable -> dropped
+    ])
+    assert len(link.windows['left']) == 2
+    assert len(link.windows['right']) == 1
+    _, contents = link.recent_readings('left', now - timedelta(days=1))
+    assert list(contents) == [70.0, 65.0]
+
+    # A window older than the buffer falls back to the store
+    _, contents = link.recent_readings('left', now - timedelta(days=90))
+    assert list(contents) == [90.0, 70.0, 65.0]
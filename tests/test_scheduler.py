@@ -0,0 +1,108 @@
+"""Tests for the background job scheduler: drift-corrected intervals,
+skipped overruns, failure tracking, run_now and a clean stop.
+"""
+import json
+import threading
+
+import linde_manager
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_runs_jobs_on_a_drift_corrected_schedule():
+    clock = _Clock()
+    scheduler = linde_manager.Scheduler(clock=clock)
+    runs = []
+
+    def poll():
+        runs.append(clock.now)
+        clock.now += 7          # the job itself takes 7s
+
+    scheduler.add('poll', poll, 60)
+    assert scheduler.run_pending() == 53
+    clock.now = 1061            # woke up a second late
+    assert scheduler.run_pending() == 52
+    assert runs == [1000, 1061]
+    assert scheduler.stats()['poll']['runs'] == 2
+    assert scheduler.stats()['poll']['lastDuration'] == 7
+
+
+def test_overrun_is_skipped_not_caught_up():
+    clock = _Clock()
+    scheduler = linde_manager.Scheduler(clock=clock)
+    runs = []
+
+    def slow():
+        runs.append(clock.now)
+        clock.now += 130
+
+    scheduler.add('slow', slow, 60)
+    scheduler.run_pending()
+    assert runs == [1000]
+    assert scheduler.stats()['slow']['missed'] == 2
+    assert scheduler.run_pending() == 50     # next slot is 1180, not 1060
+
+
+def test_failures_are_recorded_and_the_job_keeps_its_schedule():
+    clock = _Clock()
+    metrics = linde_manager.Metrics()
+    scheduler = linde_manager.Scheduler(metrics=metrics, clock=clock)
+
+    def broken():
+        raise RuntimeError('upstream down')
+
+    scheduler.add('poll', broken, 60, delay=5)
+    assert scheduler.run_pending() == 5
+    clock.now += 5
+    assert scheduler.run_pending() == 60
+    stats = scheduler.stats()['poll']
+    assert (stats['runs'], stats['failures']) == (1, 1)
+    assert stats['lastError'] == 'RuntimeError: upstream down'
+    assert metrics.snapshot()['counters']['job poll failed'] == 1
+    assert metrics.snapshot()['timings']['job poll']['count'] == 1
+
+
+def test_run_now_and_stop_on_the_scheduler_thread():
+    scheduler = linde_manager.Scheduler()
+    ran = threading.Event()
+    threads = []
+
+    def job():
+        threads.append(threading.current_thread().name)
+        ran.set()
+
+    scheduler.add('compaction', job, 3600, delay=3600)
+    scheduler.start()
+    scheduler.run_now('compaction')
+    assert ran.wait(5)
+    scheduler.stop(timeout=5)
+    assert threads == ['linde-scheduler']
+    assert scheduler._thread is None
+
+
+def test_link_schedules_background_jobs(make_link, http_get):
+    link = make_link(pos=[])
+    scheduler = linde_manager.Scheduler()
+    link.schedule_jobs(scheduler)
+    assert set(scheduler.stats()) == {'token', 'smtp', 'poll', 'compaction'}
+
+    link.scheduler = scheduler
+    status = json.loads(http_get('/status')[1])
+    assert status['jobs']['poll']['interval'] == status['pollInterval'] == link.poll_interval
+
+
+def test_set_interval_from_inside_and_outside_the_job():
+    clock = _Clock()
+    scheduler = linde_manager.Scheduler(clock=clock)
+    scheduler.add('poll', lambda: scheduler.set_interval('poll', 600), 3600)
+    assert scheduler.run_pending() == 600
+    scheduler.set_interval('poll', 60)
+    assert scheduler.run_pending() == 60
+    scheduler.set_interval('poll', 7200)     # a later slot does not postpone the due run
+    assert scheduler.run_pending() == 60
@@ -0,0 +1,137 @@
+"""Tests for /api/series: min/max downsampling, parameter validation, and
+per-(range, resolution) caching invalidated by new readings.
+"""
+import json
+from datetime import datetime, timedelta
+from urllib.parse import quote
+
+import numpy as np
+
+import linde_manager
+
+
+def test_downsample_keeps_extremes_and_order():
+    times = np.arange(1000, dtype='int64')
+    values = np.sin(np.linspace(0, 20, 1000)) * 40 + 50
+    values[123] = -100.0   # a spike must survive
+    t, v = linde_manager.downsample_minmax(times, values, 100)
+    assert len(t) <= 100
+    assert np.all(np.diff(t) > 0)
+    assert -100.0 in v
+    assert v.max() == values.max()
+
+
+def test_downsample_short_series_and_nans():
+    times = np.arange(5, dtype='int64')
+    values = np.array([1.0, np.nan, 3.0, 4.0, 5.0])
+    t, v = linde_manager.downsample_minmax(times, values, 500)
+    assert list(t) == [0, 2, 3, 4]
+    assert list(v) == [1.0, 3.0, 4.0, 5.0]
+
+
+def _seed(link, hours=2000):
+    now = datetime.now().replace(microsecond=0)
+    link.record_readings([
+        ((now - timedelta(hours=h)).strftime('%Y-%m-%dT%H:%M:%S'), 'left', None, h % 100)
+        for h in range(hours, 0, -1)
+    ])
+    return now
+
+
+def test_series_endpoint_downsamples(make_link, http_get):
+    link = make_link(pos=[])
+    now = _seed(link)
+    start = (now - timedelta(days=60)).isoformat()
+    response, body = http_get(f'/api/series?bank=left&from={start}&points=200')
+    assert response.status == 200
+    assert response.getheader('Content-type') == 'application/json'
+    data = json.loads(body)
+    assert data['sourcePoints'] > 1000
+    assert data['points'] <= 200
+    assert len(data['t']) == len(data['v']) == data['points']
+    assert data['t'] == sorted(data['t'])
+
+
+def test_series_endpoint_caches_until_new_reading(make_link, http_get, monkeypatch):
+    link = make_link(pos=[])
+    _seed(link, hours=50)
+    calls = []
+    original = link.recent_readings
+
+    def counting(*args, **kwargs):
+        calls.append(args)
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(link, 'recent_readings', counting)
+
+    _, first = http_get('/api/series?bank=left&points=20')
+    _, second = http_get('/api/series?bank=left&points=20')
+    assert first == second
+    assert len(calls) == 1
+
+    # Different resolution is a separate cache entry
+    http_get('/api/series?bank=left&points=10')
+    assert len(calls) == 2
+
+    link.record_readings([(datetime.now().strftime('%Y-%m-%dT%H:%M:%S'), 'left', None, 7)])
+    _, third = http_get('/api/series?bank=left&points=20')
+    assert len(calls) == 3
+    assert json.loads(third)['v'][-1] == 7
+
+
+def test_default_window_follows_the_clock(make_link, http_get, monkeypatch):
+    link = make_link(pos=[])
+    now = _seed(link, hours=300)
+
+    class Later(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return now + timedelta(days=5)
+
+    first = json.loads(http_get('/api/series?bank=left&points=20')[1])
+    monkeypatch.setattr(linde_manager, 'datetime', Later)
+    later = json.loads(http_get('/api/series?bank=left&points=20')[1])
+    assert later['from'] > first['from']
+    assert later['sourcePoints'] < first['sourcePoints']
+
+
+def test_series_endpoint_validates_parameters(make_link, http_get):
+    make_link(pos=[])
+    for query in ('bank=middle', 'bank=left&points=1', 'bank=left&from=yesterday',
+                  'bank=left&from=2025-02-01&to=2025-01-01'):
+        response, body = http_get(f'/api/series?{query}')
+        assert response.status == 400, query
+        assert 'error' in json.loads(body)
+
+
+def test_series_and_timeline_accept_utc_offsets(make_link, http_get):
+    link = make_link(pos=[])
+    now = _seed(link, hours=48)
+    start = now - timedelta(hours=24)
+    response, body = http_get('/api/series?bank=left&from=' + quote(start.astimezone().isoformat()))
+    assert response.status == 200
+    assert json.loads(body)['from'] == start.isoformat()
+    assert http_get('/timeline.svg?from=' + quote('2025-01-01T00:00:00+02:00') + '&to=2025-06-01')[0].status == 200
+
+
+def test_series_endpoint_rejects_bounds_outside_the_datetime_range(make_link, http_get):
+    link = make_link(pos=[])
+    _seed(link, hours=48)
+    for query in ('to=0001-01-01', 'from=' + quote('0001-01-01T00:00:00+05:00'),
+                  'to=' + quote('9999-12-31T23:59:59-05:00')):
+        response, body = http_get(f'/api/series?bank=left&{query}')
+        assert response.status == 400, query
+        assert 'error' in json.loads(body)
+    # The ends of the range themselves are fine
+    assert http_get('/api/series?bank=left&from=0001-01-01&to=9999-12-31')[0].status == 200
+
+
+def test_render_cache_lru_eviction():
+    cache = linde_manager.RenderCache(maxsize=2)
+    cache.put('a', 1, b'a', 'text/plain')
+    cache.put('b', 1, b'b', 'text/plain')
+    assert cache.get('a', 1) is not None   # 'a' becomes most recent
+    cache.put('c', 1, b'c', 'text/plain')
+    assert cache.get('b', 1) is None
+    assert cache.get('a', 1) is not None
+    assert len(cache) == 2
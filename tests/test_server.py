@@ -0,0 +1,84 @@
+"""Tests for the pooled HTTP server: a blocked /plot render must not stall
+/status, and a render that outlives the request timeout answers 503.
+"""
+import http.client
+import threading
+import time
+
+import pytest
+
+import linde_manager
+
+
+@pytest.fixture
+def pooled_server():
+    servers = []
+
+    def _start(**kwargs):
+        httpd = linde_manager.make_server(mode='threaded', port=0, host='127.0.0.1', **kwargs)
+        threading.Thread(target=httpd.serve_forever, daemon=True).start()
+        servers.append(httpd)
+        return httpd.server_address[1]
+
+    yield _start
+    for httpd in servers:
+        httpd.shutdown()
+        httpd.server_close()
+
+
+def _get(port, path):
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+    conn.request('GET', path)
+    response = conn.getresponse()
+    response.read()
+    conn.close()
+    return response
+
+
+def test_status_not_blocked_by_slow_plot(make_link, pooled_server, monkeypatch):
+    make_link(pos=[])
+    release = threading.Event()
+
+    def blocked_render(self, resampling_value='3H', days=10, device=None):
+        release.wait(10)
+        return b'\x89PNG'
+
+    monkeypatch.setattr(linde_manager.RequestHandler, 'generate_plot', blocked_render)
+    port = pooled_server(workers=4, request_timeout=10)
+
+    plot = threading.Thread(target=_get, args=(port, '/plot'))
+    plot.start()
+    time.sleep(0.1)
+
+    start = time.perf_counter()
+    assert _get(port, '/status').status == 200
+    assert time.perf_counter() - start < 1.0
+
+    release.set()
+    plot.join()
+
+
+def test_plot_times_out_with_503(make_link, pooled_server, monkeypatch):
+    make_link(pos=[])
+    release = threading.Event()
+
+    def blocked_render(self, resampling_value='3H', days=10, device=None):
+        release.wait(10)
+        return b'\x89PNG'
+
+    monkeypatch.setattr(linde_manager.RequestHandler, 'generate_plot', blocked_render)
+    port = pooled_server(workers=4, request_timeout=0.3)
+
+    # The first request owns the render; the second gives up waiting for it
+    first = threading.Thread(target=_get, args=(port, '/plot'))
+    first.start()
+    time.sleep(0.1)
+    assert _get(port, '/plot').status == 503
+
+    release.set()
+    first.join()
+
+
+def test_unknown_server_mode():
+    with pytest.raises(ValueError):
+        linde_manager.make_server(mode='bogus', port=0)
@@ -0,0 +1,121 @@
+"""Tests for the sqlite storage engine: the orders and staleness tables,
+the one-shot import of the text logs, and WAL reads that do not wait for
+the collector's writes.
+"""
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+
+import linde_manager
+
+
+def test_sqlite_ledger_queries(tmp_path):
+    ledger = linde_manager.SQLiteLedger(str(tmp_path / 'readings.db'))
+    version = ledger.refresh()
+    ledger.append(datetime(2025, 1, 1, 10, 0, 30), 'left', 'PO-A')
+    ledger.append(datetime(2025, 2, 1, 10, 0), 'right', 'PO-B', device='cage')
+    ledger.append(datetime(2025, 3, 1, 10, 0), 'left', 'PO-A')
+    assert ledger.refresh() == version + 3
+
+    assert ledger.orders() == [(datetime(2025, 1, 1, 10, 0), 'left', 'PO-A'),
+                               (datetime(2025, 3, 1, 10, 0), 'left', 'PO-A')]
+    assert ledger.orders(start=datetime(2025, 2, 1)) == [(datetime(2025, 3, 1, 10, 0), 'left', 'PO-A')]
+    assert ledger.last_alert('left') == datetime(2025, 3, 1, 10, 0)
+    assert ledger.last_alert('left', 'cage') is None
+    assert ledger.po_usage() == {'PO-A': 2, 'PO-B': 1}
+    assert ledger.last_order() == (datetime(2025, 3, 1, 10, 0), 'left', 'PO-A')
+    assert ledger.last_order('nope') is None
+
+    # Writes from another connection bump the version too
+    conn = sqlite3.connect(str(tmp_path / 'readings.db'))
+    with conn:
+        conn.execute("INSERT INTO orders VALUES ('2025-04-01T00:00:00', 'left', 'PO-C', 'default')")
+    conn.close()
+    assert ledger.refresh() == version + 4
+
+
+def test_ledger_version_ignores_other_tables(tmp_path):
+    db = str(tmp_path / 'readings.db')
+    ledger = linde_manager.SQLiteLedger(db)
+    store = linde_manager.ReadingsStore(db, wal=True)
+    staleness = linde_manager.SQLiteStalenessLog(db)
+    version = ledger.refresh()
+
+    store.append('2025-01-01T10:00:00', 'left', None, 50)
+    staleness.record(datetime(2025, 1, 1, 11, 0), 'left', 4)
+    assert ledger.refresh() == version
+
+    ledger.append(datetime(2025, 1, 2, 10, 0), 'left', 'PO-A')
+    assert ledger.refresh() == version + 1
+
+
+def test_imports_text_logs_once(tmp_path):
+    (tmp_path / 'last_alert.log').write_text('2025-01-01 10:00,left,PO-A\n2025-02-01 10:00,right\nbad\n'
+                                             '2025-03-01 10:00,left,PO-B,cage\n')
+    (tmp_path / 'staleness_alert.log').write_text('2025-01-05 10:00,left,4\n')
+    db = str(tmp_path / 'readings.db')
+    ledger = linde_manager.SQLiteLedger(db, default_device='flyroom')
+    staleness = linde_manager.SQLiteStalenessLog(db, default_device='flyroom')
+
+    assert ledger.import_log(str(tmp_path / 'last_alert.log')) == 3
+    assert ledger.import_log(str(tmp_path / 'last_alert.log')) == 0
+    assert [o[1] for o in ledger.orders()] == ['left', 'right']
+    assert [o[2] for o in ledger.orders('cage')] == ['PO-B']
+
+    assert staleness.import_log(str(tmp_path / 'staleness_alert.log')) == 1
+    assert staleness.import_log(str(tmp_path / 'staleness_alert.log')) == 0
+    assert staleness.last_sent() == datetime(2025, 1, 5, 10, 0)
+    staleness.record(datetime(2025, 1, 6, 9, 0), 'right', 5, device='cage')
+    assert staleness.last_sent() == datetime(2025, 1, 5, 10, 0)
+    assert staleness.last_sent('cage') == datetime(2025, 1, 6, 9, 0)
+
+
+def test_wal_reads_do_not_wait_for_writes(tmp_path):
+    store = linde_manager.ReadingsStore(str(tmp_path / 'readings.db'), wal=True)
+    store.append('2025-01-01T10:00:00', 'left', None, 50)
+    result = []
+
+    with store._db.write() as conn:
+        # An open write transaction, as held by the collector mid-insert
+        conn.execute("INSERT INTO readings (messageTime, bank, content) VALUES ('2025-01-02T10:00:00', 'left', 40)")
+        reader = threading.Thread(target=lambda: result.append(store.range()))
+        reader.start()
+        reader.join(timeout=5)
+        assert not reader.is_alive()
+    assert [r[3] for r in result[0]] == [50.0]
+    assert len(store.range()) == 2
+
+
+def test_link_with_sqlite_storage(make_link, tmp_path, monkeypatch):
+    now = datetime.now().replace(second=0, microsecond=0)
+    (tmp_path / 'last_alert.log').write_text(
+        f"{(now - timedelta(days=20)).strftime('%Y-%m-%d %H:%M')},left,PO-A\n"
+        f"{(now - timedelta(hours=2)).strftime('%Y-%m-%d %H:%M')},right,PO-A\n"
+    )
+    (tmp_path / 'staleness_alert.log').write_text(f"{(now - timedelta(hours=1)).strftime('%Y-%m-%d %H:%M')},left,5\n")
+    monkeypatch.setattr(linde_manager, '_STORAGE', 'sqlite')
+    link = make_link(pos=[{'number': 'PO-A', 'ratio': 1}])
+
+    assert isinstance(link.alert_ledger, linde_manager.SQLiteLedger)
+    assert link.migrated['orders'] == 2 and link.migrated['staleness_alerts'] == 1
+    assert link.readings._db.writer.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+    assert link.get_po_usage() == {'PO-A': 2}
+
+    # Storing readings leaves the order statistics and cached renders alone
+    generation = link.alerts_generation
+    stats = link.order_stats()
+    link.record_readings([(now.strftime('%Y-%m-%dT%H:%M:%S'), 'left', None, 40)])
+    assert link.alerts_generation == generation
+    assert link.order_stats() is stats
+    assert [o[1] for o in link.get_orders_history()[0]] == ['left', 'right']
+
+    sent = []
+    monkeypatch.setattr(link, 'send_alert_email', lambda bank, test=False, device=None: sent.append(bank))
+    link.check_and_send_alert('right')
+    link.check_and_send_alert('left')
+    assert sent == ['left']
+
+    # A staleness alert went out an hour ago, so none is sent now
+    monkeypatch.setattr(linde_manager.smtplib, 'SMTP', None)
+    link.send_data_staleness_alert('left', 5)
+    assert link.email_status['connected']
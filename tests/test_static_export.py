@@ -0,0 +1,51 @@
+"""Tests for the static dashboard export: a complete snapshot with .gz
+twins, written atomically, and refreshed after every poll.
+"""
+import gzip
+import json
+import os
+from datetime import datetime
+
+import linde_manager
+
+MANIFOLDS = [
+    {'id': 'flyroom', 'name': 'Fly Room', 'serials': ['A1']},
+    {'id': 'cage', 'name': 'Cage', 'serials': ['B2']},
+]
+
+
+def test_export_writes_a_complete_snapshot(make_link, tmp_path):
+    link = make_link(pos=[], manifolds=MANIFOLDS)
+    now = datetime.now().strftime('%Y-%m-%dT%H:%M:%S')
+    link.record_readings([(now, 'left', None, 55), (now, 'right', None, 65)], device='cage')
+    out = tmp_path / 'www'
+
+    written = linde_manager.export_static(str(out))
+
+    assert sorted(written) == sorted([
+        'plot.png', 'timeline.svg', 'index.html',
+        'plot-cage.png', 'timeline-cage.svg', 'index-cage.html', 'status.json',
+    ])
+    assert written[-2:] == ['index.html', 'index-cage.html']
+    assert sorted(os.listdir(out)) == sorted(written + [
+        'timeline.svg.gz', 'timeline-cage.svg.gz', 'index.html.gz', 'index-cage.html.gz', 'status.json.gz'])
+    assert (out / 'plot-cage.png').read_bytes().startswith(b'\x89PNG')
+    assert 'Cage' in (out / 'index-cage.html').read_text()
+    assert gzip.decompress((out / 'index.html.gz').read_bytes()) == (out / 'index.html').read_bytes()
+    status = json.loads((out / 'status.json').read_text())
+    assert list(status['manifolds']) == ['flyroom', 'cage']
+
+
+def test_each_poll_refreshes_the_export(make_link, tmp_path, monkeypatch):
+    link = make_link(pos=[])
+    out = tmp_path / 'www'
+    monkeypatch.setattr(linde_manager, '_EXPORT_DIR', str(out))
+    monkeypatch.setattr(link, 'get_data', lambda: False)
+
+    link.collect_data()
+    assert 'No alerts sent yet' in (out / 'index.html').read_text()
+    link.note_order(datetime.now(), 'left', 'PO-A')
+    link.collect_data()
+    assert 'The last alert was sent' in (out / 'index.html').read_text()
+    assert 'The last alert was sent' in gzip.decompress((out / 'index.html.gz').read_bytes()).decode('utf-8')
+    assert not [name for name in os.listdir(out) if name.endswith('.tmp')]
@@ -0,0 +1,72 @@
+"""Tests for the /timeline.svg endpoint: bisected date ranges, clustering of
+overlapping markers, and caching by range and ledger version.
+"""
+from datetime import datetime, timedelta
+
+
+def _orders(start, count, step):
+    return [f"{(start + step * i).strftime('%Y-%m-%d %H:%M')},{'left' if i % 2 else 'right'},PO-A"
+            for i in range(count)]
+
+
+def test_range_is_zoomable(make_link, http_get):
+    make_link(pos=[], log_lines=_orders(datetime(2025, 1, 1), 30, timedelta(days=10)))
+
+    response, body = http_get('/timeline.svg?from=2025-02-01&to=2025-03-01')
+    svg = body.decode('utf-8')
+    assert response.status == 200
+    assert response.getheader('Content-Type') == 'image/svg+xml'
+    assert svg.startswith('<svg') and svg.count('<circle') == 2
+    assert '2025-02-10 00:00' in svg and '2025-01-31' not in svg
+    assert '>03 Feb<' in svg       # weekly ticks when zoomed in
+
+    assert http_get('/timeline.svg?from=2025-03-01&to=2025-02-01')[0].status == 400
+    assert http_get('/timeline.svg?from=yesterday')[0].status == 400
+    assert http_get('/timeline.svg?device=nope')[0].status == 404
+
+
+def test_dense_history_is_clustered(make_link, http_get):
+    make_link(pos=[], log_lines=_orders(datetime(2024, 1, 1), 2000, timedelta(hours=4)))
+
+    svg = http_get('/timeline.svg?from=2024-01-01&to=2025-01-01')[1].decode('utf-8')
+    assert svg.count('<circle') < 200
+    counts = [int(part.split('<', 1)[0]) for part in svg.split('fill="#fff">')[1:]]
+    assert sum(counts) + svg.count('r="5"') == 2000
+    assert len(svg) < 60000
+
+    # Zoomed in far enough, every order gets its own marker
+    svg = http_get('/timeline.svg?from=2024-01-01&to=2024-01-03')[1].decode('utf-8')
+    assert svg.count('r="5"') == 12 and 'fill="#fff"' not in svg
+
+
+def test_cached_until_the_ledger_changes(make_link, http_get):
+    now = datetime.now().replace(second=0, microsecond=0)
+    link = make_link(pos=[], log_lines=_orders(now - timedelta(days=100), 5, timedelta(days=20)))
+
+    first = http_get('/timeline.svg')
+    assert http_get('/timeline.svg', headers={'If-None-Match': first[0].getheader('ETag')})[0].status == 304
+    entry = link.timeline_cache.get((link.primary.id, None, None, 365), (link.alerts_generation, now.date()))
+    assert entry is not None and entry['body'] == first[1]
+
+    link.note_order(now, 'left', 'PO-A')
+    assert http_get('/timeline.svg')[1].count(b'<circle') == 6
+    assert 'timeline-container' in http_get('/')[1].decode('utf-8')
+
+
+def test_ticks_stay_bounded_for_any_range(make_link, http_get):
+    make_link(pos=[], log_lines=_orders(datetime(2024, 1, 1), 20, timedelta(days=30)))
+    for start, label in (('2024-01-01', '>Apr<'), ('2020-01-01', '>Jan 24<'),
+                         ('1900-01-01', '>2000<'), ('0001-01-01', '>1000<')):
+        response, body = http_get(f'/timeline.svg?from={start}&to=2025-06-01')
+        svg = body.decode('utf-8')
+        assert response.status == 200
+        assert 3 <= svg.count('stroke="#aaa"') <= 16, start
+        assert label in svg, start
+        assert len(body) < 20000
+
+
+def test_bounds_outside_the_datetime_range_are_rejected(make_link, http_get):
+    make_link(pos=[], log_lines=_orders(datetime(2024, 1, 1), 5, timedelta(days=30)))
+    for query in ('to=0001-01-02', 'from=0001-01-01T00:00:00%2B05:00', 'to=9999-12-31T23:59:59-05:00'):
+        assert http_get(f'/timeline.svg?{query}')[0].status == 400, query
+    assert http_get('/timeline.svg?from=0001-01-01&to=9999-12-31')[0].status == 200
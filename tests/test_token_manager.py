@@ -0,0 +1,157 @@
+"""Tests for the OAuth token manager: cached tokens are reused, expiring
+tokens are refreshed with one POST, and a failed refresh falls back to the
+full login; get_data must survive having no token at all.
+"""
+from datetime import datetime, timedelta
+
+import linde_manager
+
+CREDS = {
+    'username': 'u', 'password': 'p', 'client_id': 'frontend',
+    'client_secret': 's', 'redirect_uri': 'https://dfs.linde.com/login',
+}
+
+LOGIN_PAGE = (
+    '<html><form action="https://auth.example/login">'
+    '<input type="hidden" name="session_code" value="abc"></form></html>'
+)
+
+
+class FakeResponse:
+    def __init__(self, status_code=200, payload=None, text='', url=''):
+        self.status_code = status_code
+        self._payload = payload or {}
+        self.text = text
+        self.url = url
+
+    def json(self):
+        return self._payload
+
+
+class FakeSession:
+    """Scripted stand-in for requests.Session recording every call."""
+
+    def __init__(self, token_responses):
+        self.token_responses = list(token_responses)
+        self.calls = []
+
+    def get(self, url, **kwargs):
+        self.calls.append(('GET', url, kwargs.get('data') or kwargs.get('params')))
+        if url == linde_manager.TokenManager.AUTH_URL:
+            return FakeResponse(text=LOGIN_PAGE)
+        return FakeResponse(url='https://dfs.linde.com/login?code=CODE123')
+
+    def post(self, url, data=None, **kwargs):
+        self.calls.append(('POST', url, data))
+        if url == linde_manager.TokenManager.TOKEN_URL:
+            return self.token_responses.pop(0)
+        return FakeResponse(url='https://auth.example/after-login')
+
+
+def _token(access, refresh='R1', expires_in=300, refresh_expires_in=1800):
+    return FakeResponse(payload={'access_token': access, 'refresh_token': refresh,
+                                 'expires_in': expires_in, 'refresh_expires_in': refresh_expires_in})
+
+
+def _grants(session):
+    return [c[2]['grant_type'] for c in session.calls if c[1] == linde_manager.TokenManager.TOKEN_URL]
+
+
+def test_login_then_cached():
+    session = FakeSession([_token('A1')])
+    tokens = linde_manager.TokenManager(CREDS, session=session)
+    assert tokens.get_token() == 'A1'
+    assert tokens.get_token() == 'A1'
+    assert _grants(session) == ['authorization_code']
+    assert tokens.refresh_token == 'R1'
+
+
+def test_refresh_shortly_before_expiry():
+    session = FakeSession([_token('A1'), _token('A2', refresh='R2')])
+    tokens = linde_manager.TokenManager(CREDS, session=session)
+    tokens.get_token()
+    calls_after_login = len(session.calls)
+
+    tokens.expires_at = datetime.now() + timedelta(seconds=30)   # inside the margin
+    assert tokens.get_token() == 'A2'
+    assert _grants(session) == ['authorization_code', 'refresh_token']
+    # The refresh is a single POST, no login page scrape
+    assert len(session.calls) == calls_after_login + 1
+    assert session.calls[-1][2]['refresh_token'] == 'R1'
+    assert tokens.refresh_token == 'R2'
+
+
+def test_failed_refresh_falls_back_to_login():
+    session = FakeSession([_token('A1'), FakeResponse(status_code=400), _token('A3')])
+    tokens = linde_manager.TokenManager(CREDS, session=session)
+    tokens.get_token()
+    tokens.expires_at = datetime.now() - timedelta(seconds=1)
+    assert tokens.get_token() == 'A3'
+    assert _grants(session) == ['authorization_code', 'refresh_token', 'authorization_code']
+
+
+def test_expired_refresh_token_goes_straight_to_login():
+    session = FakeSession([_token('A1'), _token('A2')])
+    tokens = linde_manager.TokenManager(CREDS, session=session)
+    tokens.get_token()
+    tokens.expires_at = tokens.refresh_expires_at = datetime.now() - timedelta(seconds=1)
+    assert tokens.get_token() == 'A2'
+    assert _grants(session) == ['authorization_code', 'authorization_code']
+
+
+def test_login_without_form_returns_none():
+    class NoFormSession(FakeSession):
+        def get(self, url, **kwargs):
+            return FakeResponse(text='<html>maintenance</html>')
+
+    tokens = linde_manager.TokenManager(CREDS, session=NoFormSession([]))
+    assert tokens.get_token() is None
+
+
+def test_get_data_skips_poll_without_token(make_link):
+    link = make_link(pos=[])
+    link.tokens = linde_manager.TokenManager(CREDS, session=FakeSession([FakeResponse(status_code=401)]))
+    assert link.get_data() is False
+
+
+# ---------- persisted token cache ----------
+
+def test_tokens_persisted_owner_only_and_restored(tmp_path):
+    import os
+    import stat
+
+    cache = str(tmp_path / 'token_cache.json')
+    session = FakeSession([_token('A1')])
+    linde_manager.TokenManager(CREDS, session=session, cache_file=cache).get_token()
+    assert stat.S_IMODE(os.stat(cache).st_mode) == 0o600
+
+    # A restart reuses the cached access token without any network call
+    restarted_session = FakeSession([])
+    restarted = linde_manager.TokenManager(CREDS, session=restarted_session, cache_file=cache)
+    assert restarted.get_token() == 'A1'
+    assert restarted_session.calls == []
+
+
+def test_cached_refresh_token_used_when_access_expired(tmp_path):
+    cache = str(tmp_path / 'token_cache.json')
+    tokens = linde_manager.TokenManager(CREDS, session=FakeSession([_token('A1')]), cache_file=cache)
+    tokens.get_token()
+    tokens.expires_at = datetime.now() - timedelta(seconds=1)
+    tokens.save_cache()
+
+    session = FakeSession([_token('A2')])
+    restarted = linde_manager.TokenManager(CREDS, session=session, cache_file=cache)
+    assert restarted.access_token is None
+    assert restarted.get_token() == 'A2'
+    assert _grants(session) == ['refresh_token']
+
+
+def test_cache_ignored_for_other_account_or_garbage(tmp_path):
+    cache = tmp_path / 'token_cache.json'
+    linde_manager.TokenManager(CREDS, session=FakeSession([_token('A1')]), cache_file=str(cache)).get_token()
+
+    other = dict(CREDS, username='someone-else')
+    assert linde_manager.TokenManager(other, cache_file=str(cache)).access_token is None
+
+    cache.write_text('not json')
+    assert linde_manager.TokenManager(CREDS, cache_file=str(cache)).access_token is None